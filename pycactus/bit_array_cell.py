@@ -1,6 +1,6 @@
 import logging
 from bitstring import BitArray
-from pycactus.utils import get_logger
+from pycactus.utils import get_logger, Instance_logger
 
 logger = get_logger((__name__).split('.')[-1])
 
@@ -57,13 +57,17 @@ class Register_file():
         '''
 
         self.regs = []
+        self.logger = Instance_logger(logger)
         self.reg_symbol = base_register_type.reg_symbol()
         for i in range(num_reg):
             self.regs.append(base_register_type(reg_width))
         self.set_log_level(logging.WARNING)
 
     def set_log_level(self, level):
-        logger.setLevel(level)
+        self.logger.setLevel(level)
+
+    def set_log_handler(self, handler):
+        self.logger.set_handler(handler)
 
     def __str__(self):
         '''Dump the content of the entire register file.'''
@@ -100,7 +104,7 @@ class Register_file():
           - value (BitArray): the value to write
         '''
 
-        if logger.level is logging.DEBUG:
+        if self.logger.level is logging.DEBUG:
             value_str = ''
             if self.reg_symbol == 'f':
                 float_value = value.float
@@ -110,7 +114,7 @@ class Register_file():
 
             # logger.debug("Updating register {}{} with bitstring {} ({}).\n".format(
             #     self.reg_symbol, reg_dst, value, value_str))
-            logger.debug("{:>3s}  <--  {} ({}).\n".format(
+            self.logger.debug("{:>3s}  <--  {} ({}).\n".format(
                 '{}{}'.format(self.reg_symbol, reg_dst), hex(value.int), value.int))
 
         self.regs[reg_dst].update_value(value)
@@ -0,0 +1,427 @@
+import operator
+from .insn import *
+from .gpr import Int_GPRF
+from .fpr import Packed_FPRF
+import pycactus.global_config as gc
+
+logger = get_logger((__name__).split('.')[-1])
+logger.setLevel(logging.WARNING)
+
+GPR_MASK = (1 << gc.GPR_WIDTH) - 1
+SIGN_BIT = 1 << (gc.GPR_WIDTH - 1)
+
+# instructions which end a basic block
+block_terminators = [eqasm_insn.BR, eqasm_insn.STOP]
+
+# instructions which are not translated but call back into the decoded handlers
+callback_insns = [eqasm_insn.BUNDLE, eqasm_insn.FMR, eqasm_insn.DUMPMEM]
+
+# instructions which may raise, e.g., on a division by zero
+fault_insns = [eqasm_insn.DIV, eqasm_insn.REM, eqasm_insn.FCVT_W_S, eqasm_insn.FADD_S,
+               eqasm_insn.FSUB_S, eqasm_insn.FMUL_S, eqasm_insn.FDIV_S]
+
+# instructions which may raise unless proven safe at upload, e.g., on an address out of range
+checked_insns = [eqasm_insn.LW, eqasm_insn.LB, eqasm_insn.LBU, eqasm_insn.SW, eqasm_insn.SB,
+                 eqasm_insn.FLW, eqasm_insn.FSW, eqasm_insn.SMIS, eqasm_insn.SMIT]
+
+op_symbol = {
+    operator.eq: '==',
+    operator.ne: '!=',
+    operator.lt: '<',
+    operator.le: '<=',
+    operator.gt: '>',
+    operator.ge: '>='
+}
+
+int_op_template = {
+    eqasm_insn.ADD: '({a} + {b}) & 0x{mask:x}',
+    eqasm_insn.SUB: '({a} - {b}) & 0x{mask:x}',
+    eqasm_insn.AND: '{a} & {b}',
+    eqasm_insn.OR: '{a} | {b}',
+    eqasm_insn.XOR: '{a} ^ {b}',
+    eqasm_insn.MUL: '(_signed({a}) * _signed({b})) & 0x{mask:x}',
+    eqasm_insn.DIV: 'int(_signed({a}) / _signed({b})) & 0x{mask:x}',
+    eqasm_insn.REM: '(_signed({a}) % _signed({b})) & 0x{mask:x}'
+}
+
+# the name of each comparison flag, indexed by `CMP_FLAG`
+cmp_flag_names = {idx: key for key, idx in CMP_FLAG.items()}
+
+fp_op_symbol = {
+    eqasm_insn.FADD_S: '+',
+    eqasm_insn.FSUB_S: '-',
+    eqasm_insn.FMUL_S: '*',
+    eqasm_insn.FDIV_S: '/'
+}
+
+fp_cmp_symbol = {
+    eqasm_insn.FEQ_S: '==',
+    eqasm_insn.FLT_S: '<',
+    eqasm_insn.FLE_S: '<='
+}
+
+
+def _signed(value):
+    return (value ^ SIGN_BIT) - SIGN_BIT
+
+
+class Translated_block():
+    def __init__(self, start, num_insns, func, source):
+        '''A basic block translated into a Python function.
+
+        Args:
+        - `start` (int): the address of the first instruction of this block.
+        - `num_insns` (int): the number of instructions in this block.
+        - `func`: the generated function, which takes the QCP as its only argument.
+        - `source` (str): the generated source code, kept for debugging.
+        '''
+        self.start = start
+        self.num_insns = num_insns
+        self.func = func
+        self.source = source
+
+
+class Block_translator():
+    def __init__(self, qcp):
+        '''Translate the program uploaded to `qcp` into Python functions, one per basic block.
+
+        A basic block starts at the program entry, at each labelled instruction, and after
+        each `BR`/`STOP`. Inside a block, GPRs and FPRs are kept as plain integers in local
+        variables. They are loaded from the register files on first use, and written back
+        at the block exit, before calling back into the decoded handlers for `BUNDLE`,
+        `FMR` and `DUMPMEM`, and before any instruction which may raise, so that a fault
+        leaves the same state as in the decoded engine.
+
+        With the native register files, the generated code indexes their storage directly.
+        Blocks are translated on their first execution and cached for the program.
+        '''
+        self.qcp = qcp
+        self.block_cache = {}
+
+    def clear(self):
+        self.block_cache = {}
+
+    def get_block(self, pc):
+        block = self.block_cache.get(pc)
+        if block is None:
+            block = self.translate_block(pc)
+            self.block_cache[pc] = block
+        return block
+
+    def find_block_end(self, start):
+        insn_mem = self.qcp.insn_mem
+        end = start
+        while end < len(insn_mem):
+            insn = insn_mem[end]
+            if end > start and len(insn.labels) > 0:
+                break
+            end += 1
+            if insn.name in block_terminators:
+                break
+
+        return end
+
+    def translate_block(self, start):
+        insn_mem = self.qcp.insn_mem
+        if start >= len(insn_mem):
+            raise IndexError("Cannot translate the block starting at the address {}, which "
+                             "exceeds the program size ({}).".format(start, len(insn_mem)))
+
+        end = self.find_block_end(start)
+        gen = _Block_code_generator(self.qcp, start, end)
+        source = gen.generate()
+        logger.debug("translated block [{}, {}):\n{}".format(start, end, source))
+
+        namespace = gen.namespace
+        exec(compile(source, '<eqasm block {}>'.format(start), 'exec'), namespace)
+
+        return Translated_block(start, end - start, namespace[gen.func_name], source)
+
+
+class _Block_code_generator():
+    def __init__(self, qcp, start, end):
+        self.qcp = qcp
+        self.start = start
+        self.end = end
+        self.func_name = 'block_{}'.format(start)
+        self.namespace = {
+            '_signed': _signed,
+            # FP values are rounded as the FP register file in use does
+            '_float': qcp.fprf.bits_to_float,
+            '_bits': qcp.fprf.float_to_bits,
+        }
+        # with the native register files, the generated code works on their storage directly
+        self.native_gprf = isinstance(qcp.gprf, Int_GPRF)
+        self.native_fprf = isinstance(qcp.fprf, Packed_FPRF)
+        self.lines = []
+        # registers whose value is currently held in a local variable
+        self.loaded_gprs = set()
+        self.loaded_fprs = set()
+        # registers whose local variable has been modified but not written back
+        self.dirty_gprs = set()
+        self.dirty_fprs = set()
+
+    def emit(self, line):
+        self.lines.append('    ' + line)
+
+    def add_const(self, value):
+        name = 'c{}'.format(len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def r(self, reg):
+        'Return the local variable holding the unsigned value of the GPR `reg`.'
+        if reg not in self.loaded_gprs:
+            if self.native_gprf:
+                self.emit('r{0} = regs[{0}]'.format(reg))
+            else:
+                self.emit('r{0} = gprf.read_unsigned({0})'.format(reg))
+            self.loaded_gprs.add(reg)
+        return 'r{}'.format(reg)
+
+    def f(self, reg):
+        'Return the local variable holding the bit pattern of the FPR `reg`.'
+        if reg not in self.loaded_fprs:
+            if self.native_fprf:
+                self.emit('f{0} = fbits[{0}]'.format(reg))
+            else:
+                self.emit('f{0} = fprf.read_bits({0})'.format(reg))
+            self.loaded_fprs.add(reg)
+        return 'f{}'.format(reg)
+
+    def set_r(self, reg, expr):
+        self.emit('r{} = {}'.format(reg, expr))
+        self.loaded_gprs.add(reg)
+        self.dirty_gprs.add(reg)
+
+    def set_f(self, reg, expr):
+        self.emit('f{} = {}'.format(reg, expr))
+        self.loaded_fprs.add(reg)
+        self.dirty_fprs.add(reg)
+
+    def addr(self, base, imm):
+        return '{} + {}'.format(self.r(base), imm)
+
+    def flush(self):
+        'Write back all modified registers.'
+        for reg in sorted(self.dirty_gprs):
+            if self.native_gprf:
+                self.emit('regs[{0}] = r{0}'.format(reg))
+            else:
+                self.emit('gprf.write_uint({0}, r{0})'.format(reg))
+        for reg in sorted(self.dirty_fprs):
+            if self.native_fprf:
+                self.emit('fbits[{0}] = f{0}'.format(reg))
+            else:
+                self.emit('fprf.write_bits({0}, f{0})'.format(reg))
+        self.dirty_gprs = set()
+        self.dirty_fprs = set()
+
+    def generate(self):
+        self.lines = ['def {}(qcp):'.format(self.func_name)]
+        self.emit('gprf = qcp.gprf')
+        if self.native_gprf:
+            self.emit('regs = gprf.values')
+        self.emit('fprf = qcp.fprf')
+        if self.native_fprf:
+            self.emit('fbits = fprf.bits')
+        self.emit('mem = qcp.data_mem')
+        # whether the operands of a CMP in this block are held in the locals `ca` and `cb`
+        self.cmp_in_block = False
+        # the address up to which the executed cycles are added to `qcp.cycle`
+        self.counted_end = self.start
+
+        next_pc = self.end
+        for addr in range(self.start, self.end):
+            insn = self.qcp.insn_mem[addr]
+            self.emit('# {}'.format(insn))
+            if insn.name in callback_insns:
+                self.gen_callback(addr)
+            elif insn.name in fault_insns or (insn.name in checked_insns and
+                                              self.qcp.proofs[addr] is None):
+                self.sync_state(addr)
+                self.gen_insn(insn, self.qcp.proofs[addr])
+            elif insn.name == eqasm_insn.BR:
+                self.flush()
+                self.count_cycles(self.end)
+                self.gen_br(addr, insn)
+                return '\n'.join(self.lines) + '\n'
+            elif insn.name == eqasm_insn.STOP:
+                self.flush()
+                self.emit('qcp.stop_bit = 1')
+                self.count_cycles(self.end)
+                self.emit('qcp.pc = {}'.format(addr + 1))
+                self.emit('mem.final_dump()')
+                return '\n'.join(self.lines) + '\n'
+            else:
+                self.gen_insn(insn, self.qcp.proofs[addr])
+
+        self.flush()
+        self.count_cycles(self.end)
+        self.emit('qcp.pc = {}'.format(next_pc))
+        return '\n'.join(self.lines) + '\n'
+
+    def count_cycles(self, end):
+        'Add the cycles of the instructions up to the address `end` (excluded) to the cycle.'
+        if end > self.counted_end:
+            self.emit('qcp.cycle += {}'.format(end - self.counted_end))
+            self.counted_end = end
+
+    def sync_state(self, addr):
+        '''Write back the modified registers, and set the cycle and the PC as the decoded
+        engine does when executing the instruction at `addr`, which may raise.
+        '''
+        self.flush()
+        self.count_cycles(addr + 1)
+        self.emit('qcp.pc = {}'.format(addr))
+
+    def gen_callback(self, addr):
+        handler, operands = self.qcp.decoded_insns[addr]
+        # the callback sees the same state as in the decoded engine, e.g., when it aborts
+        # the shot by raising `Shot_rejected`
+        self.sync_state(addr)
+        self.emit('{}(*{})'.format(self.add_const(handler), self.add_const(operands)))
+        # the callback may have modified the architectural state
+        self.loaded_gprs = set()
+        self.loaded_fprs = set()
+
+    def gen_br(self, addr, insn):
+        flag = self.qcp.decode_cmp_flag(insn)
+        if insn.target_label in self.qcp.label_addr:
+            target = str(self.qcp.label_addr[insn.target_label])
+        else:
+            target = 'qcp.label_addr[{!r}]'.format(insn.target_label)
+
+        self.emit('if {}:'.format(self.cmp_flag_expr(flag)))
+        self.emit('    qcp.pc = {}'.format(target))
+        self.emit('else:')
+        self.emit('    qcp.pc = {}'.format(addr + 1))
+
+    def gen_cmp(self, insn):
+        # like the decoded engine, only record the operands, see `Quantum_control_processor.read_cmp_flag`
+        self.emit('ca = {}'.format(self.r(insn.rs)))
+        self.emit('cb = {}'.format(self.r(insn.rt)))
+        self.emit('qcp.cmp_operands = (ca, cb)')
+        self.cmp_in_block = True
+
+    def cmp_flag_expr(self, flag):
+        'Return the expression evaluating the comparison flag with the index `flag`.'
+        if not self.cmp_in_block:
+            return 'qcp.read_cmp_flag({})'.format(flag)
+
+        key = cmp_flag_names[flag]
+        if key == 'always':
+            return 'True'
+        if key == 'never':
+            return 'False'
+        if key in ['lt', 'ge', 'le', 'gt']:
+            return '_signed(ca) {} _signed(cb)'.format(op_symbol[cmp_op[key]])
+        return 'ca {} cb'.format(op_symbol[cmp_op[key]])
+
+    def mem_access(self, base, imm, proof, unit):
+        '''Return the memory method and the address expression of a load or store.
+
+        Accesses to a constant address proven in range use the unchecked methods.
+        '''
+        if proof is not None:
+            return '{}_unchecked'.format(unit), str(proof.mem_addr)
+        return '{}_uint'.format(unit), self.addr(base, imm)
+
+    def gen_insn(self, insn, proof=None):
+        name = insn.name
+        mask = GPR_MASK
+
+        if name in [eqasm_insn.NOP, eqasm_insn.QWAIT, eqasm_insn.QWAITR]:
+            self.emit('pass')
+
+        elif name == eqasm_insn.NOT:
+            self.set_r(insn.rd, '~{} & 0x{:x}'.format(self.r(insn.rt), mask))
+
+        elif name == eqasm_insn.CMP:
+            self.gen_cmp(insn)
+
+        elif name == eqasm_insn.FBR:
+            self.set_r(insn.rd, 'int({})'.format(self.cmp_flag_expr(self.qcp.decode_cmp_flag(insn))))
+
+        elif name == eqasm_insn.LDI:
+            self.set_r(insn.rd, str(insn.imm & mask))
+
+        elif name in int_op_template:
+            a = self.r(insn.rs)
+            b = self.r(insn.rt)
+            self.set_r(insn.rd, int_op_template[name].format(a=a, b=b, mask=mask))
+
+        elif name == eqasm_insn.LDUI:
+            self.set_r(insn.rd, '0x{:x} | ({} & 0x1ffff)'.format(
+                (insn.imm << 17) & mask, self.r(insn.rs)))
+
+        elif name == eqasm_insn.ADDI:
+            self.set_r(insn.rd, '({} + {}) & 0x{:x}'.format(self.r(insn.rs), insn.imm, mask))
+
+        elif name == eqasm_insn.LW:
+            self.set_r(insn.rd, 'mem.read_{}({})'.format(
+                *self.mem_access(insn.rt, insn.imm, proof, 'word')))
+
+        elif name == eqasm_insn.LB:
+            self.emit('b = mem.read_{}({})'.format(
+                *self.mem_access(insn.rt, insn.imm, proof, 'byte')))
+            self.set_r(insn.rd, '(b - ((b & 0x80) << 1)) & 0x{:x}'.format(mask))
+
+        elif name == eqasm_insn.LBU:
+            self.set_r(insn.rd, 'mem.read_{}({})'.format(
+                *self.mem_access(insn.rt, insn.imm, proof, 'byte')))
+
+        elif name == eqasm_insn.SW:
+            self.emit('mem.write_{}({}, {})'.format(
+                *self.mem_access(insn.rt, insn.imm, proof, 'word'), self.r(insn.rs)))
+
+        elif name == eqasm_insn.SB:
+            self.emit('mem.write_{}({}, {})'.format(
+                *self.mem_access(insn.rt, insn.imm, proof, 'byte'), self.r(insn.rs)))
+
+        elif name == eqasm_insn.SMIS:
+            if proof is None:
+                self.emit('qcp.qotrf.set_sq_reg({}, {})'.format(
+                    insn.si, self.add_const(insn.sq_list)))
+            else:
+                self.emit('qcp.qotrf.sq_regs[{}] = {}'.format(
+                    insn.si, self.add_const(self.qcp.qotrf.sq_target(insn.sq_list))))
+
+        elif name == eqasm_insn.SMIT:
+            if proof is None:
+                self.emit('qcp.qotrf.set_tq_reg({}, {})'.format(
+                    insn.ti, self.add_const(insn.tq_list)))
+            else:
+                self.emit('qcp.qotrf.tq_regs[{}] = {}'.format(
+                    insn.ti, self.add_const(self.qcp.qotrf.tq_target(insn.tq_list))))
+
+        elif name == eqasm_insn.FCVT_W_S:
+            self.set_r(insn.rd, 'int(_float({})) & 0x{:x}'.format(self.f(insn.fs), mask))
+
+        elif name == eqasm_insn.FCVT_S_W:
+            self.set_f(insn.fd, '_bits(float(_signed({})))'.format(self.r(insn.rs)))
+
+        elif name == eqasm_insn.FMV_W_X:
+            self.set_f(insn.fd, self.r(insn.rs))
+
+        elif name == eqasm_insn.FMV_X_W:
+            self.set_r(insn.rd, self.f(insn.fs))
+
+        elif name == eqasm_insn.FLW:
+            self.set_f(insn.fd, 'mem.read_{}({})'.format(
+                *self.mem_access(insn.rs, insn.imm, proof, 'word')))
+
+        elif name == eqasm_insn.FSW:
+            self.emit('mem.write_{}({}, {})'.format(
+                *self.mem_access(insn.rs, insn.imm, proof, 'word'), self.f(insn.fs)))
+
+        elif name in fp_op_symbol:
+            self.set_f(insn.fd, '_bits(_float({}) {} _float({}))'.format(
+                self.f(insn.fs), fp_op_symbol[name], self.f(insn.ft)))
+
+        elif name in fp_cmp_symbol:
+            self.set_r(insn.rd, 'int(_float({}) {} _float({}))'.format(
+                self.f(insn.fs), fp_cmp_symbol[name], self.f(insn.ft)))
+
+        else:
+            raise ValueError("Found undefined instruction ({}).".format(insn))
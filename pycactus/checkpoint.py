@@ -0,0 +1,240 @@
+'''Saving the complete machine state of a QCP to a file, and restoring it.
+
+A checkpoint holds everything needed to continue a program bit-exactly: the control
+state, the GPRs and FPRs, the comparison flags, the QOTRF, the data memory, and the state
+of the qubit state simulator including its random number generator. The same file can
+also warm-start other programs from a prepared state, see `load_checkpoint`.
+
+File format (all integers little-endian):
+  - `MAGIC` and the 16-bit `FORMAT_VERSION`;
+  - sections, each made of a 8-bit name length, the name in ASCII, a 64-bit payload size
+    and the payload:
+    - 'meta': JSON object with the control state, the QOTRF and the export history;
+    - 'gpr', 'fpr': the unsigned 32-bit content of each register;
+    - 'memory': zlib-compressed 32-bit indices of the pages holding non-zero bytes,
+      followed by these pages. Zero pages are not stored;
+    - 'qubits_meta', 'qubits': the qubit state exported by the simulator, as a JSON object
+      and the NumPy arrays saved by `numpy.savez`. Absent without a simulator.
+'''
+import hashlib
+import io
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+import numpy as np
+from .memory import PAGE_BITS, PAGE_SIZE
+from .utils import get_logger
+import pycactus.global_config as gc
+
+logger = get_logger((__name__).split('.')[-1])
+logger.setLevel(logging.WARNING)
+
+MAGIC = b'PYCACKPT'
+FORMAT_VERSION = 1
+# the number of cycles run between two looks at the clock by `run_with_checkpoints`
+TIME_CHECK_CYCLES = 1000
+
+_header = struct.Struct('<8sH')
+_section_size = struct.Struct('<Q')
+
+
+def program_fingerprint(insns):
+    'Return a digest identifying the program `insns`.'
+    digest = hashlib.sha256()
+    for insn in insns:
+        digest.update(insn.insn_str().encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def encode_memory(mem):
+    '''Return the section storing the non-zero pages of the memory `mem`.'''
+    data = np.frombuffer(mem, dtype=np.uint8)
+    num_pages = (len(data) + PAGE_SIZE - 1) >> PAGE_BITS
+    padded = np.zeros(num_pages << PAGE_BITS, dtype=np.uint8)
+    padded[:len(data)] = data
+    pages = padded.reshape(num_pages, PAGE_SIZE)
+    used = np.flatnonzero(pages.any(axis=1)).astype('<u4')
+    return zlib.compress(used.tobytes() + pages[used].tobytes(), 1), len(used)
+
+
+def decode_memory(payload, mem, num_pages: int):
+    '''Write the pages stored by `encode_memory` into the memory `mem`, zeroing the others.'''
+    raw = zlib.decompress(payload)
+    used = np.frombuffer(raw, dtype='<u4', count=num_pages)
+    pages = np.frombuffer(raw, dtype=np.uint8, offset=4 * num_pages)
+    data = np.frombuffer(mem, dtype=np.uint8)
+    data[:] = 0
+    for i, page in enumerate(used):
+        start = int(page) << PAGE_BITS
+        end = min(start + PAGE_SIZE, len(data))
+        data[start:end] = pages[i * PAGE_SIZE:i * PAGE_SIZE + end - start]
+
+
+def write_sections(f, sections):
+    f.write(_header.pack(MAGIC, FORMAT_VERSION))
+    for name, payload in sections:
+        f.write(bytes([len(name)]) + name.encode('ascii'))
+        f.write(_section_size.pack(len(payload)))
+        f.write(payload)
+
+
+def read_sections(f):
+    header = f.read(_header.size)
+    if len(header) < _header.size or _header.unpack(header)[0] != MAGIC:
+        raise ValueError("The file is not a pycactus checkpoint.")
+    version = _header.unpack(header)[1]
+    if version != FORMAT_VERSION:
+        raise ValueError("Unsupported checkpoint format version {} (supported: "
+                         "{}).".format(version, FORMAT_VERSION))
+
+    sections = {}
+    while True:
+        name_len = f.read(1)
+        if len(name_len) == 0:
+            return sections
+        name = f.read(name_len[0]).decode('ascii')
+        size = _section_size.unpack(f.read(_section_size.size))[0]
+        payload = f.read(size)
+        if len(payload) != size:
+            raise ValueError("The checkpoint is truncated in the section '{}'.".format(name))
+        sections[name] = payload
+
+
+def save_checkpoint(qcp, path):
+    '''Write the complete machine state of the QCP `qcp` into the file `path`.
+
+    The file is written next to `path` and then renamed, so that `path` always holds a
+    complete checkpoint, even if the process is killed while writing.
+    '''
+    qotrf_sq, qotrf_tq = qcp.qotrf.save_state()
+    memory, num_pages = encode_memory(qcp.data_mem.get_entire_mem())
+    meta = {
+        'program': program_fingerprint(qcp.insn_mem),
+        'num_qubits': qcp._num_available_qubits,
+        'pc': qcp.pc,
+        'cycle': qcp.cycle,
+        'stop_bit': qcp.stop_bit,
+        'cmp_flags': [bool(flag) for flag in qcp.cmp_flags],
+        'cmp_operands': None if qcp.cmp_operands is None else list(qcp.cmp_operands),
+        'msmt_result': [int(result) for result in qcp.msmt_result],
+        'sq_regs': [None if target is None else list(target.qubits) for target in qotrf_sq],
+        'tq_regs': [None if target is None else [list(pair) for pair in target.qubits]
+                    for target in qotrf_tq],
+        'mem_size': qcp.data_mem.size,
+        'mem_pages': num_pages,
+        'export_history': list(qcp.data_mem.export_history),
+        'time': time.time()
+    }
+
+    gprs = np.array([qcp.read_gpr_uint(i) for i in range(gc.NUM_GPR)], dtype='<u4')
+    fprs = np.array([qcp.fprf.read_bits(i) for i in range(gc.NUM_FPR)], dtype='<u4')
+    sections = [('meta', json.dumps(meta).encode()),
+                ('gpr', gprs.tobytes()),
+                ('fpr', fprs.tobytes()),
+                ('memory', memory)]
+
+    if qcp.qubit_state_sim is not None:
+        qubits_meta, arrays = qcp.qubit_state_sim.export_state()
+        buf = io.BytesIO()
+        np.savez(buf, **arrays)
+        sections += [('qubits_meta', json.dumps(qubits_meta).encode()),
+                     ('qubits', buf.getvalue())]
+
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'wb') as f:
+        write_sections(f, sections)
+    os.replace(tmp_path, path)
+    logger.info("Saved a checkpoint at cycle %d into %s.", qcp.cycle, path)
+
+
+def load_checkpoint(qcp, path, warm_start=False):
+    '''Restore the machine state saved by `save_checkpoint` in the file `path` into `qcp`.
+
+    Args:
+    - `qcp` (Quantum_control_processor): the QCP to restore, with the program uploaded.
+    - `path`: the checkpoint file.
+    - `warm_start` (bool): if `False`, the checkpoint must come from the same program, which
+      then continues exactly where it was saved. Otherwise, the uploaded program can be any
+      program, which starts from the beginning with the saved registers, QOTRF, data memory
+      and qubits.
+    '''
+    with open(path, 'rb') as f:
+        sections = read_sections(f)
+    meta = json.loads(sections['meta'])
+
+    if meta['num_qubits'] != qcp._num_available_qubits:
+        raise ValueError("The checkpoint has {} qubits, but the QCP has {}.".format(
+            meta['num_qubits'], qcp._num_available_qubits))
+    if meta['mem_size'] != qcp.data_mem.size:
+        raise ValueError("The checkpoint has a data memory of {} bytes, but the QCP has "
+                         "{} bytes.".format(meta['mem_size'], qcp.data_mem.size))
+    if not warm_start and meta['program'] != program_fingerprint(qcp.insn_mem):
+        raise ValueError("The checkpoint {} was saved from another program.".format(path))
+    if 'qubits' in sections and qcp.qubit_state_sim is None:
+        raise ValueError("The checkpoint has a qubit state, but the QCP has no qubit state "
+                         "simulator.")
+
+    qcp.restart()
+    if not warm_start:
+        qcp.pc = meta['pc']
+        qcp.cycle = meta['cycle']
+        qcp.stop_bit = meta['stop_bit']
+        qcp.cmp_flags[:] = meta['cmp_flags']
+        qcp.cmp_operands = (None if meta['cmp_operands'] is None
+                            else tuple(meta['cmp_operands']))
+        qcp.msmt_result[:] = meta['msmt_result']
+
+    for i, value in enumerate(np.frombuffer(sections['gpr'], dtype='<u4')):
+        qcp.gprf.write_uint(i, int(value))
+    for i, bits in enumerate(np.frombuffer(sections['fpr'], dtype='<u4')):
+        qcp.fprf.write_bits(i, int(bits))
+
+    qotrf = qcp.qotrf
+    qotrf.restore_state(
+        ([None if qubits is None else qotrf.sq_target(qubits) for qubits in meta['sq_regs']],
+         [None if pairs is None else qotrf.tq_target([tuple(pair) for pair in pairs])
+          for pairs in meta['tq_regs']]))
+
+    data_mem = qcp.data_mem
+    image = bytearray(data_mem.size)
+    decode_memory(sections['memory'], image, meta['mem_pages'])
+    data_mem.write_bytes(0, image)
+    data_mem.export_history[:] = meta['export_history']
+
+    if 'qubits' in sections:
+        with np.load(io.BytesIO(sections['qubits']), allow_pickle=False) as arrays:
+            qcp.qubit_state_sim.import_state(json.loads(sections['qubits_meta']),
+                                             dict(arrays))
+    elif qcp.qubit_state_sim is not None:
+        qcp.qubit_state_sim.reset()
+
+    logger.info("Loaded the checkpoint %s at cycle %d.", path, meta['cycle'])
+
+
+def run_with_checkpoints(qcp, path, every_cycles=None, every_seconds=None):
+    '''Run the program of `qcp` until it is finished, saving a checkpoint into `path` every
+    `every_cycles` cycles and/or every `every_seconds` seconds, and once at the end. With
+    both periods, a checkpoint is saved when either is due.
+    '''
+    if every_cycles is None and every_seconds is None:
+        raise ValueError("Give the checkpoint period in cycles and/or seconds.")
+    last_cycle = qcp.cycle
+    last_time = time.monotonic()
+
+    while True:
+        # with a period in seconds, check the time every `TIME_CHECK_CYCLES` cycles
+        num_cycles = TIME_CHECK_CYCLES if every_seconds is not None else every_cycles
+        if every_cycles is not None:
+            num_cycles = max(1, min(num_cycles, last_cycle + every_cycles - qcp.cycle))
+        if qcp.step(num_cycles):
+            break
+        if ((every_cycles is not None and qcp.cycle - last_cycle >= every_cycles) or
+                (every_seconds is not None and time.monotonic() - last_time >= every_seconds)):
+            save_checkpoint(qcp, path)
+            last_cycle = qcp.cycle
+            last_time = time.monotonic()
+    save_checkpoint(qcp, path)
@@ -0,0 +1,454 @@
+'''Distribution of the shots of an uploaded program over shot workers on several machines.
+
+A shot worker (`Shot_worker`) is a process serving one coordinator at a time on a TCP
+port. The coordinator (`Distributed_shot_executor`) connects to all workers, ships them
+the program with the initial state of the QCP, and hands out chunks of shots to the
+workers as they become free. As with `Parallel_shot_executor`, the results only depend on
+the seed, not on how the shots are distributed.
+
+Protocol: every message is a 4-byte type, the 64-bit little-endian size of the payload,
+and the payload.
+  - 'HASH' (coordinator): the key of the program and initial state. The worker replies
+    'HAVE' if it holds them from a previous run, otherwise 'NEED';
+  - 'PROG' (coordinator): the worker configuration as a JSON object, with the
+    instructions as their fields, followed by the data memory encoded by
+    `checkpoint.encode_memory`, see `encode_program`. The worker replies 'OK  ', or 'ERR '
+    with the error message;
+  - 'RUN ' (coordinator): a JSON object with the first shot, the number of shots, the seed
+    and the memory regions to record. The worker replies 'RSLT' with the results packed by
+    `pack_result`, or 'ERR ' with the error message;
+  - 'BYE ' (coordinator): end of the session.
+
+Nothing sent by a coordinator is unpickled or executed as code: the workers only create
+the qubit state simulators listed in `worker_sims`. Still, any coordinator reaching a
+worker can use it, so a worker only listens on the loopback interface unless given
+another host.
+
+`Local_workers` starts workers on the local host, which stands in for a cluster in tests.
+'''
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import queue
+import socket
+import struct
+import sys
+import threading
+import numpy as np
+from functools import partial
+from .checkpoint import encode_memory, decode_memory
+from .insn import Instruction, Quantum_op, eqasm_insn
+from .parallel import Parallel_shot_executor, build_worker_qcp
+from .qubit_state_sim.quantumsim import Quantumsim
+from .shots import Post_selection, Shot_result
+from .utils import get_logger
+
+logger = get_logger((__name__).split('.')[-1])
+logger.setLevel(logging.WARNING)
+
+_message_header = struct.Struct('<4sQ')
+_program_header = struct.Struct('<QQQ')
+_result_header = struct.Struct('<QQ')
+
+# the qubit state simulators the workers can create, by name
+worker_sims = {
+    'quantumsim': Quantumsim
+}
+
+
+def send_message(f, msg_type: bytes, payload=b''):
+    f.write(_message_header.pack(msg_type, len(payload)))
+    f.write(payload)
+    f.flush()
+
+
+def recv_message(f):
+    '''Return the type and the payload of the next message read from `f`, or `(None, b'')`
+    if the connection is closed.
+    '''
+    header = f.read(_message_header.size)
+    if len(header) < _message_header.size:
+        return None, b''
+    msg_type, size = _message_header.unpack(header)
+    payload = f.read(size)
+    if len(payload) < size:
+        raise ConnectionError("The connection was closed in the middle of a message.")
+    return msg_type, payload
+
+
+def encode_insn(insn):
+    '''Return the fields of the instruction `insn` as a JSON object.'''
+    fields = {field: value for field, value in vars(insn).items() if value is not None}
+    fields['name'] = insn.name.name
+    if insn.name == eqasm_insn.BUNDLE:
+        fields['q_ops'] = [[q_op.name, q_op.sreg, q_op.treg] for q_op in insn.q_ops]
+    return fields
+
+
+def decode_insn(fields):
+    '''Return the instruction encoded by `encode_insn` in `fields`.'''
+    fields = dict(fields)
+    name = eqasm_insn[fields.pop('name')]
+    if name == eqasm_insn.BUNDLE:
+        fields['q_ops'] = [Quantum_op(op_name, sreg=sreg, treg=treg)
+                           for op_name, sreg, treg in fields['q_ops']]
+    if fields.get('tq_list') is not None:
+        fields['tq_list'] = [tuple(pair) for pair in fields['tq_list']]
+    return Instruction(name, check=False, **fields)
+
+
+def sim_name(new_sim):
+    '''Return the name in `worker_sims` of the simulators created by `new_sim`, see
+    `If_qubit_sim.instance_factory`, or `None` without simulator.
+    '''
+    if new_sim is None:
+        return None
+    for name, sim_class in worker_sims.items():
+        if getattr(new_sim, 'func', None) is sim_class:
+            return name
+    raise ValueError("The qubit state simulator cannot be created by shot workers, which "
+                     "support: {}.".format(list(worker_sims.keys())))
+
+
+def encode_program(config):
+    '''Return the payload of the 'PROG' message shipping the worker configuration `config`,
+    see `Parallel_shot_executor.worker_config`.
+    '''
+    new_sim, num_qubits, qcp_kwargs, insns, states, post_selection, mem_image = config
+    head = {
+        'sim': sim_name(new_sim),
+        'num_qubits': num_qubits,
+        'qcp_kwargs': qcp_kwargs,
+        'insns': [encode_insn(insn) for insn in insns],
+        'states': states,
+        'post_selection': None if post_selection is None else {
+            'msmt_values': list(post_selection.msmt_values.items()),
+            'word_rejects': post_selection.word_rejects}
+    }
+    head = json.dumps(head).encode()
+    memory, num_pages = encode_memory(mem_image)
+    return _program_header.pack(len(head), len(mem_image), num_pages) + head + memory
+
+
+def decode_program(payload):
+    '''Return the worker configuration shipped by `encode_program` in `payload`.'''
+    head_size, mem_size, num_pages = _program_header.unpack_from(payload)
+    start = _program_header.size
+    head = json.loads(payload[start:start + head_size])
+
+    if head['sim'] is None:
+        new_sim = None
+    elif head['sim'] in worker_sims:
+        new_sim = partial(worker_sims[head['sim']], head['num_qubits'])
+    else:
+        raise ValueError("Unknown qubit state simulator: {}.".format(head['sim']))
+    post_selection = None
+    if head['post_selection'] is not None:
+        post_selection = Post_selection()
+        for qubit, value in head['post_selection']['msmt_values']:
+            post_selection.require_msmt(qubit, value)
+        for addr, value, mask in head['post_selection']['word_rejects']:
+            post_selection.reject_word(addr, value, mask)
+
+    mem_image = bytearray(mem_size)
+    decode_memory(payload[start + head_size:], mem_image, num_pages)
+    return (new_sim, head['num_qubits'], head['qcp_kwargs'],
+            [decode_insn(fields) for fields in head['insns']], head['states'],
+            post_selection, mem_image)
+
+
+def pack_result(result):
+    '''Return the results of `result` as bytes: the measurement results and the accepted
+    flags packed into bits, the cycles, and the recorded memory regions in order.
+    '''
+    num_shots, num_qubits = result.msmt_results.shape
+    parts = [_result_header.pack(num_shots, num_qubits),
+             np.packbits(result.msmt_results, axis=None).tobytes(),
+             np.packbits(result.accepted).tobytes(),
+             result.cycles.astype('<i8').tobytes()]
+    parts += [data.tobytes() for data in result.mem_regions.values()]
+    return b''.join(parts)
+
+
+def unpack_result(payload, mem_regions, seed):
+    num_shots, num_qubits = _result_header.unpack_from(payload)
+    result = Shot_result(num_shots, num_qubits, mem_regions)
+    result.seed = seed
+    offset = _result_header.size
+
+    num_bytes = (num_shots * num_qubits + 7) // 8
+    bits = np.frombuffer(payload, dtype=np.uint8, count=num_bytes, offset=offset)
+    result.msmt_results[:] = np.unpackbits(
+        bits, count=num_shots * num_qubits).reshape(num_shots, num_qubits)
+    offset += num_bytes
+
+    num_bytes = (num_shots + 7) // 8
+    bits = np.frombuffer(payload, dtype=np.uint8, count=num_bytes, offset=offset)
+    result.accepted[:] = np.unpackbits(bits, count=num_shots)
+    offset += num_bytes
+
+    result.cycles[:] = np.frombuffer(payload, dtype='<i8', count=num_shots, offset=offset)
+    offset += 8 * num_shots
+
+    for (addr, size), data in result.mem_regions.items():
+        data[:] = np.frombuffer(payload, dtype=np.uint8, count=num_shots * size,
+                                offset=offset).reshape(num_shots, size)
+        offset += num_shots * size
+    return result
+
+
+class Shot_worker():
+    def __init__(self, host='127.0.0.1', port=0, max_programs=4):
+        '''Worker process running the chunks of shots sent by a coordinator.
+
+        Args:
+        - `host`, `port`: the address to listen on. The port 0 picks a free port, which is
+          then given by `address`.
+        - `max_programs` (int): the number of programs kept for later runs, so that the
+          same program is not shipped again.
+        '''
+        self.sock = socket.create_server((host, port))
+        self.address = self.sock.getsockname()[:2]
+        self.max_programs = max_programs
+        # QCPs with an uploaded program and initial state, by the key sent in 'HASH'
+        self.qcps = {}
+
+    def serve_forever(self):
+        '''Serve coordinators one after the other, until `close` is called.'''
+        logger.info("Shot worker listening on %s:%d.", *self.address)
+        while True:
+            try:
+                conn, peer = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                logger.info("Serving the coordinator at %s:%d.", *peer[:2])
+                try:
+                    self.serve(conn.makefile('rwb'))
+                except (ConnectionError, OSError) as e:
+                    logger.warning("Lost the coordinator at %s:%d: %s", *peer[:2], e)
+
+    def serve(self, f):
+        qcp = None
+        key = None
+        while True:
+            msg_type, payload = recv_message(f)
+            if msg_type is None or msg_type == b'BYE ':
+                return
+
+            if msg_type == b'HASH':
+                key = payload
+                qcp = self.qcps.get(key)
+                send_message(f, b'HAVE' if qcp is not None else b'NEED')
+
+            elif msg_type == b'PROG':
+                try:
+                    qcp = build_worker_qcp(decode_program(payload))
+                except Exception as e:
+                    qcp = None
+                    send_message(f, b'ERR ', '{}: {}'.format(type(e).__name__, e).encode())
+                    continue
+                if len(self.qcps) >= self.max_programs:
+                    del self.qcps[next(iter(self.qcps))]
+                self.qcps[key] = qcp
+                send_message(f, b'OK  ')
+
+            elif msg_type == b'RUN ':
+                try:
+                    if qcp is None:
+                        raise ValueError("No program was shipped before running shots.")
+                    chunk = json.loads(payload)
+                    result = qcp.run_shots(chunk['num_shots'],
+                                           [tuple(region) for region in chunk['mem_regions']],
+                                           seed=chunk['seed'], first_shot=chunk['first_shot'])
+                except Exception as e:
+                    send_message(f, b'ERR ', '{}: {}'.format(type(e).__name__, e).encode())
+                else:
+                    send_message(f, b'RSLT', pack_result(result))
+
+            else:
+                send_message(f, b'ERR ', 'Unknown message {}.'.format(msg_type).encode())
+
+    def close(self):
+        self.sock.close()
+
+
+def _run_local_worker(conn):
+    worker = Shot_worker()
+    conn.send(worker.address)
+    conn.close()
+    worker.serve_forever()
+
+
+class Local_workers():
+    def __init__(self, num_workers: int, mp_context=None):
+        '''Start `num_workers` shot worker processes on the local host. Use as a context
+        manager; the workers are terminated on exit.
+
+        Attributes:
+        - `addresses` (list): the `(host, port)` address of each worker.
+        '''
+        ctx = multiprocessing.get_context(mp_context)
+        self.processes = []
+        self.addresses = []
+        for i in range(num_workers):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_run_local_worker, args=(child_conn,), daemon=True)
+            process.start()
+            self.processes.append(process)
+            self.addresses.append(tuple(parent_conn.recv()))
+
+    def close(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Distributed_shot_executor():
+    def __init__(self, qcp, workers, chunk_size=None, timeout=None):
+        '''Executor running the shots of the program uploaded to `qcp` on shot workers.
+
+        Args:
+        - `qcp` (Quantum_control_processor): the QCP with the uploaded program. Its
+          registers and data memory at the time of `run_shots` are the initial state of
+          every shot, see `Parallel_shot_executor`.
+        - `workers` (list): the `(host, port)` address of each `Shot_worker`.
+        - `chunk_size` (int): the number of shots sent to a worker at once. By default, the
+          shots are split into four chunks per worker to balance the load.
+        - `timeout` (float): the timeout in seconds of the socket operations.
+        '''
+        if len(workers) == 0:
+            raise ValueError("At least one shot worker is needed.")
+        self.qcp = qcp
+        self.workers = list(workers)
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+    def ship_program(self, f, key, program):
+        send_message(f, b'HASH', key)
+        msg_type = recv_message(f)[0]
+        if msg_type not in (b'HAVE', b'NEED'):
+            raise ConnectionError("The worker did not answer the program key.")
+        if msg_type == b'NEED':
+            send_message(f, b'PROG', program)
+            msg_type, payload = recv_message(f)
+            if msg_type != b'OK  ':
+                raise RuntimeError("The worker did not accept the program: {}".format(
+                    payload.decode(errors='replace')))
+
+    def run_worker(self, address, key, program, chunks, results, mem_regions, seed):
+        '''Run chunks taken from the queue `chunks` on the worker at `address` until the
+        queue is empty, storing the result of the chunk `i` into `results[i]`.
+        '''
+        with socket.create_connection(address, timeout=self.timeout) as sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            f = sock.makefile('rwb')
+            self.ship_program(f, key, program)
+            while True:
+                try:
+                    chunk = chunks.get_nowait()
+                except queue.Empty:
+                    break
+                i, first, num_shots = chunk
+                request = dict(first_shot=first, num_shots=num_shots,
+                               mem_regions=mem_regions, seed=seed)
+                try:
+                    send_message(f, b'RUN ', json.dumps(request).encode())
+                    msg_type, payload = recv_message(f)
+                    if msg_type != b'RSLT':
+                        raise RuntimeError("The worker {}:{} failed to run shots: {}".format(
+                            *address, payload.decode(errors='replace')))
+                except Exception:
+                    # leave the chunk to the other workers
+                    chunks.put(chunk)
+                    raise
+                results[i] = unpack_result(payload, mem_regions, seed)
+            send_message(f, b'BYE ')
+
+    def run_shots(self, num_shots: int, mem_regions=(), seed=None):
+        '''Run the uploaded program `num_shots` times over the shot workers.
+
+        Args:
+        - `num_shots` (int): the number of shots.
+        - `mem_regions` (list): `(addr, size)` pairs of data memory regions to record after
+          each shot.
+        - `seed` (int): the seed of the run. If not given, a random seed is drawn, which is
+          available as the `seed` of the result to reproduce the run.
+
+        Return:
+        - a `Shot_result` holding the results of all shots in order.
+        '''
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        mem_regions = [tuple(region) for region in mem_regions]
+        # check the regions before shipping anything
+        Shot_result(0, self.qcp._num_available_qubits, mem_regions, self.qcp.data_mem.size)
+
+        num_workers = len(self.workers)
+        chunk_size = self.chunk_size
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(num_shots / (4 * num_workers)))
+        chunks = queue.Queue()
+        for i, first in enumerate(range(0, num_shots, chunk_size)):
+            chunks.put((i, first, min(chunk_size, num_shots - first)))
+        results = [None] * chunks.qsize()
+        if len(results) == 0:
+            result = Shot_result(0, self.qcp._num_available_qubits, mem_regions)
+            result.seed = seed
+            return result
+
+        program = encode_program(Parallel_shot_executor(self.qcp).worker_config())
+        key = hashlib.sha256(program).digest()
+        logger.info("Running %d shots in %d chunks over %d workers.",
+                    num_shots, len(results), num_workers)
+
+        errors = []
+
+        def run(address):
+            try:
+                self.run_worker(address, key, program, chunks, results, mem_regions, seed)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(address,)) for address in self.workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # the chunk of a failed worker is lost if the other workers have already finished
+        if any(result is None for result in results):
+            raise RuntimeError("Shots could not be run on the workers: {}".format(
+                '; '.join(str(e) for e in errors)))
+        for e in errors:
+            logger.warning("A shot worker failed: %s", e)
+        return Shot_result.merge(results)
+
+
+def main(argv):
+    '''Start a shot worker: `python -m pycactus.distributed [--host HOST] [--port PORT]`.'''
+    parser = argparse.ArgumentParser(description="Run a pycactus shot worker.")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="the interface to listen on, by default the loopback interface "
+                        "only. Use e.g. 0.0.0.0 to accept coordinators from other machines, "
+                        "which must then be trusted.")
+    parser.add_argument('--port', type=int, default=5555)
+    args = parser.parse_args(argv)
+    worker = Shot_worker(args.host, args.port)
+    print("Shot worker listening on {}:{}.".format(*worker.address))
+    worker.serve_forever()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -130,24 +130,27 @@ class Eqasm_lexer(object):
     def t_HEX(self, t):
         r'0x[0-9a-fA-F]+'
         # t.type = 'DECIMAL'
-        logger_lex.debug('lex: [hex string: {}, value: {}]'.format(
-            t.value, int(t.value, base=16)))
+        if logger_lex.isEnabledFor(logging.DEBUG):
+            logger_lex.debug('lex: [hex string: {}, value: {}]'.format(
+                t.value, int(t.value, base=16)))
         t.value = int(t.value, base=16)
         return t
 
     def t_BINARY(self, t):
         r'0b[01]+'
         # t.type = 'DECIMAL'
-        logger_lex.debug('lex: [bin string: {}, value: {}]'.format(
-            t.value, int(t.value, base=2)))
+        if logger_lex.isEnabledFor(logging.DEBUG):
+            logger_lex.debug('lex: [bin string: {}, value: {}]'.format(
+                t.value, int(t.value, base=2)))
         t.value = int(t.value, base=2)
         return t
 
     def t_DECIMAL(self, t):
         r'[-]?\d+'
         t.value = int(t.value)
-        logger_lex.debug('lex: [DECIMAL string: {}, value: {}]'.format(
-            t.value, int(t.value)))
+        if logger_lex.isEnabledFor(logging.DEBUG):
+            logger_lex.debug('lex: [DECIMAL string: {}, value: {}]'.format(
+                t.value, int(t.value)))
 
         return t
 
@@ -158,16 +161,18 @@ class Eqasm_lexer(object):
     def t_RREG(self, t):
         r'r\d+'
         t.type = 'RREG'
-        logger_lex.debug('lex: [RREG: {}, value: {}]'.format(
-            t.value, int(t.value[1:])))
+        if logger_lex.isEnabledFor(logging.DEBUG):
+            logger_lex.debug('lex: [RREG: {}, value: {}]'.format(
+                t.value, int(t.value[1:])))
         t.value = int(t.value[1:])
         return t  # if no return, this token is thrown away
 
     def t_FReg(self, t):
         r'f\d+'
         t.type = 'FREG'
-        logger_lex.debug('lex: [FReg: {}, value: {}]'.format(
-            t.value, int(t.value[1:])))
+        if logger_lex.isEnabledFor(logging.DEBUG):
+            logger_lex.debug('lex: [FReg: {}, value: {}]'.format(
+                t.value, int(t.value[1:])))
         t.value = int(t.value[1:])
 
         return t
@@ -175,8 +180,9 @@ class Eqasm_lexer(object):
     def t_QReg(self, t):
         r'q\d+'
         t.type = 'QREG'
-        logger_lex.debug('lex: [QReg: {}, value: {}]'.format(
-            t.value, int(t.value[1:])))
+        if logger_lex.isEnabledFor(logging.DEBUG):
+            logger_lex.debug('lex: [QReg: {}, value: {}]'.format(
+                t.value, int(t.value[1:])))
         t.value = int(t.value[1:])
 
         return t
@@ -184,16 +190,18 @@ class Eqasm_lexer(object):
     def t_SReg(self, t):
         r's\d+'
         t.type = 'SREG'
-        logger_lex.debug('lex: [SReg: {}, value: {}]'.format(
-            t.value, int(t.value[1:])))
+        if logger_lex.isEnabledFor(logging.DEBUG):
+            logger_lex.debug('lex: [SReg: {}, value: {}]'.format(
+                t.value, int(t.value[1:])))
         t.value = int(t.value[1:])
         return t
 
     def t_TReg(self, t):
         r't\d+'
         t.type = 'TREG'
-        logger_lex.debug('lex: [TReg: {}, value: {}]'.format(
-            t.value, int(t.value[1:])))
+        if logger_lex.isEnabledFor(logging.DEBUG):
+            logger_lex.debug('lex: [TReg: {}, value: {}]'.format(
+                t.value, int(t.value[1:])))
         t.value = int(t.value[1:])
         return t
 
@@ -203,7 +211,8 @@ class Eqasm_lexer(object):
         # print('found token: {}'.format(t.value))
         t.type = self.reserved.get(t.value, 'IDENTIFIER')
         # print('token type: {}'.format(t.type))
-        logger_lex.debug('lex: [{}: {}]'.format(t.type, t.value))
+        if logger_lex.isEnabledFor(logging.DEBUG):
+            logger_lex.debug('lex: [{}: {}]'.format(t.type, t.value))
         return t
 
     def t_STRING(self, t):
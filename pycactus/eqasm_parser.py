@@ -57,7 +57,7 @@ class Eqasm_parser:
             else:
                 p[1].append(p[2])
             p[0] = p[1]
-        logger_yacc.info("program, _label_addr: {}".format(self._label_addr))
+        logger_yacc.info("program, _label_addr: %s", self._label_addr)
 
     def p_instruction(self, p):
         '''instruction : NEWLINE
@@ -66,8 +66,7 @@ class Eqasm_parser:
                        | label_decl statement NEWLINE
         '''
         p[0] = p[1]
-        logger_yacc.info(
-            "instruction, _label_addr: {}".format(self._label_addr))
+        logger_yacc.info("instruction, _label_addr: %s", self._label_addr)
 
     def p_statement(self, p):
         '''statement : classic_statement
@@ -185,57 +184,57 @@ class Eqasm_parser:
 
         p[0] = insn = Instruction(eqasm_insn.NOP, lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_dumpmem(self, p):  # dumpmem imm
         'insn_dumpmem : DUMPMEM imm STRING'
         p[0] = insn = Instruction(eqasm_insn.DUMPMEM, imm=p[2], cmp_flag=p[3], lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_stop(self, p):  # stop
         'insn_stop : STOP'
 
         p[0] = insn = Instruction(eqasm_insn.STOP, lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_qwait(self, p):  # qwait u_imm
         'insn_qwait : QWAIT imm'
         p[0] = insn = Instruction(eqasm_insn.QWAIT, imm=p[2], lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_qwaitr(self, p):  # qwaitr rs
         'insn_qwaitr : QWAITR r_reg'
         p[0] = insn = Instruction(eqasm_insn.QWAITR, rs=p[2], lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_not(self, p):  # not rd, rt
         'insn_not : NOT r_reg COMMA r_reg'
         p[0] = insn = Instruction(eqasm_insn.NOT, rd=p[2], rt=p[4], lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_cmp(self, p):
         'insn_cmp : CMP r_reg COMMA r_reg'
         p[0] = insn = Instruction(eqasm_insn.CMP, rs=p[2], rt=p[4], lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_fmr(self, p):  # fmr rd, qs
         'insn_fmr : FMR r_reg COMMA q_reg'
 
         p[0] = insn = Instruction(eqasm_insn.FMR, rd=p[2], qs=p[4], lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_ldi(self, p):  # ldi rd, imm
         'insn_ldi : LDI r_reg COMMA imm'
         p[0] = insn = Instruction(eqasm_insn.LDI, rd=p[2], imm=p[4], lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_ldui(self, p):  # ldui rd, rs, u_imm
         '''insn_ldui : LDUI r_reg COMMA r_reg COMMA imm
@@ -252,7 +251,7 @@ class Eqasm_parser:
         p[0] = insn = Instruction(eqasm_insn.LDUI, rd=rd, rs=rs, imm=imm, lineno=p.lineno(1))
 
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_ld(self, p):  # lw/lb/lbu rd, imm10(rt)
         '''insn_ld : LW r_reg COMMA imm LPAREN r_reg RPAREN
@@ -271,7 +270,7 @@ class Eqasm_parser:
 
         self._instructions.append(insn)
         p[0] = insn
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_st(self, p):  # sw/sb rs, imm10(rt)
         '''insn_st : SW r_reg COMMA imm LPAREN r_reg RPAREN
@@ -286,7 +285,7 @@ class Eqasm_parser:
             assert(False)
         p[0] = insn
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_br(self, p):
         'insn_br : BR cond COMMA offset_to_label'
@@ -301,7 +300,7 @@ class Eqasm_parser:
         self._instructions.append(insn)
         p[0] = insn
 
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_goto(self, p):
         '''insn_goto : GOTO offset_to_label
@@ -309,7 +308,7 @@ class Eqasm_parser:
         p[0] = insn = Instruction(eqasm_insn.BR, cmp_flag='always',
                                   target_label=p[2], lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_brn(self, p):
         '''insn_brn : BRN offset_to_label
@@ -317,7 +316,7 @@ class Eqasm_parser:
         p[0] = insn = Instruction(eqasm_insn.BR, cmp_flag='never',
                                   target_label=p[2], lineno=p.lineno(1))
         self._instructions.append(insn)
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_bcond(self, p):
         '''insn_bcond : BEQ r_reg COMMA r_reg COMMA offset_to_label
@@ -337,7 +336,7 @@ class Eqasm_parser:
         self._instructions.append(insn0)
         self._instructions.append(insn1)
         p[0] = [insn0, insn1]
-        logger_yacc.info("Insn added: {}, {}".format(insn0, insn1))
+        logger_yacc.info("Insn added: %s, %s", insn0, insn1)
 
     def p_insn_fbr(self, p):
         'insn_fbr : FBR cond COMMA r_reg'
@@ -360,7 +359,7 @@ class Eqasm_parser:
         p[0] = insn
         self._instructions.append(insn)
 
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_addi(self, p):
         'insn_addi : ADDI r_reg COMMA r_reg COMMA imm'
@@ -368,7 +367,7 @@ class Eqasm_parser:
         p[0] = insn
         self._instructions.append(insn)
 
-        logger_yacc.info("Insn added: {}".format(insn))
+        logger_yacc.info("Insn added: %s", insn)
 
     def p_insn_smis(self, p):
         'insn_smis : SMIS s_reg COMMA s_mask'
@@ -376,7 +375,7 @@ class Eqasm_parser:
         insn = Instruction(eqasm_insn.SMIS, si=p[2], sq_list=p[4], lineno=p.lineno(1))
         self._instructions.append(insn)
         p[0] = insn
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     def p_insn_smit(self, p):
         'insn_smit : SMIT t_reg COMMA t_mask'
@@ -384,7 +383,7 @@ class Eqasm_parser:
         insn = Instruction(eqasm_insn.SMIT, ti=p[2], tq_list=p[4], lineno=p.lineno(1))
         self._instructions.append(insn)
         p[0] = insn
-        logger_yacc.info("Insn added: {}".format(p[0]))
+        logger_yacc.info("Insn added: %s", p[0])
 
     # ---------------------------------------------------------------------
     # quantum instruction elements
@@ -410,7 +409,7 @@ class Eqasm_parser:
         else:
             p[1].append(p[3])
             p[0] = p[1]
-        logger_yacc.debug('quantum_instructions: {}'.format(p[0]))
+        logger_yacc.debug('quantum_instructions: %s', p[0])
 
     def p_quantum_instruction(self, p):
         '''quantum_instruction : nq_op
@@ -418,24 +417,24 @@ class Eqasm_parser:
                             | tq_op
         '''
         p[0] = p[1]
-        logger_yacc.debug('p_quantum_instruction: {}'.format(p[0]))
+        logger_yacc.debug('p_quantum_instruction: %s', p[0])
 
     def p_nq_op(self, p):
         'nq_op : QNOP'
         p[0] = Quantum_op('QNOP')
-        logger_yacc.debug('nq_op: {}'.format(p[0]))
+        logger_yacc.debug('nq_op: %s', p[0])
 
     def p_sq_op(self, p):
         '''sq_op : IDENTIFIER s_reg
         '''
         p[0] = Quantum_op(p[1], sreg=p[2])
-        logger_yacc.debug('sq_op: {}'.format(p[0]))
+        logger_yacc.debug('sq_op: %s', p[0])
 
     def p_tq_op(self, p):
         '''tq_op : IDENTIFIER t_reg
         '''
         p[0] = Quantum_op(p[1], treg=p[2])
-        logger_yacc.debug('tq_op: {}'.format(p[0]))
+        logger_yacc.debug('tq_op: %s', p[0])
 
     # ---------------------------------------------------------------------
     # parsing elements
@@ -474,13 +473,13 @@ class Eqasm_parser:
             # p[0] = list(p[1]).append(p[3])
             p[1].append(p[3])
             p[0] = p[1]
-        logger_yacc.debug("single_qubit_list: {}".format(p[0]))
+        logger_yacc.debug("single_qubit_list: %s", p[0])
 
     def p_s_mask(self, p):
         's_mask : LBRACE single_qubit_list RBRACE'
 
         p[0] = p[2]
-        logger_yacc.debug("s_mask: {}".format(p[0]))
+        logger_yacc.debug("s_mask: %s", p[0])
 
     def p_qubit_pair(self, p):
         '''qubit_pair : LPAREN integer COMMA integer RPAREN'''
@@ -488,7 +487,7 @@ class Eqasm_parser:
         # pycactus_debug('p_qubit_pair:', end='')
 
         p[0] = (p[2], p[4])
-        logger_yacc.debug("qubit_pair: {}".format(p[0]))
+        logger_yacc.debug("qubit_pair: %s", p[0])
 
     def p_two_qubit_list(self, p):
         '''two_qubit_list : qubit_pair
@@ -501,20 +500,20 @@ class Eqasm_parser:
         else:
             p[1].append(p[3])
             p[0] = p[1]
-        logger_yacc.debug("two_qubit_list: {}".format(p[0]))
+        logger_yacc.debug("two_qubit_list: %s", p[0])
 
     def p_t_mask(self, p):
         't_mask : LBRACE two_qubit_list RBRACE'
 
         p[0] = p[2]
-        logger_yacc.debug("t_mask: {}".format(p[0]))
+        logger_yacc.debug("t_mask: %s", p[0])
 
     def p_imm(self, p):
         '''imm : integer
         '''
 
         p[0] = p[1]
-        logger_yacc.debug("imm: {}".format(p[0]))
+        logger_yacc.debug("imm: %s", p[0])
 
     def p_integer(self, p):
         '''integer : BINARY
@@ -528,8 +527,8 @@ class Eqasm_parser:
 
         label = p[1]
         self._label_addr[label] = len(self._instructions)
-        logger_yacc.info("found label: {}".format(label))
-        logger_yacc.info("_label_addr: {}".format(self._label_addr))
+        logger_yacc.info("found label: %s", label)
+        logger_yacc.info("_label_addr: %s", self._label_addr)
         p[0] = label
 
     def p_offset_to_label(self, p):
@@ -537,12 +536,12 @@ class Eqasm_parser:
 
         label = p[1]
         p[0] = label
-        logger_yacc.info("target label: {}".format(label))
+        logger_yacc.info("target label: %s", label)
 
     # def p_string(self, p):
     #     'string : STRING'
     #     p[0] = p[1]
-    #     logger_yacc.info("found string: {}".format(p[2]))
+    #     logger_yacc.info("found string: %s", p[2])
 
     def p_cond(self, p):
         '''cond : COND_ALWAYS
@@ -560,7 +559,7 @@ class Eqasm_parser:
         '''
 
         p[0] = p[1]
-        logger_yacc.info("condition: {}".format(p[0]))
+        logger_yacc.info("condition: %s", p[0])
 
     def p_error(self, p):
         if not p:
@@ -1,6 +1,8 @@
+import struct
+from array import array
 from bitstring import BitArray
 import pycactus.global_config as gc
-from pycactus.utils import get_logger
+from pycactus.utils import get_logger, Instance_logger
 from .bit_array_cell import Bit_array_cell, Register_file
 
 logger = get_logger((__name__).split('.')[-1])
@@ -53,9 +55,137 @@ class Floating_point_register(Bit_array_cell):
         return result
 
 
+_float32 = struct.Struct('<f')
+_uint32 = struct.Struct('<I')
+
+
 class FPRF(Register_file):
     def __init__(self, num_fpr=32, fpr_width=32):
         super().__init__(Floating_point_register, num_reg=num_fpr, reg_width=fpr_width)
 
+    @staticmethod
+    def bits_to_float(bits: int):
+        return _float32.unpack(_uint32.pack(bits))[0]
+
+    @staticmethod
+    def float_to_bits(value: float):
+        'Round `value` to single precision, raising OverflowError as `BitArray` does.'
+        return _uint32.unpack(_float32.pack(value))[0]
+
     def read_float(self, fs: int):
         return self.regs[fs].float()
+
+    def write_float(self, fd: int, value: float):
+        self.write(fd, BitArray(float=value, length=32))
+
+    def read_bits(self, fs: int):
+        '''Return the IEEE 754 bit pattern of the register `fs` as an unsigned integer.'''
+        return self.regs[fs].uint
+
+    def write_bits(self, fd: int, bits: int):
+        '''Update the register `fd` with the IEEE 754 bit pattern `bits`.'''
+        self.write(fd, BitArray(uint=bits, length=32))
+
+    def save_state(self):
+        '''Return the bit patterns of all registers, which can be restored by `restore_state`.'''
+        return [self.read_bits(i) for i in range(len(self.regs))]
+
+    def restore_state(self, state):
+        for i, bits in enumerate(state):
+            self.write_bits(i, bits)
+
+
+class Packed_FPRF():
+    def __init__(self, num_fpr=32, fpr_width=32):
+        '''Floating point register file backed by one contiguous float32 buffer.
+
+        Values written with `write_float` are rounded to IEEE single precision, and values
+        too large to be represented raise OverflowError, as in `FPRF`. The same memory is also exposed as unsigned 32-bit words through
+        `bits`, so that moves between registers and memory copy the raw bit patterns
+        without any conversion.
+        '''
+        if fpr_width != 32:
+            raise ValueError("The packed FP register file only supports 32-bit registers,"
+                             " but {} bits are required.".format(fpr_width))
+        self.reg_symbol = Floating_point_register.reg_symbol()
+        self.logger = Instance_logger(logger)
+        self.floats = array('f', [0.0] * num_fpr)
+        # views on the same buffer, which read and write the raw bytes and bit patterns
+        self._bytes = memoryview(self.floats).cast('B')
+        self.bits = self._bytes.cast('I')
+
+    @staticmethod
+    def bits_to_float(bits: int):
+        return _float32.unpack(_uint32.pack(bits))[0]
+
+    @staticmethod
+    def float_to_bits(value: float):
+        'Round `value` to single precision, raising OverflowError as `FPRF` does.'
+        return _uint32.unpack(_float32.pack(value))[0]
+
+    def set_log_level(self, level):
+        self.logger.setLevel(level)
+
+    def set_log_handler(self, handler):
+        self.logger.set_handler(handler)
+
+    def __str__(self):
+        '''Dump the content of the entire register file.'''
+        my_str = ''
+        for i, value in enumerate(self.floats):
+            my_str += '{:>15}  '.format(self.reg_symbol + str(i) + ': ' + str(value))
+            if i % 8 == 7:
+                my_str += '\n'
+        return my_str
+
+    def dump(self):
+        'Dump the content of the entire register file.'
+        print(self.__str__())
+
+    def print_reg(self, reg_num):
+        'Print the content of a single register indicated by the register number `reg_num`.'
+        print("{}: {:>8}, value: {:>11}".format(
+            "{}".format(reg_num), '0x{:08x}'.format(self.bits[reg_num]),
+            str(self.floats[reg_num])))
+
+    def read_float(self, fs: int):
+        return self.floats[fs]
+
+    def write_float(self, fd: int, value: float):
+        # converted by `struct`, which raises OverflowError where the buffer would store inf
+        self.bits[fd] = _uint32.unpack(_float32.pack(value))[0]
+
+    def read_bits(self, fs: int):
+        '''Return the IEEE 754 bit pattern of the register `fs` as an unsigned integer.'''
+        return self.bits[fs]
+
+    def write_bits(self, fd: int, bits: int):
+        '''Update the register `fd` with the IEEE 754 bit pattern `bits`.'''
+        self.bits[fd] = bits
+
+    def save_state(self):
+        '''Return the raw content of all registers, which can be restored by `restore_state`.'''
+        return self._bytes.tobytes()
+
+    def restore_state(self, state):
+        self._bytes[:] = state
+
+    def read(self, reg_num: int):
+        '''Return the value of the register `reg_num` as a BitArray.'''
+        return BitArray(uint=self.bits[reg_num], length=32)
+
+    def write(self, reg_dst: int, value: BitArray):
+        '''Update the target register `reg_dst` with the BitArray `value`.'''
+        self.bits[reg_dst] = value.uint
+
+    def __getitem__(self, reg_num: int):
+        reg = Floating_point_register(32)
+        reg.update_value(self.read(reg_num))
+        return reg
+
+
+# register file implementations which can be selected when constructing the QCP
+fprf_backends = {
+    'bitarray': FPRF,
+    'packed': Packed_FPRF
+}
@@ -1,6 +1,7 @@
+import logging
 from bitstring import BitArray
 import pycactus.global_config as gc
-from pycactus.utils import get_logger
+from pycactus.utils import get_logger, Instance_logger
 from .bit_array_cell import Bit_array_cell, Register_file
 
 logger = get_logger((__name__).split('.')[-1])
@@ -96,3 +97,99 @@ class GPRF(Register_file):
 
     def read_unsigned(self, rs: int):
         return self.regs[rs].uint
+
+    def write_uint(self, rd: int, value: int):
+        '''Update the register `rd` with the integer `value`, truncated to the register width.'''
+        width = len(self.regs[rd])
+        self.write(rd, BitArray(uint=value & ((1 << width) - 1), length=width))
+
+    def save_state(self):
+        '''Return the values of all registers, which can be restored by `restore_state`.'''
+        return [self.read_unsigned(i) for i in range(len(self.regs))]
+
+    def restore_state(self, state):
+        for i, value in enumerate(state):
+            self.write_uint(i, value)
+
+
+class Int_GPRF():
+    def __init__(self, num_gpr=32, gpr_width=32):
+        '''General purpose register file storing each register as a plain Python integer.
+
+        Registers hold the unsigned value of their bit pattern, and all arithmetic wraps
+        around modulo `2 ** gpr_width`, as in two's complement hardware. This file offers
+        the same interface as `GPRF`, without allocating a `BitArray` per operation.
+        '''
+        self.reg_symbol = General_purpose_register.reg_symbol()
+        self.logger = Instance_logger(logger)
+        self.width = gpr_width
+        self.mask = (1 << gpr_width) - 1
+        self.sign_bit = 1 << (gpr_width - 1)
+        # unsigned values of all registers
+        self.values = [0] * num_gpr
+
+    def set_log_level(self, level):
+        self.logger.setLevel(level)
+
+    def set_log_handler(self, handler):
+        self.logger.set_handler(handler)
+
+    def __str__(self):
+        '''Dump the content of the entire register file.'''
+        my_str = ''
+        for i in range(len(self.values)):
+            my_str += '{:>15}  '.format(self.reg_symbol + str(i) + ': ' +
+                                        str(self.read_signed(i)))
+            if i % 8 == 7:
+                my_str += '\n'
+        return my_str
+
+    def dump(self):
+        'Dump the content of the entire register file.'
+        print(self.__str__())
+
+    def print_reg(self, rd):
+        print("{}: {:>8}, uint: {:>11d}, int: {:>11d}".format(
+            "r{}".format(rd), '0x{:08x}'.format(self.values[rd]), self.values[rd],
+            self.read_signed(rd)))
+
+    def read_signed(self, rs: int):
+        return (self.values[rs] ^ self.sign_bit) - self.sign_bit
+
+    def read_unsigned(self, rs: int):
+        return self.values[rs]
+
+    def write_uint(self, rd: int, value: int):
+        '''Update the register `rd` with the integer `value`, truncated to the register width.'''
+        if self.logger.level is logging.DEBUG:
+            self.logger.debug("{:>3s}  <--  {} ({}).\n".format(
+                'r{}'.format(rd), hex(value & self.mask), value))
+        self.values[rd] = value & self.mask
+
+    def write(self, reg_dst: int, value: BitArray):
+        '''Update the target register `reg_dst` with the BitArray `value`.'''
+        self.write_uint(reg_dst, value.uint)
+
+    def save_state(self):
+        '''Return the values of all registers, which can be restored by `restore_state`.'''
+        return list(self.values)
+
+    def restore_state(self, state):
+        # update in place, since translated blocks may hold a reference to `values`
+        self.values[:] = state
+
+    def read(self, reg_num: int):
+        '''Return the value of the register `reg_num` as a BitArray.'''
+        return BitArray(uint=self.values[reg_num], length=self.width)
+
+    def __getitem__(self, reg_num: int):
+        reg = General_purpose_register(self.width)
+        reg.update_value(self.read(reg_num))
+        return reg
+
+
+# register file implementations which can be selected when constructing the QCP
+gprf_backends = {
+    'bitarray': GPRF,
+    'int': Int_GPRF
+}
@@ -222,11 +222,31 @@ cmp_op = {
 }
 
 
+class Qop_kind(Enum):
+    NULL = auto()  # without target register, e.g., QNOP
+    GATE = auto()  # single-qubit gate
+    MEASURE = auto()
+    CZ = auto()
+    UNSUPPORTED = auto()  # two-qubit operations other than CZ
+
+
+def classify_qop(name, sreg, treg):
+    'Return the `Qop_kind` of a quantum operation.'
+    if sreg is not None:
+        return Qop_kind.MEASURE if name.lower() in ['measure', 'measz'] else Qop_kind.GATE
+    if treg is not None:
+        # currently only support CZ operation
+        return Qop_kind.CZ if name.lower() == 'cz' else Qop_kind.UNSUPPORTED
+    return Qop_kind.NULL
+
+
 class Quantum_op():
     def __init__(self, name='QNOP', **kwargs):
         self.name = name
         self.sreg = kwargs.pop('sreg', None)
         self.treg = kwargs.pop('treg', None)
+        # classified once, so that executing the operation needs no string processing
+        self.kind = classify_qop(name, self.sreg, self.treg)
 
     def __str__(self):
         if self.sreg is not None:
@@ -238,9 +258,19 @@ class Quantum_op():
 
 
 class Instruction():
-    def __init__(self, name=eqasm_insn.NOP, **kwargs):
-        logger.debug(
-            "constructing instruction: {} {}".format(name, str(kwargs)))
+    def __init__(self, name=eqasm_insn.NOP, check=True, **kwargs):
+        '''An eQASM instruction.
+
+        Args:
+        - `name` (eqasm_insn): the instruction.
+        - `check` (bool): check that all fields required by the instruction are given.
+          Instructions generated by the simulator itself, whose fields are known to be
+          complete, can skip the check.
+        - the fields of the instruction, see `eqasm_insn_fields`.
+        '''
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "constructing instruction: {} {}".format(name, str(kwargs)))
         self.name = name
         self.lineno = kwargs.pop('lineno', None)
         self.rd = kwargs.pop('rd', None)
@@ -279,7 +309,8 @@ class Instruction():
 
             self.q_ops = q_ops
 
-        self._check_fields()
+        if check:
+            self._check_fields()
 
     def _check_fields(self):
         'Check if the instruction has already all required fields.'
@@ -1,50 +1,233 @@
 import logging
+import struct
+import sys
+import weakref
+from multiprocessing import resource_tracker, shared_memory
 from types import prepare_class
+import numpy as np
 from bitstring import BitArray
 from .data_transfer import Data_transfer
-from .utils import get_logger
+from .utils import get_logger, Instance_logger
 logger = get_logger((__name__).split('.')[-1])
 
+# little-endian, unsigned 32-bit word
+_word = struct.Struct('<I')
+
+# the granularity of the dirty tracking used to reset the memory between shots
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+
+def _little_endian(dtype):
+    '''Return the little-endian version of the NumPy data type `dtype`.'''
+    dtype = np.dtype(dtype)
+    if dtype.byteorder == '>':
+        raise ValueError("Given data type ({}) is big-endian, but the memory is "
+                         "little-endian.".format(dtype))
+    return dtype.newbyteorder('<')
+
+
+def _as_bytes(buffer):
+    '''Return the bytes of `buffer`, any object supporting the buffer protocol, as a flat
+    `memoryview`, without copying when possible. NumPy arrays are stored little-endian.
+    '''
+    if isinstance(buffer, np.ndarray):
+        buffer = np.ascontiguousarray(buffer, dtype=buffer.dtype.newbyteorder('<'))
+    view = memoryview(buffer)
+    if not view.c_contiguous:
+        view = memoryview(view.tobytes())
+    return view.cast('B')
+
+
+def _signed(value, width):
+    sign_bit = 1 << (width - 1)
+    return (value ^ sign_bit) - sign_bit
+
 
 class Memory():
     def __init__(self, size: int = 1000000, parent_qcp=None):
         self.size = size
-        self._mem = bytearray(size)
         self.parent_qcp = parent_qcp
+        self.logger = Instance_logger(logger)
+        # whether every write is logged, cached from the level of `logger`
+        self.debug_on = self.logger.isEnabledFor(logging.DEBUG)
         self.export_history = []
         self.max_export_show_addr = 100
+        self._baseline = None
+        self._init_storage()
+
+    def _init_storage(self):
+        self._mem = self._allocate()
+        # the content of each page at the last snapshot or restore as immutable `bytes`,
+        # shared by the snapshots taking the same page, or `None` before the first snapshot
+        self._pages = None
+        # pages written since the last snapshot or restore
+        self.dirty_pages = set()
+        # the snapshot matching the content of the pages not in `dirty_pages`
+        self._synced = None
+
+    def _allocate(self):
+        '''Return the zeroed storage of the memory.'''
+        return bytearray(self.size)
+
+    def close(self):
+        '''Release the storage of the memory, which cannot be used afterwards.'''
+        pass
+
+    def snapshot(self):
+        '''Return a snapshot of the content and the export history, see `restore`.
+
+        Pages are shared copy-on-write: only the pages written since the last snapshot or
+        restore are copied, the others are shared with the previous snapshots.
+        '''
+        mem = self._mem
+        if self._pages is None:
+            self._pages = [bytes(mem[start:start + PAGE_SIZE])
+                           for start in range(0, self.size, PAGE_SIZE)]
+        else:
+            pages = self._pages
+            for page in self.dirty_pages:
+                start = page << PAGE_BITS
+                pages[page] = bytes(mem[start:start + PAGE_SIZE])
+        self.dirty_pages.clear()
+
+        snap = (tuple(self._pages), tuple(self.export_history))
+        self._synced = snap
+        return snap
+
+    def restore(self, snap):
+        '''Restore the content and the export history recorded by `snapshot` in `snap`.
+
+        When restoring the last snapshot taken or restored, only the pages written since are
+        copied back. Otherwise, the pages differing from `snap` are found by identity.
+        Writes bypassing the access methods, e.g., through `get_entire_mem`, are not tracked
+        and must be followed by `mark_dirty`.
+        '''
+        snap_pages, history = snap
+        mem = self._mem
+        if self._pages is None:
+            self._pages = list(snap_pages)
+            self.dirty_pages.update(range(len(snap_pages)))
+        pages = self._pages
+        if snap is self._synced:
+            changed = self.dirty_pages
+        else:
+            changed = self.dirty_pages.union(page for page, content in enumerate(pages)
+                                             if content is not snap_pages[page])
+        for page in changed:
+            start = page << PAGE_BITS
+            mem[start:start + PAGE_SIZE] = snap_pages[page]
+            pages[page] = snap_pages[page]
+        self.dirty_pages.clear()
+        self._synced = snap
+        self.export_history[:] = history
+
+    def capture_baseline(self):
+        '''Record the current content, which is restored by `reset_to_baseline`.'''
+        self._baseline = self.snapshot()
+
+    def reset_to_baseline(self):
+        '''Restore the content recorded by `capture_baseline`.'''
+        self.restore(self._baseline)
+
+    def clone(self):
+        '''Return a new memory with the same content and export history.'''
+        other = type(self)(self.size)
+        other.restore(self.snapshot())
+        return other
+
+    def mark_dirty(self, addr: int, size: int):
+        '''Mark the `size` bytes starting at `addr` as written.'''
+        self.dirty_pages.update(range(addr >> PAGE_BITS, ((addr + size - 1) >> PAGE_BITS) + 1))
 
     def final_dump(self):
         for msg in self.export_history:
             print(msg)
-            logger.debug(msg)
+            self.logger.debug(msg)
 
     def decode_data(self, addr, data_type):
-        logger.debug('decoding data at 0x{:x}'.format(addr))
+        self.logger.debug('decoding data at 0x{:x}'.format(addr))
         data_trans = Data_transfer()
-        data_trans.set_data_block(self._mem)
+        data_trans.set_data_block(self.get_entire_mem())
         pydata = data_trans.bin_to_pydata(data_type, addr)
-        logger.debug('value: {}'.format(pydata))
+        self.logger.debug('value: {}'.format(pydata))
 
     def dump_content(self, data_addr, data_type):
         start_addr = (data_addr // 16) * 16
         no_line_to_print = 4
         head = ''.join(['{:5x}'.format(i) for i in range(16)])
-        logger.debug(" addr:" + head)
-        logger.debug(
+        self.logger.debug(" addr:" + head)
+        self.logger.debug(
             '--------------------------------------------------------------------------------------')
         for line_no in range(no_line_to_print):
             start = '{:5x}:'.format(start_addr+line_no)
             cells = ''.join(['{:>5s}'.format('{:d}'.format(
-                self._mem[start_addr + offset + line_no*16]))
+                self.read_byte_uint(start_addr + offset + line_no*16)))
                 for offset in range(16)])
-            logger.debug(start + cells)
+            self.logger.debug(start + cells)
 
     def get_entire_mem(self):
+        '''Return the storage of the entire memory. Writes into it must be followed by
+        `mark_dirty`; `write_bytes` is preferred.
+        '''
         return self._mem
 
+    def read_bytes(self, addr: int, size: int):
+        '''Return the `size` bytes starting at `addr`.'''
+        self._check_range(addr, size)
+        return bytes(self._mem[addr:addr + size])
+
+    def write_bytes(self, addr: int, data):
+        '''Write the bytes `data` starting at `addr`.
+
+        This is meant for the host to preload data, and is not recorded in the export history.
+        '''
+        self._check_range(addr, len(data))
+        self._mem[addr:addr + len(data)] = data
+        if len(data) > 0:
+            self.mark_dirty(addr, len(data))
+
+    def view(self, addr: int, dtype, shape, writable: bool = True):
+        '''Return a NumPy array of type `dtype` and shape `shape` over the memory starting at
+        `addr`, without copying. Multi-byte values are little-endian.
+
+        The range is checked once, when creating the view. A writable view marks its range
+        as written, so that writes through it must happen before the next `snapshot` or
+        `restore`, or be followed by `mark_dirty`. Writes through a view are not recorded in
+        the export history.
+
+        Args:
+        - `addr` (int): the address of the first element.
+        - `dtype`: the NumPy data type of the elements, e.g., `'<u4'` or `np.float32`.
+        - `shape` (int or tuple): the shape of the array.
+        - `writable` (bool): if `False`, the array is read-only.
+        '''
+        dtype = _little_endian(dtype)
+        count = int(np.prod(shape))
+        self._check_range(addr, count * dtype.itemsize)
+        array = np.frombuffer(self._mem, dtype=dtype, count=count, offset=addr).reshape(shape)
+        if writable:
+            if count > 0:
+                self.mark_dirty(addr, count * dtype.itemsize)
+        else:
+            array.flags.writeable = False
+        return array
+
+    def load(self, addr: int, buffer):
+        '''Copy `buffer`, e.g., `bytes` or a NumPy array, into the memory starting at `addr`.
+        NumPy arrays are stored little-endian.
+
+        This is meant for the host to preload data, and is not recorded in the export history.
+        '''
+        self.write_bytes(addr, _as_bytes(buffer))
+
     def set_log_level(self, level):
-        logger.setLevel(level)
+        self.logger.setLevel(level)
+        self.debug_on = self.logger.isEnabledFor(logging.DEBUG)
+
+    def set_log_handler(self, handler):
+        self.logger.set_handler(handler)
 
     def _check_addr(self, addr):
         if addr < 0:
@@ -62,9 +245,35 @@ class Memory():
             raise ValueError("Given word address ({}) can cause memory access overflow. "
                              "Maximum memory address is ({}).".format(addr, self.size-1))
 
+    def _check_range(self, addr, size):
+        if addr < 0 or size < 0 or addr + size > self.size:
+            raise ValueError("Given range (addr: 0x{:x}, size: {}) exceeds the memory "
+                             "(size: {}).".format(addr, size, self.size))
+
+    def _log_write(self, addr, value, unit):
+        msg = "Memory write (addr: 0x{:x})  <--  ({}: 0x{:x}).\n".format(addr, unit, value)
+        self.logger.debug(msg)
+        if (addr < self.max_export_show_addr):
+            self.export_history.append(msg[:-1])
+
+    def read_byte_uint(self, addr: int):
+        '''Read the byte at `addr` as an unsigned integer.'''
+        if addr < 0 or addr >= self.size:
+            self._check_addr(addr)
+        return self._mem[addr]
+
+    def write_byte_uint(self, addr: int, value: int):
+        '''Write the lowest 8 bits of the integer `value` into the byte at `addr`.'''
+        if addr < self.max_export_show_addr or self.debug_on:
+            self._log_write(addr, _signed(value & 0xff, 8), 'byte')
+
+        if addr < 0 or addr >= self.size:
+            self._check_addr(addr)
+        self._mem[addr] = value & 0xff
+        self.dirty_pages.add(addr >> PAGE_BITS)
+
     def read_byte(self, addr):
-        self._check_addr(addr)
-        return BitArray(uint=self._mem[addr], length=8)
+        return BitArray(uint=self.read_byte_uint(addr), length=8)
 
     def write_byte(self, addr: int, val: BitArray):
         '''Write a byte into the memory.
@@ -72,13 +281,68 @@ class Memory():
           - addr (int): the address to write;
           - val (BitArray): an 8-bit bitstring.
         '''
-        msg = "Memory write (addr: 0x{:x})  <--  (byte: 0x{:x}).\n".format(addr, val.int)
-        logger.debug(msg)
-        if (addr < self.max_export_show_addr):
-            self.export_history.append(msg[:-1])
+        self.write_byte_uint(addr, val.uint)
+
+    def read_word_uint(self, addr: int):
+        '''Read the little-endian word starting at `addr` as an unsigned integer.'''
+        if addr < 0 or addr >= self.size - 3:
+            self._check_word_addr(addr)
+        return _word.unpack_from(self._mem, addr)[0]
+
+    def write_word_uint(self, addr: int, value: int):
+        '''Write the lowest 32 bits of the integer `value` as a little-endian word at `addr`.'''
+        if addr < 0 or addr >= self.size - 3:
+            self._check_word_addr(addr)
+
+        value &= 0xffffffff
+        if addr < self.max_export_show_addr or self.debug_on:
+            self._log_write(addr, _signed(value, 32), 'word')
+        _word.pack_into(self._mem, addr, value)
+        self.dirty_pages.add(addr >> PAGE_BITS)
+        self.dirty_pages.add((addr + 3) >> PAGE_BITS)
 
-        self._check_addr(addr)
-        self._mem[addr] = val.uint
+    def read_byte_unchecked(self, addr: int):
+        '''Like `read_byte_uint`, for an address statically proven to be in range.'''
+        return self._mem[addr]
+
+    def write_byte_unchecked(self, addr: int, value: int):
+        '''Like `write_byte_uint`, for an address statically proven to be in range.'''
+        if addr < self.max_export_show_addr or self.debug_on:
+            self._log_write(addr, _signed(value & 0xff, 8), 'byte')
+        self._mem[addr] = value & 0xff
+        self.dirty_pages.add(addr >> PAGE_BITS)
+
+    def read_word_unchecked(self, addr: int):
+        '''Like `read_word_uint`, for an address statically proven to be in range.'''
+        return _word.unpack_from(self._mem, addr)[0]
+
+    def write_word_unchecked(self, addr: int, value: int):
+        '''Like `write_word_uint`, for an address statically proven to be in range.'''
+        value &= 0xffffffff
+        if addr < self.max_export_show_addr or self.debug_on:
+            self._log_write(addr, _signed(value, 32), 'word')
+        _word.pack_into(self._mem, addr, value)
+        self.dirty_pages.add(addr >> PAGE_BITS)
+        self.dirty_pages.add((addr + 3) >> PAGE_BITS)
+
+    def read_words(self, addr: int, num: int):
+        '''Read `num` consecutive little-endian words starting at `addr`.
+
+        Return: a tuple of unsigned integers.
+        '''
+        self._check_range(addr, 4 * num)
+        return struct.unpack_from('<{}I'.format(num), self._mem, addr)
+
+    def write_words(self, addr: int, values):
+        '''Write a sequence of integers as consecutive little-endian words starting at `addr`.
+
+        This is meant for the host to preload data, and is not recorded in the export history.
+        '''
+        values = [value & 0xffffffff for value in values]
+        self._check_range(addr, 4 * len(values))
+        struct.pack_into('<{}I'.format(len(values)), self._mem, addr, *values)
+        if len(values) > 0:
+            self.mark_dirty(addr, 4 * len(values))
 
     def read_word(self, addr):
         '''Read four bytes from the memory with the starting address being `addr`.
@@ -95,9 +359,7 @@ class Memory():
         When we read the addr 0x4000, the word returned is 0x78563412.
         In other words, the least significant byte is put at the lowest address.
         '''
-        self._check_word_addr(addr)
-        return (self.read_byte(addr+3) + self.read_byte(addr+2) +
-                self.read_byte(addr+1) + self.read_byte(addr))
+        return BitArray(uint=self.read_word_uint(addr), length=32)
 
     def write_word(self, addr: int, val: BitArray):
         '''Write a word into the memory.
@@ -105,12 +367,276 @@ class Memory():
           - addr (int): the address to write;
           - val (BitArray): a 32-bit, little-endian bitstring.
         '''
-        self._check_word_addr(addr)
-        msg = "Memory write (addr: 0x{:x})  <--  (word: 0x{:x}).\n".format(addr, val.int)
-        logger.debug(msg)
-        if (addr < self.max_export_show_addr):
-            self.export_history.append(msg[:-1])
-        self._mem[addr+3] = (val[0:8]).uint
-        self._mem[addr+2] = (val[8:16]).uint
-        self._mem[addr+1] = (val[16:24]).uint
-        self._mem[addr] = (val[24:32]).uint
+        self.write_word_uint(addr, val.uint)
+
+
+class Paged_memory(Memory):
+    '''Memory allocating its pages on the first write, and sharing them copy-on-write.
+
+    The page table holds, for each page, `None` for a page never written, which reads as
+    zero, an immutable `bytes` shared with snapshots and clones, or a `bytearray` owned by
+    this memory. Writing into a shared page first copies it. Snapshots, `restore` and
+    `clone` only copy the page table, so that many snapshots or memories with the same
+    content cost little more than the pages written by each of them.
+    '''
+
+    def _init_storage(self):
+        self._page_table = [None] * ((self.size + PAGE_SIZE - 1) >> PAGE_BITS)
+        # the indices of the pages held as `bytearray`
+        self._owned = set()
+
+    def _own_page(self, page: int):
+        '''Return the page `page` as a `bytearray` owned by this memory.'''
+        data = self._page_table[page]
+        data = bytearray(PAGE_SIZE) if data is None else bytearray(data)
+        self._page_table[page] = data
+        self._owned.add(page)
+        return data
+
+    def num_allocated_pages(self):
+        return sum(data is not None for data in self._page_table)
+
+    def snapshot(self):
+        '''Return a snapshot of the content and the export history, see `restore`.
+
+        The pages written since the last snapshot are frozen into `bytes`, which are then
+        shared by this memory and the snapshot until the next write.
+        '''
+        table = self._page_table
+        for page in self._owned:
+            table[page] = bytes(table[page])
+        self._owned.clear()
+        return (tuple(table), tuple(self.export_history))
+
+    def restore(self, snap):
+        '''Restore the content and the export history recorded by `snapshot` in `snap`.'''
+        pages, history = snap
+        self._page_table[:] = pages
+        self._owned.clear()
+        self.export_history[:] = history
+
+    def mark_dirty(self, addr: int, size: int):
+        # writes are tracked by the page table
+        pass
+
+    def get_entire_mem(self):
+        '''Return a copy of the entire memory. Use `write_bytes` to modify the memory.'''
+        zero_page = bytes(PAGE_SIZE)
+        mem = bytearray().join(zero_page if data is None else data
+                               for data in self._page_table)
+        del mem[self.size:]
+        return mem
+
+    def read_bytes(self, addr: int, size: int):
+        self._check_range(addr, size)
+        table = self._page_table
+        chunks = []
+        end = addr + size
+        while addr < end:
+            page = addr >> PAGE_BITS
+            offset = addr & PAGE_MASK
+            num = min(PAGE_SIZE - offset, end - addr)
+            data = table[page]
+            chunks.append(bytes(num) if data is None else data[offset:offset + num])
+            addr += num
+        return b''.join(chunks)
+
+    def write_bytes(self, addr: int, data):
+        '''Write the bytes `data` starting at `addr`. Zero bytes falling into pages never
+        written are skipped, so that loading a whole memory image only allocates the pages
+        holding data.
+        '''
+        data = bytes(data)
+        self._check_range(addr, len(data))
+        table = self._page_table
+        pos = 0
+        while pos < len(data):
+            page = (addr + pos) >> PAGE_BITS
+            offset = (addr + pos) & PAGE_MASK
+            num = min(PAGE_SIZE - offset, len(data) - pos)
+            chunk = data[pos:pos + num]
+            if table[page] is not None or chunk.count(0) != num:
+                target = table[page]
+                if target.__class__ is not bytearray:
+                    target = self._own_page(page)
+                target[offset:offset + num] = chunk
+            pos += num
+
+    def view(self, addr: int, dtype, shape, writable: bool = True):
+        '''Return a NumPy array over the memory starting at `addr`, see `Memory.view`.
+
+        Only a range inside a single page can be viewed without copying. A writable view
+        owns its page, and writes through it are lost after the next `snapshot` or `restore`,
+        which may share or replace the page. A read-only view of a range spanning several
+        pages is a copy.
+        '''
+        dtype = _little_endian(dtype)
+        count = int(np.prod(shape))
+        size = count * dtype.itemsize
+        self._check_range(addr, size)
+        offset = addr & PAGE_MASK
+        if size > 0 and offset + size <= PAGE_SIZE:
+            page = addr >> PAGE_BITS
+            data = self._page_table[page]
+            if writable and data.__class__ is not bytearray:
+                data = self._own_page(page)
+            if data is not None:
+                array = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+                return array.reshape(shape)
+        elif writable and size > 0:
+            raise ValueError("Given range (addr: 0x{:x}, size: {}) spans several pages, and "
+                             "cannot be viewed as writable. Use `load` to write it.".format(
+                                 addr, size))
+        array = np.frombuffer(self.read_bytes(addr, size), dtype=dtype, count=count)
+        return array.reshape(shape)
+
+    def read_byte_uint(self, addr: int):
+        if addr < 0 or addr >= self.size:
+            self._check_addr(addr)
+        data = self._page_table[addr >> PAGE_BITS]
+        return 0 if data is None else data[addr & PAGE_MASK]
+
+    def write_byte_uint(self, addr: int, value: int):
+        if addr < self.max_export_show_addr or self.debug_on:
+            self._log_write(addr, _signed(value & 0xff, 8), 'byte')
+
+        if addr < 0 or addr >= self.size:
+            self._check_addr(addr)
+        data = self._page_table[addr >> PAGE_BITS]
+        if data.__class__ is not bytearray:
+            data = self._own_page(addr >> PAGE_BITS)
+        data[addr & PAGE_MASK] = value & 0xff
+
+    def read_word_uint(self, addr: int):
+        if addr < 0 or addr >= self.size - 3:
+            self._check_word_addr(addr)
+        offset = addr & PAGE_MASK
+        if offset > PAGE_SIZE - 4:
+            # the word spans two pages
+            return int.from_bytes(self.read_bytes(addr, 4), 'little')
+        data = self._page_table[addr >> PAGE_BITS]
+        return 0 if data is None else _word.unpack_from(data, offset)[0]
+
+    def write_word_uint(self, addr: int, value: int):
+        if addr < 0 or addr >= self.size - 3:
+            self._check_word_addr(addr)
+
+        value &= 0xffffffff
+        if addr < self.max_export_show_addr or self.debug_on:
+            self._log_write(addr, _signed(value, 32), 'word')
+        offset = addr & PAGE_MASK
+        if offset > PAGE_SIZE - 4:
+            self.write_bytes(addr, value.to_bytes(4, 'little'))
+            return
+        data = self._page_table[addr >> PAGE_BITS]
+        if data.__class__ is not bytearray:
+            data = self._own_page(addr >> PAGE_BITS)
+        _word.pack_into(data, offset, value)
+
+    def read_byte_unchecked(self, addr: int):
+        data = self._page_table[addr >> PAGE_BITS]
+        return 0 if data is None else data[addr & PAGE_MASK]
+
+    def write_byte_unchecked(self, addr: int, value: int):
+        self.write_byte_uint(addr, value)
+
+    def read_word_unchecked(self, addr: int):
+        return self.read_word_uint(addr)
+
+    def write_word_unchecked(self, addr: int, value: int):
+        self.write_word_uint(addr, value)
+
+    def read_words(self, addr: int, num: int):
+        return struct.unpack('<{}I'.format(num), self.read_bytes(addr, 4 * num))
+
+    def write_words(self, addr: int, values):
+        values = [value & 0xffffffff for value in values]
+        self.write_bytes(addr, struct.pack('<{}I'.format(len(values)), *values))
+
+
+def _attach_segment(name: str):
+    '''Return the existing shared memory segment `name`, which is not destroyed when this
+    process exits.
+    '''
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    segment = shared_memory.SharedMemory(name)
+    # before Python 3.13, attaching registers the segment to the resource tracker, which
+    # then destroys it when this process exits, see `Shared_memory.close`
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+def _release_segment(mem, segment, owner: bool):
+    '''Release the view `mem` of the shared memory segment `segment`, close the segment, and
+    destroy it if `owner`.
+    '''
+    mem.release()
+    segment.close()
+    if owner:
+        # the processes attached before Python 3.13 unregistered the segment, which the
+        # resource tracker shared by child processes expects to be registered
+        if sys.version_info < (3, 13):
+            resource_tracker.register(segment._name, 'shared_memory')
+        segment.unlink()
+
+
+class Shared_memory(Memory):
+    def __init__(self, size: int = 1000000, parent_qcp=None, name=None):
+        '''Memory stored in a named `multiprocessing.shared_memory` segment, which other
+        processes can read and write directly by attaching to it.
+
+        Args:
+        - `size` (int): the size of the memory in bytes.
+        - `name` (str): the `name` of the segment of another `Shared_memory` to attach to,
+          keeping its content. By default, a new zeroed segment is created.
+
+        The memory creating the segment owns it, and destroys it in `close`. The segment
+        remains available to the attached memories until then.
+        '''
+        self._segment_name = name
+        self.segment = None
+        super().__init__(size, parent_qcp)
+
+    def _allocate(self):
+        if self._segment_name is None:
+            self.segment = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+            self.owner = True
+        else:
+            self.segment = _attach_segment(self._segment_name)
+            self.owner = False
+            if self.segment.size < self.size:
+                self.segment.close()
+                raise ValueError("The shared memory segment {} ({} bytes) is smaller than "
+                                 "the memory ({} bytes).".format(self._segment_name,
+                                                                 self.segment.size, self.size))
+        mem = self.segment.buf[:self.size]
+        # the segment is also released when the memory is garbage collected
+        self._finalizer = weakref.finalize(self, _release_segment, mem, self.segment,
+                                           self.owner)
+        return mem
+
+    @property
+    def name(self):
+        '''The name of the segment, to attach to it from another process.'''
+        return self.segment.name
+
+    def close(self):
+        '''Detach from the segment, and destroy it if this memory created it.
+
+        Raises a `BufferError` while arrays returned by `view` are still referenced.
+        '''
+        if self.segment is None:
+            return
+        # a view prevents releasing the segment, check before detaching the finalizer
+        self._mem.release()
+        self._finalizer.detach()
+        _release_segment(self._mem, self.segment, self.owner)
+        self.segment = None
+
+
+memory_backends = {
+    'dense': Memory,
+    'paged': Paged_memory,
+    'shared': Shared_memory
+}
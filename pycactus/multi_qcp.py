@@ -0,0 +1,275 @@
+'''Several QCPs, each controlling its own group of qubits of a shared qubit state simulator.
+
+Each QCP of a `Multi_qcp` runs its own program on its own registers and data memory, and
+drives a disjoint group of qubits through a `Qubit_group_sim`, which maps the qubit numbers
+of the QCP onto the qubits of the shared simulator. The QCPs only synchronise when
+accessing the shared simulator, which is serialised by a lock, and every `sync_cycles`
+cycles, when the shared data memory region is exchanged between them.
+
+Since the groups are disjoint and each group samples its measurements from its own random
+number generator, the results do not depend on how the QCPs are interleaved: running the
+QCPs in parallel threads gives the same results as running them one after the other.
+
+The qubits of a group cannot be reset, saved or restored apart from the other groups. The
+QCPs of a `Multi_qcp` therefore reject the operations restoring their qubit state: shots,
+snapshots and baselines, and cannot be checkpointed. `Multi_qcp.reset` restarts all QCPs
+with all qubits reset.
+'''
+import logging
+import threading
+import numpy as np
+from .qcp import Quantum_control_processor
+from .qotr import Op_target
+from .qubit_state_sim.if_qubit_sim import If_qubit_sim
+from .qubit_state_sim.quantumsim import Quantumsim
+from .utils import get_logger
+
+logger = get_logger((__name__).split('.')[-1])
+logger.setLevel(logging.WARNING)
+
+
+class Qubit_group_sim(If_qubit_sim):
+    def __init__(self, backend, qubits, lock):
+        '''Proxy of the qubit state simulator `backend` restricted to the qubits `qubits`.
+
+        Args:
+        - `backend` (If_qubit_sim): the shared qubit state simulator.
+        - `qubits` (list): the qubit of `backend` controlled as each qubit of the proxy,
+          i.e., the qubit `i` of the proxy is the qubit `qubits[i]` of `backend`.
+        - `lock`: the lock held while accessing `backend`.
+        '''
+        super().__init__('group of {}'.format(backend.name))
+        self.backend = backend
+        self.qubits = tuple(qubits)
+        self.lock = lock
+        self.rng = None
+        # the targets of `backend` by the targets of the proxy
+        self._targets = {}
+
+    def map_target(self, target):
+        '''Return the `Op_target` of the backend qubits of `target`.'''
+        try:
+            return self._targets[target.qubits]
+        except KeyError:
+            pass
+        qubits = self.qubits
+        if len(target.qubits) > 0 and isinstance(target.qubits[0], tuple):
+            mapped = tuple((qubits[q0], qubits[q1]) for q0, q1 in target.qubits)
+        else:
+            mapped = tuple(qubits[qubit] for qubit in target.qubits)
+        # the simulators only use the qubits, the mask is kept from `target`
+        self._targets[target.qubits] = Op_target(target.mask, mapped)
+        return self._targets[target.qubits]
+
+    def reset(self):
+        raise NotImplementedError("The qubits of a group are reset with all qubits of the "
+                                  "shared simulator, see `Multi_qcp.reset`.")
+
+    def save_state(self):
+        raise NotImplementedError("The qubits of a group cannot be saved apart from the "
+                                  "other qubits of the shared simulator.")
+
+    def restore_state(self, state):
+        self.save_state()
+
+    def export_state(self):
+        self.save_state()
+
+    def import_state(self, meta, arrays):
+        self.save_state()
+
+    def set_rng(self, rng):
+        self.rng = rng
+
+    def apply_single_qubit_gate(self, operation, qubit):
+        with self.lock:
+            self.backend.apply_single_qubit_gate(operation, self.qubits[qubit])
+
+    def apply_two_qubit_gate(self, qubit0, qubit1):
+        with self.lock:
+            self.backend.apply_two_qubit_gate(self.qubits[qubit0], self.qubits[qubit1])
+
+    def measure_qubit(self, qubit):
+        with self.lock:
+            if self.rng is not None:
+                self.backend.set_rng(self.rng)
+            return self.backend.measure_qubit(self.qubits[qubit])
+
+    def apply_single_qubit_gate_to(self, operation, target):
+        target = self.map_target(target)
+        with self.lock:
+            self.backend.apply_single_qubit_gate_to(operation, target)
+
+    def apply_two_qubit_gate_to(self, target):
+        target = self.map_target(target)
+        with self.lock:
+            self.backend.apply_two_qubit_gate_to(target)
+
+    def prepare_gate(self, operation):
+        return self.backend.prepare_gate(operation)
+
+    def apply_prepared_gate_to(self, gate, target):
+        target = self.map_target(target)
+        with self.lock:
+            self.backend.apply_prepared_gate_to(gate, target)
+
+    def measure_qubits(self, target):
+        target = self.map_target(target)
+        with self.lock:
+            if self.rng is not None:
+                self.backend.set_rng(self.rng)
+            return self.backend.measure_qubits(target)
+
+
+class Qubit_group_qcp(Quantum_control_processor):
+    '''A QCP of a `Multi_qcp`, driving a `Qubit_group_sim`.
+
+    The operations restoring the qubit state of this QCP alone are rejected before changing
+    any state, since the qubits of its group cannot be reset apart from the other groups.
+    '''
+
+    def reject(self, operation):
+        raise NotImplementedError(
+            "A QCP of a Multi_qcp does not support `{}`, since its qubits cannot be reset "
+            "or saved apart from the other QCPs. Use `Multi_qcp.reset` to restart all "
+            "QCPs.".format(operation))
+
+    def snapshot(self, include_qubits=True):
+        self.reject('snapshot')
+
+    def capture_baseline(self):
+        self.reject('capture_baseline')
+
+    def run_shots(self, num_shots: int, mem_regions=(), seed=None, first_shot=0):
+        self.reject('run_shots')
+
+
+class Multi_qcp():
+    def __init__(self, qubit_groups, qubit_state_sim=None, shared_region=None,
+                 sync_cycles=1000, seed=None, **qcp_kwargs):
+        '''Several QCPs controlling disjoint groups of qubits of a shared simulator.
+
+        Args:
+        - `qubit_groups` (list): the qubits of the shared simulator controlled by each QCP.
+          The QCP `i` controls the qubit `qubit_groups[i][j]` as its qubit `j`.
+        - `qubit_state_sim` (If_qubit_sim): the shared qubit state simulator. By default, a
+          `Quantumsim` simulator with all qubits of the groups.
+        - `shared_region` (tuple): the `(addr, size)` data memory region shared by all QCPs.
+          The bytes written into the region by a QCP become visible to the other QCPs at the
+          next synchronisation. If several QCPs write the same byte between two
+          synchronisations, the QCP with the highest index wins.
+        - `sync_cycles` (int): the number of cycles between two synchronisations.
+        - `seed` (int): if given, the measurements of each group are sampled from their own
+          random stream, given by `np.random.SeedSequence(seed, spawn_key=(group,))`.
+        - `qcp_kwargs`: the other arguments of each `Quantum_control_processor`.
+        '''
+        all_qubits = [qubit for group in qubit_groups for qubit in group]
+        if len(set(all_qubits)) != len(all_qubits):
+            raise ValueError("The qubit groups ({}) are not disjoint.".format(qubit_groups))
+        if sync_cycles <= 0:
+            raise ValueError("The synchronisation period ({}) must be positive.".format(
+                sync_cycles))
+        if qubit_state_sim is None:
+            qubit_state_sim = Quantumsim(max(all_qubits) + 1)
+
+        self.qubit_state_sim = qubit_state_sim
+        self.lock = threading.Lock()
+        self.sync_cycles = sync_cycles
+        self.qcps = []
+        for i, group in enumerate(qubit_groups):
+            group_sim = Qubit_group_sim(qubit_state_sim, group, self.lock)
+            if seed is not None:
+                group_sim.set_rng(np.random.default_rng(
+                    np.random.SeedSequence(seed, spawn_key=(i,))))
+            self.qcps.append(Qubit_group_qcp(
+                group_sim, num_available_qubits=len(group), **qcp_kwargs))
+
+        self.shared_region = shared_region
+        if shared_region is not None:
+            addr, size = shared_region
+            if addr < 0 or size <= 0 or addr + size > self.qcps[0].data_mem.size:
+                raise ValueError("Given shared region (addr: 0x{:x}, size: {}) is out of "
+                                 "the data memory.".format(addr, size))
+            # the content of the region at the last synchronisation
+            self.shared = np.zeros(size, dtype=np.uint8)
+
+    def upload_programs(self, programs):
+        '''Upload the program `programs[i]`, a list of instructions, to the QCP `i`.'''
+        if len(programs) != len(self.qcps):
+            raise ValueError("Given {} programs for {} QCPs.".format(
+                len(programs), len(self.qcps)))
+        return all([qcp.upload_program(insns) for qcp, insns in zip(self.qcps, programs)])
+
+    def reset(self):
+        '''Restart all programs and reset all qubits.'''
+        for qcp in self.qcps:
+            qcp.restart()
+        self.qubit_state_sim.reset()
+
+    def sync(self):
+        '''Exchange the shared data memory region between the QCPs.'''
+        if self.shared_region is None:
+            return
+        addr, size = self.shared_region
+        merged = self.shared.copy()
+        for qcp in self.qcps:
+            region = np.frombuffer(qcp.data_mem.read_bytes(addr, size), dtype=np.uint8)
+            changed = region != self.shared
+            merged[changed] = region[changed]
+        data = merged.tobytes()
+        for qcp in self.qcps:
+            qcp.data_mem.write_bytes(addr, data)
+        self.shared = merged
+
+    def read_shared(self):
+        '''Return the content of the shared region at the last synchronisation.'''
+        return bytes(self.shared)
+
+    def is_finished(self):
+        return all(qcp.is_finished() for qcp in self.qcps)
+
+    def run(self, use_threads=True):
+        '''Run the uploaded programs until all of them are finished.
+
+        Args:
+        - `use_threads` (bool): run each QCP in its own thread. Otherwise, the QCPs run in
+          turn in the calling thread. Both give the same results.
+        '''
+        self.sync()
+        if not use_threads:
+            while not self.is_finished():
+                for qcp in self.qcps:
+                    qcp.step(self.sync_cycles)
+                self.sync()
+            return True
+
+        finished = [self.is_finished()]
+        errors = []
+
+        def end_slice():
+            self.sync()
+            finished[0] = self.is_finished()
+
+        barrier = threading.Barrier(len(self.qcps), action=end_slice)
+
+        def run_qcp(qcp):
+            try:
+                while not finished[0]:
+                    qcp.step(self.sync_cycles)
+                    barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            except Exception as e:
+                errors.append(e)
+                barrier.abort()
+
+        threads = [threading.Thread(target=run_qcp, args=(qcp,)) for qcp in self.qcps]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(errors) > 0:
+            raise errors[0]
+
+        logger.info("The QCPs finished after %s cycles.", [qcp.cycle for qcp in self.qcps])
+        return True
@@ -0,0 +1,160 @@
+'''Parallel execution of the shots of an uploaded program over a pool of processes.
+
+Each worker process builds its own QCP and qubit state simulator once, from the program
+and the baseline state of the QCP given to `Parallel_shot_executor`, and then runs chunks
+of shots. Since the measurements of every shot are sampled from a random stream derived
+from the seed and the shot index only (see `shot_rng`), the merged results are identical
+for a given seed, whatever the number of workers and the chunk size.
+'''
+import math
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .memory import Shared_memory
+from .qcp import Quantum_control_processor
+from .shots import Shot_result
+from .utils import get_logger
+import pycactus.global_config as gc
+
+logger = get_logger((__name__).split('.')[-1])
+
+# the QCP of the current worker process
+_worker_qcp = None
+
+
+def build_worker_qcp(config):
+    '''Return a new QCP in the state described by `config`, see
+    `Parallel_shot_executor.worker_config`.
+    '''
+    new_sim, num_qubits, qcp_kwargs, insns, states, post_selection, mem_image = config
+
+    qubit_state_sim = new_sim() if new_sim is not None else None
+    qcp = Quantum_control_processor(qubit_state_sim, num_available_qubits=num_qubits,
+                                    **qcp_kwargs)
+    qcp.upload_program(insns)
+    qcp.set_post_selection(post_selection)
+
+    gprs, fprs, sq_regs, tq_regs = states
+    for i, value in enumerate(gprs):
+        qcp.gprf.write_uint(i, value)
+    for i, bits in enumerate(fprs):
+        qcp.fprf.write_bits(i, bits)
+    qotrf = qcp.qotrf
+    qotrf.restore_state(
+        ([None if qubits is None else qotrf.sq_target(qubits) for qubits in sq_regs],
+         [None if pairs is None else qotrf.tq_target([tuple(pair) for pair in pairs])
+          for pairs in tq_regs]))
+    if isinstance(mem_image, str):
+        # the name of the shared data memory of the parent QCP
+        source = Shared_memory(qcp.data_mem.size, name=mem_image)
+        try:
+            qcp.data_mem.write_bytes(0, source.get_entire_mem())
+        finally:
+            source.close()
+    else:
+        qcp.data_mem.write_bytes(0, mem_image)
+    return qcp
+
+
+def _init_worker(config):
+    global _worker_qcp
+    _worker_qcp = build_worker_qcp(config)
+
+
+def _run_chunk(first_shot, num_shots, mem_regions, seed):
+    return _worker_qcp.run_shots(num_shots, mem_regions, seed=seed, first_shot=first_shot)
+
+
+class Parallel_shot_executor():
+    def __init__(self, qcp, num_workers=None, chunk_size=None, mp_context=None):
+        '''Executor running the shots of the program uploaded to `qcp` in parallel.
+
+        Args:
+        - `qcp` (Quantum_control_processor): the QCP with the uploaded program. Its
+          registers and data memory at the time of `run_shots` are the initial state of
+          every shot. Each worker creates its own qubit state simulator by
+          `instance_factory` of the simulator of `qcp`.
+        - `num_workers` (int): the number of worker processes, by default the number of CPUs.
+        - `chunk_size` (int): the number of shots sent to a worker at once. By default, the
+          shots are split into four chunks per worker to balance the load.
+        - `mp_context`: the multiprocessing context of the pool. With the 'fork' context,
+          the workers inherit the parsed program instead of receiving it.
+        '''
+        self.qcp = qcp
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        self.mp_context = mp_context
+
+    def worker_config(self, attach_shared=False):
+        '''Return the description of the QCP built by each worker, see `build_worker_qcp`.
+
+        Args:
+        - `attach_shared` (bool): if the data memory of the QCP is a `Shared_memory`, the
+          workers read it from its segment instead of receiving a copy. Only possible for
+          workers on the same machine.
+        '''
+        qcp = self.qcp
+        sim = qcp.qubit_state_sim
+        # each worker writes its own data memory, the shared one is only read at start
+        mem_backend = 'dense' if qcp.mem_backend == 'shared' else qcp.mem_backend
+        qcp_kwargs = dict(start_addr=qcp.start_addr,
+                          exec_mode=qcp.exec_mode,
+                          max_exec_cycle=qcp.max_exec_cycle,
+                          gpr_backend=qcp.gpr_backend,
+                          fpr_backend=qcp.fpr_backend,
+                          mem_backend=mem_backend,
+                          static_verification=qcp.static_verification)
+        # the registers as plain values, which do not depend on the register file backends
+        qotrf_sq, qotrf_tq = qcp.qotrf.save_state()
+        states = ([qcp.read_gpr_uint(i) for i in range(gc.NUM_GPR)],
+                  [qcp.fprf.read_bits(i) for i in range(gc.NUM_FPR)],
+                  [None if target is None else list(target.qubits) for target in qotrf_sq],
+                  [None if target is None else [list(pair) for pair in target.qubits]
+                   for target in qotrf_tq])
+        if attach_shared and isinstance(qcp.data_mem, Shared_memory):
+            mem_image = qcp.data_mem.name
+        else:
+            mem_image = bytes(qcp.data_mem.get_entire_mem())
+        return (sim.instance_factory() if sim is not None else None, qcp._num_available_qubits,
+                qcp_kwargs, qcp.insn_mem, states, qcp.post_selection, mem_image)
+
+    def run_shots(self, num_shots: int, mem_regions=(), seed=None):
+        '''Run the uploaded program `num_shots` times over the worker processes.
+
+        Args:
+        - `num_shots` (int): the number of shots.
+        - `mem_regions` (list): `(addr, size)` pairs of data memory regions to record after
+          each shot.
+        - `seed` (int): the seed of the run. If not given, a random seed is drawn, which is
+          available as the `seed` of the result to reproduce the run.
+
+        Return:
+        - a `Shot_result` holding the results of all shots in order.
+        '''
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+
+        num_workers = self.num_workers
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        chunk_size = self.chunk_size
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(num_shots / (4 * num_workers)))
+
+        chunks = [(first, min(chunk_size, num_shots - first))
+                  for first in range(0, num_shots, chunk_size)]
+        logger.info("Running %d shots in %d chunks over %d workers.",
+                    num_shots, len(chunks), num_workers)
+
+        config = self.worker_config(attach_shared=True)
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=self.mp_context,
+                                 initializer=_init_worker, initargs=(config,)) as pool:
+            futures = [pool.submit(_run_chunk, first, count, list(mem_regions), seed)
+                       for first, count in chunks]
+            results = [future.result() for future in futures]
+
+        if len(results) == 0:
+            result = Shot_result(0, self.qcp._num_available_qubits, mem_regions)
+            result.seed = seed
+            return result
+        return Shot_result.merge(results)
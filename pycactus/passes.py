@@ -0,0 +1,347 @@
+'''Upload-time optimisation passes over eQASM programs.
+
+Each pass takes a list of `Instruction` and returns an optimised list, which has the
+same effect on the registers, the memory and the qubits when executed, but fewer
+instructions to execute. The instructions given to a pass are never modified; changed
+instructions are copied.
+
+Since the timing of quantum operations is not modelled, the number of executed cycles
+is not preserved.
+'''
+import copy
+from .insn import *
+import pycactus.global_config as gc
+
+logger = get_logger((__name__).split('.')[-1])
+logger.setLevel(logging.WARNING)
+
+GPR_MASK = (1 << gc.GPR_WIDTH) - 1
+SIGN_BIT = 1 << (gc.GPR_WIDTH - 1)
+
+# instructions which only write `rd` from their register and immediate operands, and
+# cannot raise an exception
+pure_gpr_insns = [eqasm_insn.LDI, eqasm_insn.LDUI, eqasm_insn.ADDI, eqasm_insn.NOT,
+                  eqasm_insn.ADD, eqasm_insn.SUB, eqasm_insn.AND, eqasm_insn.OR,
+                  eqasm_insn.XOR, eqasm_insn.MUL]
+
+
+def copy_insn(insn):
+    new_insn = copy.copy(insn)
+    new_insn.labels = list(insn.labels)
+    return new_insn
+
+
+def gpr_uses(insn):
+    'Return the GPRs read by the instruction `insn`.'
+    uses = [reg for reg in (insn.rs, insn.rt) if reg is not None]
+    # `DUMPMEM rN` prints the GPR named by its string operand
+    if (insn.name == eqasm_insn.DUMPMEM and insn.cmp_flag.startswith('r') and
+            insn.cmp_flag[1:].isdigit()):
+        uses.append(int(insn.cmp_flag[1:]))
+    return uses
+
+
+def gpr_def(insn):
+    'Return the GPR written by the instruction `insn`, or `None`.'
+    return insn.rd
+
+
+def block_leaders(insns, entry=0):
+    '''Return the addresses starting a basic block: the address 0, the entry address
+    `entry`, i.e., the `start_addr` of the QCP, labelled instructions and instructions
+    following a `BR` or `STOP`.
+    '''
+    leaders = {0, entry}
+    for addr, insn in enumerate(insns):
+        if len(insn.labels) > 0:
+            leaders.add(addr)
+        if insn.name in [eqasm_insn.BR, eqasm_insn.STOP]:
+            leaders.add(addr + 1)
+    return leaders
+
+
+def propagate_constants(insns, entry=0):
+    '''Track the GPRs holding a known constant within each basic block of the program
+    `insns` starting at the address `entry`.
+
+    Yield for each instruction `(addr, insn, known, value)`, where `known` maps the GPRs
+    known before executing `insn` to their unsigned values, and `value` is the constant
+    written by `insn` to `rd` if it is known, otherwise `None`. Constants come from `LDI`
+    and from `ADDI`/`LDUI` on known registers.
+    '''
+    leaders = block_leaders(insns, entry)
+    known = {}
+
+    for addr, insn in enumerate(insns):
+        if addr in leaders:
+            known = {}
+
+        value = None
+        if insn.name == eqasm_insn.LDI:
+            value = insn.imm & GPR_MASK
+        elif insn.name == eqasm_insn.ADDI and insn.rs in known:
+            value = (known[insn.rs] + insn.imm) & GPR_MASK
+        elif insn.name == eqasm_insn.LDUI and insn.rs in known:
+            value = ((insn.imm << 17) | (known[insn.rs] & 0x1ffff)) & GPR_MASK
+
+        yield addr, insn, known, value
+
+        rd = gpr_def(insn)
+        if rd is not None:
+            if value is None:
+                known.pop(rd, None)
+            else:
+                known[rd] = value
+
+
+class Opt_pass():
+    '''Base class of the optimisation passes.
+
+    A pass records every change it makes by `log`, which is reported by `Pass_pipeline`.
+    '''
+    name = 'pass'
+
+    def __init__(self):
+        self.changes = []
+        # the address where the program starts, see `Pass_pipeline.run`
+        self.entry = 0
+
+    def log(self, action, insn):
+        self.changes.append((action, insn.lineno, insn.insn_str()))
+        logger.debug("%s: %s line %s: %s", self.name, action, insn.lineno, insn.insn_str())
+
+    def num_changes(self, action):
+        return len([change for change in self.changes if change[0] == action])
+
+    def run(self, insns):
+        raise NotImplementedError
+
+    def remove(self, insns, addrs):
+        '''Return the instructions `insns` without those at the addresses `addrs`.
+
+        The labels of a removed instruction are moved to the next remaining instruction.
+        The last instruction of the program is never removed if it is labelled, and the
+        instructions before the entry are never removed, so that the entry address still
+        starts the same instructions.
+        '''
+        new_insns = []
+        pending_labels = []
+        for addr, insn in enumerate(insns):
+            if addr in addrs and addr >= self.entry and not (
+                    addr == len(insns) - 1 and len(pending_labels + insn.labels) > 0):
+                self.log('removed', insn)
+                pending_labels += insn.labels
+                continue
+
+            if len(pending_labels) > 0:
+                insn = copy_insn(insn)
+                insn.labels = pending_labels + insn.labels
+                pending_labels = []
+            new_insns.append(insn)
+
+        return new_insns
+
+
+class Nop_elimination(Opt_pass):
+    '''Remove `NOP`, `QWAIT` and `QWAITR`, which have no effect since timing is ignored.'''
+    name = 'nop_elimination'
+
+    def run(self, insns):
+        nops = [eqasm_insn.NOP, eqasm_insn.QWAIT, eqasm_insn.QWAITR]
+        return self.remove(insns, {addr for addr, insn in enumerate(insns)
+                                   if insn.name in nops})
+
+
+class Constant_propagation(Opt_pass):
+    '''Replace `ADDI` and `LDUI` whose source register holds a known constant by `LDI`.
+
+    The constants are tracked within each basic block by `propagate_constants`, so that a
+    chain like `LDI r1, 5; ADDI r1, r1, 3` becomes `LDI r1, 5; LDI r1, 8`, leaving the
+    first load to `Dead_store_elimination`.
+    '''
+    name = 'constant_propagation'
+
+    def run(self, insns):
+        new_insns = []
+        for addr, insn, known, value in propagate_constants(insns, self.entry):
+            if value is not None and insn.name != eqasm_insn.LDI:
+                self.log('folded', insn)
+                insn = Instruction(eqasm_insn.LDI, rd=insn.rd,
+                                   imm=(value ^ SIGN_BIT) - SIGN_BIT,
+                                   labels=list(insn.labels), lineno=insn.lineno, check=False)
+            new_insns.append(insn)
+
+        return new_insns
+
+
+class Dead_store_elimination(Opt_pass):
+    '''Remove register writes which are overwritten in the same basic block before being
+    read. Registers are considered live at the end of every basic block.
+    '''
+    name = 'dead_store_elimination'
+
+    def run(self, insns):
+        leaders = block_leaders(insns, self.entry)
+        dead = set()
+        # registers overwritten later in the current block before any read
+        overwritten = set()
+
+        for addr in range(len(insns) - 1, -1, -1):
+            insn = insns[addr]
+            if addr + 1 in leaders:
+                overwritten = set()
+
+            rd = gpr_def(insn)
+            if insn.name in pure_gpr_insns and rd in overwritten:
+                dead.add(addr)
+                continue
+
+            if rd is not None:
+                overwritten.add(rd)
+            overwritten.difference_update(gpr_uses(insn))
+
+        return self.remove(insns, dead)
+
+
+class Smis_smit_hoisting(Opt_pass):
+    '''Move loop-invariant `SMIS`/`SMIT` in front of the loop.
+
+    A loop is a straight-line sequence of instructions ending with a `BR` back to its
+    first instruction, which is entered only from the instruction before it. Since the
+    loop body is always executed at least once, a `SMIS`/`SMIT` in it can be executed
+    once before the loop if no other instruction of the loop writes the same register,
+    and no bundle in the loop reads the register before it.
+    '''
+    name = 'smis_smit_hoisting'
+
+    def run(self, insns):
+        label_addr = {}
+        for addr, insn in enumerate(insns):
+            for label in insn.labels:
+                label_addr[label] = addr
+
+        hoisted = {}
+        for end, br in enumerate(insns):
+            if br.name != eqasm_insn.BR or br.cmp_flag.lower() == 'never':
+                continue
+            start = label_addr[br.target_label]
+            if start > end or not self.is_simple_loop(insns, start, end):
+                continue
+            # the loop must be entered from the instruction before it
+            if start < self.entry <= end:
+                continue
+
+            hoistable = self.find_invariants(insns[start:end])
+            if len(hoistable) > 0:
+                hoisted[start] = [start + offset for offset in hoistable]
+
+        if len(hoisted) == 0:
+            return insns
+
+        new_insns = []
+        moved = {addr for addrs in hoisted.values() for addr in addrs}
+        pending_labels = []
+        for addr, insn in enumerate(insns):
+            if addr in hoisted:
+                for hoisted_addr in hoisted[addr]:
+                    self.log('hoisted', insns[hoisted_addr])
+                    hoisted_insn = copy_insn(insns[hoisted_addr])
+                    hoisted_insn.labels = []
+                    new_insns.append(hoisted_insn)
+            if addr in moved:
+                pending_labels += insn.labels
+                continue
+            if len(pending_labels) > 0:
+                insn = copy_insn(insn)
+                insn.labels = pending_labels + insn.labels
+                pending_labels = []
+            new_insns.append(insn)
+
+        return new_insns
+
+    @staticmethod
+    def is_simple_loop(insns, start, end):
+        header_labels = insns[start].labels
+        for addr, insn in enumerate(insns):
+            if insn.name == eqasm_insn.BR and insn.target_label in header_labels:
+                if addr != end:
+                    return False
+        for insn in insns[start:end]:
+            if insn.name in [eqasm_insn.BR, eqasm_insn.STOP]:
+                return False
+        return all(len(insn.labels) == 0 for insn in insns[start+1:end+1])
+
+    @staticmethod
+    def find_invariants(body):
+        'Return the offsets of the hoistable `SMIS`/`SMIT` in the loop body `body`.'
+        hoistable = []
+        for offset, insn in enumerate(body):
+            if insn.name == eqasm_insn.SMIS:
+                field, reg, reg_name = 'si', insn.si, 'sreg'
+            elif insn.name == eqasm_insn.SMIT:
+                field, reg, reg_name = 'ti', insn.ti, 'treg'
+            else:
+                continue
+
+            writers = [other for other in body
+                       if other.name == insn.name and getattr(other, field) == reg]
+            readers = [other for other in body[:offset] if other.name == eqasm_insn.BUNDLE
+                       and any(getattr(q_op, reg_name) == reg for q_op in other.q_ops)]
+            if len(writers) == 1 and len(readers) == 0:
+                hoistable.append(offset)
+
+        return hoistable
+
+
+opt_passes = {
+    Nop_elimination.name: Nop_elimination,
+    Constant_propagation.name: Constant_propagation,
+    Dead_store_elimination.name: Dead_store_elimination,
+    Smis_smit_hoisting.name: Smis_smit_hoisting
+}
+
+default_pipeline = [Nop_elimination.name, Constant_propagation.name,
+                    Dead_store_elimination.name, Smis_smit_hoisting.name]
+
+
+class Pass_pipeline():
+    def __init__(self, passes=default_pipeline):
+        '''A sequence of optimisation passes run on a program before uploading it.
+
+        Args:
+        - `passes` (list): the passes to run in order, given by their names in
+          `opt_passes` or as `Opt_pass` instances.
+        '''
+        self.passes = []
+        for opt_pass in passes:
+            if isinstance(opt_pass, str):
+                if opt_pass not in opt_passes:
+                    raise ValueError("Undefined optimisation pass: {}. Available passes: "
+                                     "{}".format(opt_pass, list(opt_passes.keys())))
+                opt_pass = opt_passes[opt_pass]()
+            self.passes.append(opt_pass)
+
+        self.num_insns_before = 0
+        self.num_insns_after = 0
+
+    def run(self, insns, entry=0):
+        '''Return the program `insns` starting at the address `entry` optimised by all
+        passes. The instruction at `entry` keeps its address.
+        '''
+        self.num_insns_before = len(insns)
+        for opt_pass in self.passes:
+            opt_pass.changes = []
+            opt_pass.entry = entry
+            insns = opt_pass.run(insns)
+        self.num_insns_after = len(insns)
+        return insns
+
+    def report(self):
+        '''Return a readable summary of the changes made by each pass in the last run.'''
+        lines = ['Optimised the program from {} to {} instructions.'.format(
+            self.num_insns_before, self.num_insns_after)]
+        for opt_pass in self.passes:
+            lines.append('{}: {} change(s)'.format(opt_pass.name, len(opt_pass.changes)))
+            for action, lineno, insn_str in opt_pass.changes:
+                lines.append('    {:<8s} line {}: {}'.format(action, lineno, insn_str))
+        return '\n'.join(lines)
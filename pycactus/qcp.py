@@ -1,25 +1,141 @@
-from pycactus.fpr import FPRF
+from pycactus.fpr import fprf_backends
 from bitstring import BitArray
 from .utils import *
 from .qotr import QOTRF
 from .insn import *
 from .gpr import *
-from .memory import Memory
+from .memory import memory_backends
+from .block_translator import Block_translator, _signed
+from .verifier import Static_verifier
+from .shots import Shot_result, Shot_rejected, STOP_REJECTED, shot_rng
 import pycactus.global_config as gc
 
 logger = get_logger((__name__).split('.')[-1])
 
 
+# Execution engines supported by the QCP.
+#  - 'reference': interpret the `Instruction` objects through `process_insn`.
+#  - 'decoded': run the flat handler table built by `decode_program`.
+#  - 'translated': run basic blocks translated into Python functions by `Block_translator`.
+EXEC_MODES = ['reference', 'decoded', 'translated']
+
+# the maximum number of instructions executed by one fused superinstruction
+MAX_FUSED_INSNS = 3
+
+
+class Qcp_snapshot():
+    '''The machine state of a QCP recorded by `Quantum_control_processor.snapshot`.
+
+    All attributes are immutable or private copies, so that a snapshot is never changed by
+    the execution after it nor by restoring it.
+    '''
+    __slots__ = ['pc', 'cycle', 'stop_bit', 'cmp_flags', 'cmp_operands', 'msmt_result',
+                 'gprf', 'fprf', 'qotrf', 'data_mem', 'qubits']
+
+    def __init__(self):
+        # the state of the qubit state simulator, or `None` if the qubits are reset
+        self.qubits = None
+
+
+def _make_flag_evaluator(key):
+    op = cmp_op[key]
+    if key in ['lt', 'ge', 'le', 'gt']:
+        return lambda a, b: op(_signed(a), _signed(b))
+    return op
+
+
+# functions evaluating each comparison flag from the unsigned values of the CMP operands,
+# indexed by `CMP_FLAG`
+cmp_flag_evaluators = [None] * len(CMP_FLAG)
+cmp_flag_evaluators[CMP_FLAG['always']] = lambda a, b: True
+cmp_flag_evaluators[CMP_FLAG['never']] = lambda a, b: False
+for _key in cmp_op:
+    cmp_flag_evaluators[CMP_FLAG[_key]] = _make_flag_evaluator(_key)
+
+
 class Quantum_control_processor():
+    # maps an instruction onto the name of the handler used by the decoded engine
+    _decoded_handler_names = {
+        eqasm_insn.NOP: '_exec_nop',
+        eqasm_insn.STOP: '_exec_stop',
+        eqasm_insn.QWAIT: '_exec_nop',
+        eqasm_insn.QWAITR: '_exec_nop',
+        eqasm_insn.NOT: '_exec_not',
+        eqasm_insn.CMP: '_exec_cmp',
+        eqasm_insn.BR: '_exec_br',
+        eqasm_insn.FBR: '_exec_fbr',
+        eqasm_insn.FMR: '_exec_fmr',
+        eqasm_insn.LDI: '_exec_ldi',
+        eqasm_insn.ADD: '_exec_add',
+        eqasm_insn.SUB: '_exec_sub',
+        eqasm_insn.AND: '_exec_and',
+        eqasm_insn.OR: '_exec_or',
+        eqasm_insn.XOR: '_exec_xor',
+        eqasm_insn.MUL: '_exec_mul',
+        eqasm_insn.DIV: '_exec_div',
+        eqasm_insn.REM: '_exec_rem',
+        eqasm_insn.LDUI: '_exec_ldui',
+        eqasm_insn.ADDI: '_exec_addi',
+        eqasm_insn.LW: '_exec_lw',
+        eqasm_insn.LB: '_exec_lb',
+        eqasm_insn.LBU: '_exec_lbu',
+        eqasm_insn.SW: '_exec_sw',
+        eqasm_insn.SB: '_exec_sb',
+        eqasm_insn.SMIS: '_exec_smis',
+        eqasm_insn.SMIT: '_exec_smit',
+        eqasm_insn.FCVT_W_S: '_exec_fcvt_w_s',
+        eqasm_insn.FCVT_S_W: '_exec_fcvt_s_w',
+        eqasm_insn.FMV_W_X: '_exec_fmv_w_x',
+        eqasm_insn.FMV_X_W: '_exec_fmv_x_w',
+        eqasm_insn.FLW: '_exec_flw',
+        eqasm_insn.FSW: '_exec_fsw',
+        eqasm_insn.FADD_S: '_exec_fp_arith',
+        eqasm_insn.FSUB_S: '_exec_fp_arith',
+        eqasm_insn.FMUL_S: '_exec_fp_arith',
+        eqasm_insn.FDIV_S: '_exec_fp_arith',
+        eqasm_insn.FEQ_S: '_exec_fp_cmp',
+        eqasm_insn.FLT_S: '_exec_fp_cmp',
+        eqasm_insn.FLE_S: '_exec_fp_cmp',
+        eqasm_insn.BUNDLE: '_exec_bundle',
+        # debug instructions are rare, they simply fall back to `process_insn`.
+        eqasm_insn.DUMPMEM: '_exec_reference'
+    }
+
+    # handlers skipping the runtime checks, used for instructions proven safe at upload
+    _unchecked_handler_names = {
+        eqasm_insn.SMIS: '_exec_smis_unchecked',
+        eqasm_insn.SMIT: '_exec_smit_unchecked',
+        eqasm_insn.LW: '_exec_lw_unchecked',
+        eqasm_insn.LB: '_exec_lb_unchecked',
+        eqasm_insn.LBU: '_exec_lbu_unchecked',
+        eqasm_insn.SW: '_exec_sw_unchecked',
+        eqasm_insn.SB: '_exec_sb_unchecked',
+        eqasm_insn.FLW: '_exec_flw_unchecked',
+        eqasm_insn.FSW: '_exec_fsw_unchecked'
+    }
+
     def __init__(self, qubit_state_sim=None, num_available_qubits=7,
                  start_addr=0, log_level=logging.WARNING,
-                 max_exec_cycle=5000000):
+                 max_exec_cycle=5000000, exec_mode='decoded', gpr_backend='int',
+                 fpr_backend='packed', static_verification=True, mem_backend='dense'):
         self.qubit_state_sim = qubit_state_sim
+        self.logger = Instance_logger(logger, log_level)
+        # run the instructions proven safe at upload without runtime checks
+        self.static_verification = static_verification
+        self.set_exec_mode(exec_mode)
 
         # general purpose register file
-        self.gprf = GPRF(num_gpr=gc.NUM_GPR, gpr_width=gc.GPR_WIDTH)
+        if gpr_backend not in gprf_backends:
+            raise ValueError("Undefined GPR file backend ({}). Allowed backends are: {}.".format(
+                gpr_backend, list(gprf_backends.keys())))
+        self.gpr_backend = gpr_backend
+        self.gprf = gprf_backends[gpr_backend](num_gpr=gc.NUM_GPR, gpr_width=gc.GPR_WIDTH)
         # floating point register file
-        self.fprf = FPRF(num_fpr=gc.NUM_FPR, fpr_width=gc.FPR_WIDTH)
+        if fpr_backend not in fprf_backends:
+            raise ValueError("Undefined FPR file backend ({}). Allowed backends are: {}.".format(
+                fpr_backend, list(fprf_backends.keys())))
+        self.fpr_backend = fpr_backend
+        self.fprf = fprf_backends[fpr_backend](num_fpr=gc.NUM_FPR, fpr_width=gc.FPR_WIDTH)
 
         # operation target register files
         self.qotrf = QOTRF()
@@ -28,11 +144,19 @@ class Quantum_control_processor():
         self.start_addr = start_addr
 
         # data memory
-        self.data_mem = Memory(size=gc.SIZE_DATA_MEM, parent_qcp=self)
+        if mem_backend not in memory_backends:
+            raise ValueError("Undefined data memory backend ({}). Allowed backends are: "
+                             "{}.".format(mem_backend, list(memory_backends.keys())))
+        self.mem_backend = mem_backend
+        self.data_mem = memory_backends[mem_backend](size=gc.SIZE_DATA_MEM, parent_qcp=self)
         self.set_num_available_qubits(num_available_qubits)
         self.max_exec_cycle = max_exec_cycle
 
+        # the `Post_selection` checked after each measurement, or `None`
+        self.post_selection = None
         self.reset()
+        # the state restored before each shot, see `capture_baseline`
+        self._baseline = None
         self.set_log_level(log_level)
         # self.exec_trace_fn = 'exec_trace.csv'
         # try:
@@ -46,14 +170,65 @@ class Quantum_control_processor():
         # measurement result register
         self.msmt_result = [0] * num_available_qubits
 
+        # the proofs about the SMIS/SMIT masks depend on the number of qubits
+        if len(getattr(self, 'insn_mem', [])) > 0:
+            self.decode_program()
+            self.fuse_insns()
+            self.block_translator.clear()
+
+    def set_post_selection(self, post_selection):
+        '''Abort the program as soon as a measurement fails the `Post_selection`
+        `post_selection`, leaving `stop_bit` at `STOP_REJECTED`. `None` disables it.
+        '''
+        if post_selection is not None:
+            for qubit in post_selection.msmt_values:
+                if not 0 <= qubit < self._num_available_qubits:
+                    raise ValueError("The post-selection uses the invalid qubit {}.".format(
+                        qubit))
+            for addr, value, mask in post_selection.word_rejects:
+                self.data_mem._check_word_addr(addr)
+        self.post_selection = post_selection
+
+    def check_post_selection(self, qubits, results):
+        '''Raise `Shot_rejected` if the measurement results `results` of the qubits `qubits`
+        or the data memory fail the post-selection.
+        '''
+        post_selection = self.post_selection
+        if not (post_selection.accepts_msmt(qubits, results) and
+                post_selection.accepts_words(self.data_mem.read_word_uint)):
+            raise Shot_rejected()
+
     def set_log_level(self, log_level):
-        logger.setLevel(log_level)
+        self.logger.setLevel(log_level)
+        # the per-cycle trace is only produced by the traced execution loop
+        self.trace_on = log_level <= logging.DEBUG
         self.data_mem.set_log_level(log_level)
         self.gprf.set_log_level(log_level)
 
+    def set_log_handler(self, handler):
+        '''Log into `handler` only, or into the module handlers if `None`.'''
+        self.logger.set_handler(handler)
+        self.data_mem.set_log_handler(handler)
+        self.gprf.set_log_handler(handler)
+        self.fprf.set_log_handler(handler)
+
     def set_max_exec_cycle(self, num_cycle: int):
         self.max_exec_cycle = num_cycle
 
+    def set_exec_mode(self, exec_mode: str):
+        '''Select the engine used to execute the uploaded program.
+
+        Args:
+        - `exec_mode` (str): one of `EXEC_MODES`. The 'reference' mode interprets each
+          `Instruction` through `process_insn`, the 'decoded' mode runs the handler
+          table built at upload time, and the 'translated' mode runs basic blocks
+          compiled into Python functions.
+        '''
+        if exec_mode not in EXEC_MODES:
+            raise ValueError("Undefined execution mode ({}). Allowed modes are: {}.".format(
+                exec_mode, EXEC_MODES))
+        self.exec_mode = exec_mode
+
     def get_data_mem(self):
         return self.data_mem.get_entire_mem()
 
@@ -67,6 +242,14 @@ class Quantum_control_processor():
         # instruction memory
         self.insn_mem = []
         self.label_addr = {}
+        # the instruction memory after decoding, one (handler, operands) pair per instruction
+        self.decoded_insns = []
+        # the `Proof` of each instruction given by the static verifier, or `None`
+        self.proofs = []
+        # the decoded table after fusing common instruction sequences
+        self.fused_insns = []
+        # cache of the basic blocks translated from the current program
+        self.block_translator = Block_translator(self)
         # self.data_mem = Memory(size=gc.SIZE_DATA_MEM, parent_qcp=self)
 
     def restart(self):
@@ -81,14 +264,45 @@ class Quantum_control_processor():
         self.msmt_result = [0] * self._num_available_qubits
         # comparison flags
         self.cmp_flags = [True] + [False] * (len(CMP_FLAG) - 1)
+        # operands (unsigned) of the last CMP whose flags are not yet stored in `cmp_flags`
+        self.cmp_operands = None
+
+    def read_cmp_flag(self, flag: int):
+        '''Return the comparison flag with the index `flag`.
+
+        The decoded engine does not compute the flags when executing CMP, but records its
+        operands in `cmp_operands`. Only the flag read by BR/FBR is then evaluated.
+        '''
+        if self.cmp_operands is None:
+            return self.cmp_flags[flag]
+        return cmp_flag_evaluators[flag](*self.cmp_operands)
+
+    def sync_cmp_flags(self):
+        '''Evaluate all comparison flags pending since the last CMP into `cmp_flags`.'''
+        if self.cmp_operands is not None:
+            for flag, evaluator in enumerate(cmp_flag_evaluators):
+                self.cmp_flags[flag] = evaluator(*self.cmp_operands)
+            self.cmp_operands = None
 
     def dump_cmp_flags(self):
+        self.sync_cmp_flags()
         for key in CMP_FLAG:
             print("{:>6}: {}".format(key, int(self.cmp_flags[CMP_FLAG[key]])))
 
-    def upload_program(self, insns):
+    def upload_program(self, insns, pipeline=None):
+        '''Upload the program `insns` to the instruction memory.
+
+        Args:
+        - `insns` (list): the instructions of the program.
+        - `pipeline` (Pass_pipeline): if given, the optimisation passes run on the program
+          before uploading it. Its report is available by `pipeline.report()`.
+        '''
         assert(all(isinstance(insn, Instruction) for insn in insns))
 
+        if pipeline is not None:
+            insns = pipeline.run(insns, self.start_addr)
+            self.logger.info("%s", pipeline.report())
+
         if (len(insns) > self.max_insn_num):
             raise ValueError("Given program has a length ({}) exceeds the allowed maximum"
                              " number of instructions ({}).".format(len(insns), self.max_insn_num))
@@ -96,6 +310,8 @@ class Quantum_control_processor():
         self.reset()
         self.insn_mem = insns
         self.parse_labels()
+        self.decode_program()
+        self.fuse_insns()
 
         return True
 
@@ -112,8 +328,150 @@ class Quantum_control_processor():
                                      "the target address label: {} in the instruction {}".format(
                                          insn.target_label, insn))
 
+    def decode_program(self):
+        '''Pre-decode the instruction memory into a flat table of handlers.
+
+        Each entry of `self.decoded_insns` is a pair `(handler, operands)`. The operands
+        are extracted from the instruction once, with the target labels of `BR` resolved
+        to instruction addresses and the condition strings resolved to `CMP_FLAG` indices.
+        Executing the instruction at `pc` is then a single call `handler(*operands)`.
+
+        With `static_verification`, the instructions proven safe by `Static_verifier` are
+        decoded into handlers without runtime checks.
+        '''
+        if self.static_verification:
+            verifier = Static_verifier(self._num_available_qubits, self.data_mem.size)
+            self.proofs = verifier.verify(self.insn_mem, self.start_addr)
+        else:
+            self.proofs = [None] * len(self.insn_mem)
+
+        self.decoded_insns = [self.decode_insn(insn, proof)
+                              for insn, proof in zip(self.insn_mem, self.proofs)]
+
+    def decode_insn(self, insn, proof=None):
+        '''Decode a single instruction into a `(handler, operands)` pair.
+
+        Args:
+        - `insn` (Instruction): the instruction to decode.
+        - `proof` (Proof): the facts proven by the static verifier about `insn`, if any.
+        '''
+        try:
+            handler_name = self._decoded_handler_names[insn.name]
+        except KeyError:
+            raise ValueError("Found undefined instruction ({}).".format(insn))
+
+        handler = getattr(self, handler_name)
+
+        if proof is not None and insn.name in self._unchecked_handler_names:
+            handler = getattr(self, self._unchecked_handler_names[insn.name])
+            # the target registers are validated and built once at upload
+            if insn.name == eqasm_insn.SMIS:
+                return handler, (insn.si, self.qotrf.sq_target(insn.sq_list))
+            if insn.name == eqasm_insn.SMIT:
+                return handler, (insn.ti, self.qotrf.tq_target(insn.tq_list))
+            # the register accessed, and the constant memory address
+            reg = eqasm_insn_fields[insn.name][0]
+            return handler, (getattr(insn, reg), proof.mem_addr)
+
+        if insn.name == eqasm_insn.BR:
+            flag = self.decode_cmp_flag(insn)
+            if insn.target_label not in self.label_addr:
+                # the label is defined by an instruction which is appended later.
+                return self._exec_br_label, (flag, insn.target_label)
+            return handler, (flag, self.label_addr[insn.target_label])
+
+        if insn.name == eqasm_insn.FBR:
+            return handler, (self.decode_cmp_flag(insn), insn.rd)
+
+        if insn.name in fp_op:
+            return handler, (fp_op[insn.name], insn.fd, insn.fs, insn.ft)
+
+        if insn.name in fp_cmp_op:
+            return handler, (fp_cmp_op[insn.name], insn.rd, insn.fs, insn.ft)
+
+        if insn.name == eqasm_insn.DUMPMEM:
+            return handler, (insn,)
+
+        if insn.name == eqasm_insn.BUNDLE:
+            return handler, (tuple(self.decode_qop(qop) for qop in insn.q_ops),)
+
+        return handler, tuple(getattr(insn, field) for field in eqasm_insn_fields[insn.name])
+
+    def decode_qop(self, qop):
+        '''Decode a quantum operation into `(kind, reg, gate, name)`, where `reg` is its
+        target register and `gate` the handle prepared by the qubit state simulator for
+        single-qubit gates, or `None` if the gate is prepared when executed.
+        '''
+        reg = qop.sreg if qop.sreg is not None else qop.treg
+        gate = None
+        if qop.kind is Qop_kind.GATE and self.qubit_state_sim is not None:
+            try:
+                gate = self.qubit_state_sim.prepare_gate(qop.name)
+            except ValueError:
+                # malformed gate names are reported when the gate is executed
+                gate = None
+        return (qop.kind, reg, gate, qop.name)
+
+    def fuse_insns(self):
+        '''Build `fused_insns` by replacing common instruction sequences in the decoded
+        table with superinstructions, which execute the whole sequence in one handler:
+          - `CMP` + `BR`,
+          - `ADDI` + `CMP` + `BR`, the usual tail of a counting loop,
+          - `LDI` + `LDUI`, which loads a 32-bit constant.
+
+        A sequence is fused only when none of its instructions but the first is labelled,
+        i.e., when no branch can enter the middle of it. The superinstruction is placed at
+        the address of the first instruction, and the decoded entries of the following
+        instructions are kept unchanged.
+        '''
+        insn_mem = self.insn_mem
+        self.fused_insns = list(self.decoded_insns)
+
+        def names(start, length):
+            if start + length > len(insn_mem):
+                return None
+            if any(len(insn.labels) > 0 for insn in insn_mem[start+1:start+length]):
+                return None
+            return [insn.name for insn in insn_mem[start:start+length]]
+
+        for addr, insn in enumerate(insn_mem):
+            if names(addr, 3) == [eqasm_insn.ADDI, eqasm_insn.CMP, eqasm_insn.BR]:
+                addi, cmp, br = insn_mem[addr:addr+3]
+                self.fused_insns[addr] = (self._exec_addi_cmp_br, (
+                    addi.rd, addi.rs, addi.imm, cmp.rs, cmp.rt,
+                    cmp_flag_evaluators[self.decode_cmp_flag(br)],
+                    self.label_addr[br.target_label], addr + 3))
+
+            elif names(addr, 2) == [eqasm_insn.CMP, eqasm_insn.BR]:
+                cmp, br = insn_mem[addr:addr+2]
+                self.fused_insns[addr] = (self._exec_cmp_br, (
+                    cmp.rs, cmp.rt, cmp_flag_evaluators[self.decode_cmp_flag(br)],
+                    self.label_addr[br.target_label], addr + 2))
+
+            elif (names(addr, 2) == [eqasm_insn.LDI, eqasm_insn.LDUI] and
+                    insn_mem[addr+1].rs == insn.rd):
+                ldui = insn_mem[addr+1]
+                low_value = insn.imm & 0xffffffff
+                value = ((ldui.imm << 17) | (low_value & 0x1ffff)) & 0xffffffff
+                self.fused_insns[addr] = (self._exec_ldi_ldui, (
+                    insn.rd, low_value, ldui.rd, value, addr + 2))
+
+    @staticmethod
+    def decode_cmp_flag(insn):
+        try:
+            return CMP_FLAG[insn.cmp_flag.lower()]
+        except KeyError:
+            raise ValueError("Found undefined comparison flag ({}) in the instruction "
+                             "{}.".format(insn.cmp_flag, insn))
+
     def append_insn(self, insn):
+        decoded_insn = self.decode_insn(insn)
         self.insn_mem.append(insn)
+        self.decoded_insns.append(decoded_insn)
+        self.proofs.append(None)
+        self.fused_insns.append(decoded_insn)
+        # block boundaries may change with the new instruction
+        self.block_translator.clear()
 
         for label in insn.labels:
             if label in self.label_addr:
@@ -122,7 +480,8 @@ class Quantum_control_processor():
 
             self.label_addr[label] = len(self.insn_mem) - 1
 
-        logger.debug("insn mem size: {}.".format(len(self.insn_mem)))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("insn mem size: {}.".format(len(self.insn_mem)))
 
     def write_gpr_value(self, rd: int, **kwargs):
         '''Write the target GPR `rd` with the value specified by a key-word argument.
@@ -186,25 +545,206 @@ class Quantum_control_processor():
         # fetch the instruction
         insn = self.insn_mem[self.pc]
 
-        if self.cycle > 0:
+        if self.logger.isEnabledFor(logging.DEBUG):
             log_msg = "cycle: {}, lineno: {}, insn: {}\n".format(
                 self.cycle, insn.lineno, insn)
-            logger.debug(log_msg)
+            self.logger.debug(log_msg)
             # self.trace_f.write(log_msg)
 
-        self.process_insn(insn)  # execute
+        if self.exec_mode == 'reference':
+            self.process_insn(insn)  # execute
+        else:
+            handler, operands = self.decoded_insns[self.pc]
+            handler(*operands)
 
     def run(self):
-        while (self.stop_bit == 0):
-            self.advance_one_cycle()
-            # print('\rcycle: {}, PC: {}'.format(self.cycle, self.pc), end='')
-            if self.cycle > self.max_exec_cycle:
-                break
+        self.run_until(self.max_exec_cycle + 1)
 
-        logger.info(
+        self.logger.info(
             "pycactus exits after executing {} cycles.".format(self.cycle))
         return True
 
+    def step(self, num_cycles: int):
+        '''Resume the program for at most `num_cycles` cycles from the current state.
+
+        A program can be executed by any sequence of `step` calls, giving the same result
+        as `run`, so that the host can interleave programs or cancel them between steps.
+
+        Return:
+        - `True` if the program is finished, see `is_finished`.
+        '''
+        if num_cycles > 0 and not self.is_finished():
+            self.run_until(min(self.cycle + num_cycles, self.max_exec_cycle + 1))
+        return self.is_finished()
+
+    def is_finished(self):
+        '''Return whether the program has executed STOP or reached `max_exec_cycle`.'''
+        return self.stop_bit != 0 or self.cycle > self.max_exec_cycle
+
+    def run_until(self, end_cycle: int):
+        '''Run the program with the current engine until STOP or the cycle `end_cycle`.'''
+        try:
+            if self.exec_mode == 'reference':
+                self.run_traced(end_cycle)
+            elif self.exec_mode == 'translated':
+                self.run_translated(end_cycle)
+            else:
+                self.run_decoded(end_cycle)
+        except Shot_rejected:
+            self.stop_bit = STOP_REJECTED
+            self.logger.info("The shot is rejected at cycle {}.".format(self.cycle))
+            return
+
+        if (self.stop_bit == 1 and self.post_selection is not None and
+                not self.post_selection.accepts_words(self.data_mem.read_word_uint)):
+            self.stop_bit = STOP_REJECTED
+
+    def snapshot(self, include_qubits=True):
+        '''Return a `Qcp_snapshot` of the whole machine state, which `restore` can restore
+        any number of times.
+
+        The data memory pages are shared copy-on-write with the previous snapshots, so that
+        taking and restoring snapshots only copies the pages written in between.
+
+        Args:
+        - `include_qubits` (bool): whether to copy the state of the qubit state simulator.
+          Otherwise, restoring the snapshot resets all qubits.
+        '''
+        snap = Qcp_snapshot()
+        snap.pc = self.pc
+        snap.cycle = self.cycle
+        snap.stop_bit = self.stop_bit
+        snap.cmp_flags = tuple(self.cmp_flags)
+        snap.cmp_operands = self.cmp_operands
+        snap.msmt_result = tuple(self.msmt_result)
+        snap.gprf = self.gprf.save_state()
+        snap.fprf = self.fprf.save_state()
+        snap.qotrf = self.qotrf.save_state()
+        snap.data_mem = self.data_mem.snapshot()
+        if include_qubits and self.qubit_state_sim is not None:
+            snap.qubits = self.qubit_state_sim.save_state()
+        return snap
+
+    def restore(self, snap):
+        '''Restore the machine state recorded by `snapshot` in `snap`.'''
+        self.pc = snap.pc
+        self.cycle = snap.cycle
+        self.stop_bit = snap.stop_bit
+        self.cmp_flags[:] = snap.cmp_flags
+        self.cmp_operands = snap.cmp_operands
+        self.msmt_result[:] = snap.msmt_result
+        self.gprf.restore_state(snap.gprf)
+        self.fprf.restore_state(snap.fprf)
+        self.qotrf.restore_state(snap.qotrf)
+        self.data_mem.restore(snap.data_mem)
+        if self.qubit_state_sim is not None:
+            if snap.qubits is None:
+                self.qubit_state_sim.reset()
+            else:
+                self.qubit_state_sim.restore_state(snap.qubits)
+
+    def capture_baseline(self):
+        '''Capture the architectural state restored by `reset_to_baseline`: all states except
+        the qubits.
+        '''
+        self._baseline = self.snapshot(include_qubits=False)
+
+    def reset_to_baseline(self):
+        '''Restore the state captured by `capture_baseline`, with all qubits reset. Only the
+        memory pages written since are restored.
+        '''
+        self.restore(self._baseline)
+
+    def run_shots(self, num_shots: int, mem_regions=(), seed=None, first_shot=0):
+        '''Run the uploaded program `num_shots` times.
+
+        Every shot starts from the state at the call, normally the state right after
+        uploading the program and preloading the data memory, which is restored after
+        the last shot. The export history is neither recorded nor printed for shots.
+
+        Args:
+        - `num_shots` (int): the number of shots.
+        - `mem_regions` (list): `(addr, size)` pairs of data memory regions to record after
+          each shot.
+        - `seed` (int): if given, each shot samples the measurements from its own random
+          stream, given by `shot_rng(seed, shot)`. Otherwise the default generator of the
+          qubit state simulator is used.
+        - `first_shot` (int): the index of the first shot, when the shots of a run are
+          executed in chunks.
+
+        Return:
+        - a `Shot_result` holding the results of all shots.
+        '''
+        result = Shot_result(num_shots, self._num_available_qubits, mem_regions,
+                             self.data_mem.size)
+        result.seed = seed
+        self.restart()
+        self.capture_baseline()
+
+        max_export_show_addr = self.data_mem.max_export_show_addr
+        self.data_mem.max_export_show_addr = 0
+        try:
+            for shot in range(num_shots):
+                self.reset_to_baseline()
+                if seed is not None and self.qubit_state_sim is not None:
+                    self.qubit_state_sim.set_rng(shot_rng(seed, first_shot + shot))
+                self.run()
+                result.record(shot, self)
+        finally:
+            self.data_mem.max_export_show_addr = max_export_show_addr
+            self.reset_to_baseline()
+
+        return result
+
+    def run_traced(self, end_cycle: int):
+        '''Run the program one cycle at a time, logging every executed instruction.'''
+        while (self.stop_bit == 0 and self.cycle < end_cycle):
+            self.advance_one_cycle()
+
+    def run_decoded(self, end_cycle: int):
+        '''Run the decoded instruction table until STOP or the cycle `end_cycle` is executed.
+
+        When the log level is above DEBUG, this loop does no logging work at all.
+        '''
+        if self.trace_on:
+            self.run_traced(end_cycle)
+            return
+
+        fused_insns = self.fused_insns
+        # a superinstruction may execute up to `MAX_FUSED_INSNS` cycles at once
+        fused_cycle_limit = end_cycle - MAX_FUSED_INSNS
+
+        while (self.stop_bit == 0 and self.cycle <= fused_cycle_limit):
+            self.cycle += 1
+            handler, operands = fused_insns[self.pc]
+            handler(*operands)
+
+        # approach `end_cycle` one instruction at a time to stop at the exact cycle
+        decoded_insns = self.decoded_insns
+        while (self.stop_bit == 0 and self.cycle < end_cycle):
+            self.cycle += 1
+            handler, operands = decoded_insns[self.pc]
+            handler(*operands)
+
+    def run_translated(self, end_cycle: int):
+        '''Run the program block by block until STOP or the cycle `end_cycle` is executed.
+
+        Blocks cannot be traced per cycle, so the traced loop is used at the DEBUG level.
+        '''
+        if self.trace_on:
+            self.run_traced(end_cycle)
+            return
+
+        block_translator = self.block_translator
+
+        while (self.stop_bit == 0):
+            block = block_translator.get_block(self.pc)
+            if self.cycle + block.num_insns >= end_cycle:
+                # finish instruction by instruction to stop at the same cycle as other engines
+                self.run_decoded(end_cycle)
+                break
+            block.func(self)
+
     def process_insn(self, insn):
         # ------------------------- no operand -------------------------
         if insn.name == eqasm_insn.STOP:
@@ -241,6 +781,7 @@ class Quantum_control_processor():
             self.pc += 1             # update the PC
 
         elif insn.name == eqasm_insn.CMP:
+            self.cmp_operands = None
             for key in ['eq', 'ne']:
                 self.cmp_flags[CMP_FLAG[key]] = cmp_op[key](self.gprf[insn.rs],
                                                             self.gprf[insn.rt])
@@ -256,12 +797,14 @@ class Quantum_control_processor():
             self.pc += 1             # update the PC
 
         elif insn.name == eqasm_insn.BR:
+            self.sync_cmp_flags()
             if self.cmp_flags[CMP_FLAG[insn.cmp_flag]]:
                 self.pc = self.label_addr[insn.target_label]
             else:
                 self.pc += 1
 
         elif insn.name == eqasm_insn.FBR:
+            self.sync_cmp_flags()
             cmp_res = self.cmp_flags[CMP_FLAG[insn.cmp_flag]]
             self.write_gpr_value(insn.rd, int=cmp_res)
             self.pc += 1             # update the PC
@@ -304,7 +847,8 @@ class Quantum_control_processor():
             # assumed imm is already interpreted as signed integer
             addr = self.read_gpr_uint(insn.rt) + insn.imm
             ret_word = self.data_mem.read_word(addr)
-            logger.debug('load value ({}) from the addr 0x{:x}'.format(ret_word, addr))
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug('load value ({}) from the addr 0x{:x}'.format(ret_word, addr))
             self.write_gpr_bits(insn.rd, ret_word)
 
             self.pc += 1             # update the PC
@@ -421,24 +965,32 @@ class Quantum_control_processor():
                 if qop.sreg is not None:
                     target_qubit_list = self.qotrf.read_sq_reg(qop.sreg)
 
-                    logger.info(
-                        "single-qubit operation: {} {}".format(op_name, target_qubit_list))
+                    if self.logger.isEnabledFor(logging.INFO):
+                        self.logger.info(
+                            "single-qubit operation: {} {}".format(
+                                op_name, list(target_qubit_list)))
 
                     for qubit in target_qubit_list:
-                        if op_name.lower() in ['measure', 'measz']:
+                        if qop.kind is Qop_kind.MEASURE:
                             self.msmt_result[qubit] = self.qubit_state_sim.measure_qubit(
                                 qubit)
                         else:
                             self.qubit_state_sim.apply_single_qubit_gate(
                                 op_name, qubit)
 
+                    if qop.kind is Qop_kind.MEASURE and self.post_selection is not None:
+                        self.check_post_selection(
+                            target_qubit_list.qubits,
+                            [self.msmt_result[qubit] for qubit in target_qubit_list])
+
                 elif qop.treg is not None:
                     # currently only support CZ operation
-                    assert(op_name.lower() == 'cz')
+                    assert(qop.kind is Qop_kind.CZ)
                     target_qubit_pairs = self.qotrf.read_tq_reg(qop.treg)
 
-                    logger.info(
-                        "two-qubit operation: CZ {}".format(target_qubit_pairs))
+                    if self.logger.isEnabledFor(logging.INFO):
+                        self.logger.info(
+                            "two-qubit operation: CZ {}".format(list(target_qubit_pairs)))
 
                     for pair in target_qubit_pairs:
                         self.qubit_state_sim.apply_two_qubit_gate(
@@ -451,3 +1003,255 @@ class Quantum_control_processor():
                 "Found undefined instruction ({}).".format(insn))
 
         return True
+
+    # =================================================================================
+    # handlers of the decoded engine
+    # Each handler receives the operands extracted by `decode_insn`, executes the
+    # instruction and updates the PC. They must behave the same as `process_insn`.
+    # =================================================================================
+    def _exec_reference(self, insn):
+        self.process_insn(insn)
+
+    def _exec_nop(self, *operands):
+        self.pc += 1
+
+    def _exec_stop(self):
+        self.stop_bit = 1
+        self.pc += 1
+        self.data_mem.final_dump()
+
+    def _exec_not(self, rd, rt):
+        self.gprf.write_uint(rd, ~self.gprf.read_unsigned(rt))
+        self.pc += 1
+
+    def _exec_cmp(self, rs, rt):
+        # the flags are evaluated lazily, see `read_cmp_flag`
+        self.cmp_operands = (self.gprf.read_unsigned(rs), self.gprf.read_unsigned(rt))
+        self.pc += 1
+
+    def _exec_br(self, flag, target_addr):
+        if self.read_cmp_flag(flag):
+            self.pc = target_addr
+        else:
+            self.pc += 1
+
+    def _exec_br_label(self, flag, target_label):
+        if self.read_cmp_flag(flag):
+            self.pc = self.label_addr[target_label]
+        else:
+            self.pc += 1
+
+    def _exec_fbr(self, flag, rd):
+        self.gprf.write_uint(rd, int(self.read_cmp_flag(flag)))
+        self.pc += 1
+
+    # ------------------------- superinstructions -------------------------
+    def _exec_cmp_br(self, rs, rt, flag_evaluator, target_addr, next_addr):
+        a = self.gprf.read_unsigned(rs)
+        b = self.gprf.read_unsigned(rt)
+        self.cmp_operands = (a, b)
+        self.cycle += 1
+        if flag_evaluator(a, b):
+            self.pc = target_addr
+        else:
+            self.pc = next_addr
+
+    def _exec_addi_cmp_br(self, rd, rs, imm, cmp_rs, cmp_rt, flag_evaluator,
+                          target_addr, next_addr):
+        gprf = self.gprf
+        gprf.write_uint(rd, gprf.read_unsigned(rs) + imm)
+        a = gprf.read_unsigned(cmp_rs)
+        b = gprf.read_unsigned(cmp_rt)
+        self.cmp_operands = (a, b)
+        self.cycle += 2
+        if flag_evaluator(a, b):
+            self.pc = target_addr
+        else:
+            self.pc = next_addr
+
+    def _exec_ldi_ldui(self, ldi_rd, ldi_value, ldui_rd, ldui_value, next_addr):
+        if ldi_rd != ldui_rd:
+            self.gprf.write_uint(ldi_rd, ldi_value)
+        self.gprf.write_uint(ldui_rd, ldui_value)
+        self.cycle += 1
+        self.pc = next_addr
+
+    def _exec_fmr(self, rd, qs):
+        self.gprf.write_uint(rd, self.msmt_result[qs])
+        self.pc += 1
+
+    def _exec_ldi(self, rd, imm):
+        self.gprf.write_uint(rd, imm)
+        self.pc += 1
+
+    def _exec_add(self, rd, rs, rt):
+        self.gprf.write_uint(rd, self.gprf.read_unsigned(rs) + self.gprf.read_unsigned(rt))
+        self.pc += 1
+
+    def _exec_sub(self, rd, rs, rt):
+        self.gprf.write_uint(rd, self.gprf.read_unsigned(rs) - self.gprf.read_unsigned(rt))
+        self.pc += 1
+
+    def _exec_and(self, rd, rs, rt):
+        self.gprf.write_uint(rd, self.gprf.read_unsigned(rs) & self.gprf.read_unsigned(rt))
+        self.pc += 1
+
+    def _exec_or(self, rd, rs, rt):
+        self.gprf.write_uint(rd, self.gprf.read_unsigned(rs) | self.gprf.read_unsigned(rt))
+        self.pc += 1
+
+    def _exec_xor(self, rd, rs, rt):
+        self.gprf.write_uint(rd, self.gprf.read_unsigned(rs) ^ self.gprf.read_unsigned(rt))
+        self.pc += 1
+
+    def _exec_mul(self, rd, rs, rt):
+        self.gprf.write_uint(rd, self.gprf.read_signed(rs) * self.gprf.read_signed(rt))
+        self.pc += 1
+
+    def _exec_div(self, rd, rs, rt):
+        # signed division rounding towards zero
+        self.gprf.write_uint(rd, int(self.gprf.read_signed(rs) / self.gprf.read_signed(rt)))
+        self.pc += 1
+
+    def _exec_rem(self, rd, rs, rt):
+        self.gprf.write_uint(rd, self.gprf.read_signed(rs) % self.gprf.read_signed(rt))
+        self.pc += 1
+
+    def _exec_ldui(self, rd, rs, imm):
+        self.gprf.write_uint(rd, (imm << 17) | (self.gprf.read_unsigned(rs) & 0x1ffff))
+        self.pc += 1
+
+    def _exec_addi(self, rd, rs, imm):
+        self.gprf.write_uint(rd, self.gprf.read_signed(rs) + imm)
+        self.pc += 1
+
+    def _exec_lw(self, rd, imm, rt):
+        addr = self.gprf.read_unsigned(rt) + imm
+        self.gprf.write_uint(rd, self.data_mem.read_word_uint(addr))
+        self.pc += 1
+
+    def _exec_lb(self, rd, imm, rt):
+        addr = self.gprf.read_unsigned(rt) + imm
+        byte = self.data_mem.read_byte_uint(addr)
+        # signed extension
+        self.gprf.write_uint(rd, byte - ((byte & 0x80) << 1))
+        self.pc += 1
+
+    def _exec_lbu(self, rd, imm, rt):
+        addr = self.gprf.read_unsigned(rt) + imm
+        self.gprf.write_uint(rd, self.data_mem.read_byte_uint(addr))
+        self.pc += 1
+
+    def _exec_sw(self, rs, imm, rt):
+        addr = self.gprf.read_unsigned(rt) + imm
+        self.data_mem.write_word_uint(addr, self.gprf.read_unsigned(rs))
+        self.pc += 1
+
+    def _exec_sb(self, rs, imm, rt):
+        addr = self.gprf.read_unsigned(rt) + imm
+        self.data_mem.write_byte_uint(addr, self.gprf.read_unsigned(rs))
+        self.pc += 1
+
+    def _exec_smis(self, si, sq_list):
+        self.qotrf.set_sq_reg(si, sq_list)
+        self.pc += 1
+
+    def _exec_smit(self, ti, tq_list):
+        self.qotrf.set_tq_reg(ti, tq_list)
+        self.pc += 1
+
+    # handlers of instructions proven safe by the static verifier
+    def _exec_smis_unchecked(self, si, target):
+        self.qotrf.sq_regs[si] = target
+        self.pc += 1
+
+    def _exec_smit_unchecked(self, ti, target):
+        self.qotrf.tq_regs[ti] = target
+        self.pc += 1
+
+    def _exec_lw_unchecked(self, rd, addr):
+        self.gprf.write_uint(rd, self.data_mem.read_word_unchecked(addr))
+        self.pc += 1
+
+    def _exec_lb_unchecked(self, rd, addr):
+        byte = self.data_mem.read_byte_unchecked(addr)
+        self.gprf.write_uint(rd, byte - ((byte & 0x80) << 1))
+        self.pc += 1
+
+    def _exec_lbu_unchecked(self, rd, addr):
+        self.gprf.write_uint(rd, self.data_mem.read_byte_unchecked(addr))
+        self.pc += 1
+
+    def _exec_sw_unchecked(self, rs, addr):
+        self.data_mem.write_word_unchecked(addr, self.gprf.read_unsigned(rs))
+        self.pc += 1
+
+    def _exec_sb_unchecked(self, rs, addr):
+        self.data_mem.write_byte_unchecked(addr, self.gprf.read_unsigned(rs))
+        self.pc += 1
+
+    def _exec_flw_unchecked(self, fd, addr):
+        self.fprf.write_bits(fd, self.data_mem.read_word_unchecked(addr))
+        self.pc += 1
+
+    def _exec_fsw_unchecked(self, fs, addr):
+        self.data_mem.write_word_unchecked(addr, self.fprf.read_bits(fs))
+        self.pc += 1
+
+    def _exec_fcvt_w_s(self, rd, fs):
+        self.gprf.write_uint(rd, int(self.fprf.read_float(fs)))
+        self.pc += 1
+
+    def _exec_fcvt_s_w(self, fd, rs):
+        self.fprf.write_float(fd, float(self.gprf.read_signed(rs)))
+        self.pc += 1
+
+    def _exec_fmv_w_x(self, fd, rs):
+        self.fprf.write_bits(fd, self.gprf.read_unsigned(rs))
+        self.pc += 1
+
+    def _exec_fmv_x_w(self, rd, fs):
+        self.gprf.write_uint(rd, self.fprf.read_bits(fs))
+        self.pc += 1
+
+    def _exec_flw(self, fd, imm, rs):
+        addr = self.gprf.read_unsigned(rs) + imm
+        self.fprf.write_bits(fd, self.data_mem.read_word_uint(addr))
+        self.pc += 1
+
+    def _exec_fsw(self, fs, imm, rs):
+        addr = self.gprf.read_unsigned(rs) + imm
+        self.data_mem.write_word_uint(addr, self.fprf.read_bits(fs))
+        self.pc += 1
+
+    def _exec_fp_arith(self, op, fd, fs, ft):
+        self.fprf.write_float(fd, op(self.fprf.read_float(fs), self.fprf.read_float(ft)))
+        self.pc += 1
+
+    def _exec_fp_cmp(self, op, rd, fs, ft):
+        self.gprf.write_uint(rd, int(op(self.fprf.read_float(fs), self.fprf.read_float(ft))))
+        self.pc += 1
+
+    def _exec_bundle(self, q_ops):
+        for kind, reg, gate, op_name in q_ops:
+            if kind is Qop_kind.GATE:
+                if gate is None:
+                    self.qubit_state_sim.apply_single_qubit_gate_to(
+                        op_name, self.qotrf.sq_regs[reg])
+                else:
+                    self.qubit_state_sim.apply_prepared_gate_to(gate, self.qotrf.sq_regs[reg])
+
+            elif kind is Qop_kind.MEASURE:
+                target = self.qotrf.sq_regs[reg]
+                results = self.qubit_state_sim.measure_qubits(target)
+                for qubit, result in zip(target.qubits, results):
+                    self.msmt_result[qubit] = result
+                if self.post_selection is not None:
+                    self.check_post_selection(target.qubits, results)
+
+            elif kind is not Qop_kind.NULL:
+                # currently only support CZ operation
+                assert(kind is Qop_kind.CZ)
+                self.qubit_state_sim.apply_two_qubit_gate_to(self.qotrf.tq_regs[reg])
+
+        self.pc += 1
@@ -1,36 +1,117 @@
+import numpy as np
 import pycactus.global_config as gc
 
 
+class Op_target():
+    def __init__(self, mask: int, qubits: tuple):
+        '''The validated content of an operation target register.
+
+        Args:
+        - `mask` (int): the bitmask of the target. For single-qubit targets, bit `q` is
+          set for the qubit `q`. For two-qubit targets, bit `q0 * max_qubit_num + q1` is set
+          for the qubit pair `(q0, q1)`.
+        - `qubits` (tuple): the qubits (or qubit pairs) in the ascending order of `mask`.
+
+        The NumPy array `indices` holds the same qubits, for backends operating on
+        arrays of qubits.
+        '''
+        self.mask = mask
+        self.qubits = qubits
+        self.indices = np.array(qubits, dtype=np.intp)
+        self.indices.setflags(write=False)
+
+    def __len__(self):
+        return len(self.qubits)
+
+    def __iter__(self):
+        return iter(self.qubits)
+
+    def __repr__(self):
+        return 'Op_target({})'.format(list(self.qubits))
+
+
 class QOTRF():
     def __init__(self, max_qubit_num=7):
         self.max_qubit_num = max_qubit_num
         self.sq_regs = [None] * gc.NUM_SQ_QOTR
         self.tq_regs = [None] * gc.NUM_TQ_QOTR
+        self.clear_target_cache()
 
     def set_num_available_qubits(self, max_qubit_num):
         self.max_qubit_num = max_qubit_num
+        self.clear_target_cache()
 
-    def set_sq_reg(self, si, qubit_list):
-        assert(isinstance(qubit_list, list) and len(qubit_list) > 0)
+    def clear_target_cache(self):
+        # validated targets, by the given qubit lists and by their bitmasks
+        self._sq_targets = {}
+        self._sq_masks = {}
+        self._tq_targets = {}
+        self._tq_masks = {}
+
+    def sq_target(self, qubit_list):
+        '''Return the validated `Op_target` of the single-qubit list `qubit_list`.
 
-        if not all([qubit < self.max_qubit_num for qubit in qubit_list]):
+        The target is built and validated once per distinct list, and shared by all lists
+        with the same bitmask.
+        '''
+        key = tuple(qubit_list)
+        try:
+            return self._sq_targets[key]
+        except KeyError:
+            pass
+
+        assert(isinstance(qubit_list, (list, tuple)) and len(qubit_list) > 0)
+        if not all([0 <= qubit < self.max_qubit_num for qubit in qubit_list]):
             raise ValueError("Given qubit list ({}) contains "
                              "invalid qubit numbers.".format(qubit_list))
 
-        self.sq_regs[si] = qubit_list
+        mask = 0
+        for qubit in qubit_list:
+            mask |= 1 << qubit
+        if mask not in self._sq_masks:
+            self._sq_masks[mask] = Op_target(mask, tuple(sorted(set(key))))
 
-    def read_sq_reg(self, si):
-        return self.sq_regs[si]
+        target = self._sq_targets[key] = self._sq_masks[mask]
+        return target
 
-    def set_tq_reg(self, ti, qubit_pair_list):
-        assert(isinstance(qubit_pair_list, list) and len(qubit_pair_list) > 0)
+    def tq_target(self, qubit_pair_list):
+        '''Return the validated `Op_target` of the qubit pair list `qubit_pair_list`.'''
+        key = tuple(tuple(pair) for pair in qubit_pair_list)
+        try:
+            return self._tq_targets[key]
+        except KeyError:
+            pass
 
-        if not all([(qp[0] < self.max_qubit_num and qp[1] < self.max_qubit_num)
+        assert(isinstance(qubit_pair_list, (list, tuple)) and len(qubit_pair_list) > 0)
+        if not all([(0 <= qp[0] < self.max_qubit_num and 0 <= qp[1] < self.max_qubit_num)
                     for qp in qubit_pair_list]):
             raise ValueError("Given qubit list ({}) contains "
                              "invalid qubit numbers.".format(qubit_pair_list))
 
-        self.tq_regs[ti] = qubit_pair_list
+        mask = 0
+        for q0, q1 in key:
+            mask |= 1 << (q0 * self.max_qubit_num + q1)
+        if mask not in self._tq_masks:
+            self._tq_masks[mask] = Op_target(mask, tuple(sorted(set(key))))
+
+        target = self._tq_targets[key] = self._tq_masks[mask]
+        return target
+
+    def save_state(self):
+        '''Return the content of all registers, which can be restored by `restore_state`.'''
+        return (list(self.sq_regs), list(self.tq_regs))
+
+    def restore_state(self, state):
+        self.sq_regs[:], self.tq_regs[:] = state
+
+    def set_sq_reg(self, si, qubit_list):
+        self.sq_regs[si] = self.sq_target(qubit_list)
+
+    def read_sq_reg(self, si):
+        return self.sq_regs[si]
+
+    def set_tq_reg(self, ti, qubit_pair_list):
+        self.tq_regs[ti] = self.tq_target(qubit_pair_list)
 
     def read_tq_reg(self, ti):
         return self.tq_regs[ti]
@@ -1,40 +1,99 @@
 from .qubit_state_sim.quantumsim import Quantumsim
 from .qcp import Quantum_control_processor
 from .eqasm_parser import Eqasm_parser
+from .passes import Pass_pipeline
+from .parallel import Parallel_shot_executor
+from .simt import Simt_executor
+from .distributed import Distributed_shot_executor
+from .checkpoint import save_checkpoint, load_checkpoint, run_with_checkpoints
+import asyncio
 import logging
-from .utils import get_logger, update_log_file
+from .utils import get_logger, Instance_logger, new_log_file_handler
 
 logger = get_logger((__name__).split('.')[-1])
 
 
 class Quantum_coprocessor():
-    def __init__(self, num_available_qubits=7, log_level=logging.WARNING):
+    def __init__(self, num_available_qubits=7, log_level=logging.WARNING, mem_backend='dense'):
         """
         Top module of the python-version cactus.
+
+        All logging state is private to the instance, so that coprocessors can run in
+        parallel threads: the log level, and the log file opened by `update_log_file`.
+        Without a log file, the log goes to the handlers of the module loggers.
+
+        With `mem_backend='shared'`, the data memory is a `Shared_memory`, which other
+        processes can attach to by its name, `shared_mem_name`. The segment is destroyed
+        by `close`, on leaving a `with` block, or when the memory is garbage collected.
         """
+        self.logger = Instance_logger(logger, log_level)
+        self.log_handler = None
         self.qubit_sim = Quantumsim(num_available_qubits)
         self.qcp = Quantum_control_processor(
-            self.qubit_sim, num_available_qubits)
+            self.qubit_sim, num_available_qubits, mem_backend=mem_backend)
         self.eqasm_parser = Eqasm_parser()
+        self.pass_report = None
         self.set_log_level(log_level)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''Release the data memory, destroying its shared memory segment if any. The
+        coprocessor cannot be used afterwards.
+        '''
+        self.qcp.data_mem.close()
+
+    @property
+    def shared_mem_name(self):
+        '''The name of the shared memory segment holding the data memory, or `None`.'''
+        return getattr(self.qcp.data_mem, 'name', None)
+
     def set_num_available_qubits(self, num_available_qubits):
 
         self.qcp.set_num_available_qubits(num_available_qubits)
-        self.qubit_sim.__init__(num_available_qubits)
+        self.qubit_sim.__init__(num_available_qubits, self.logger.level)
+        self.qubit_sim.set_log_handler(self.log_handler)
 
     def set_log_level(self, log_level):
-        logger.setLevel(log_level)
+        self.logger.setLevel(log_level)
         self.qcp.set_log_level(log_level)
         self.qubit_sim.set_log_level(log_level)
 
+    def set_log_handler(self, handler):
+        '''Log into `handler` only, or into the module handlers if `None`.'''
+        self.logger.set_handler(handler)
+        self.qcp.set_log_handler(handler)
+        self.qubit_sim.set_log_handler(handler)
+
+    def update_log_file(self, log_filename=None):
+        '''Write the log of this coprocessor into a new file, see `new_log_file_handler`.
+        The previous log file of this coprocessor is closed.
+        '''
+        old_handler = self.log_handler
+        self.log_handler = new_log_file_handler(log_filename)
+        self.set_log_handler(self.log_handler)
+        if old_handler is not None:
+            old_handler.close()
+
     def set_max_exec_cycle(self, num_cycle: int):
         self.qcp.set_max_exec_cycle(num_cycle)
 
-    def upload_program(self, prog_fn, num_available_qubits=7):
+    def set_post_selection(self, post_selection):
+        '''Abort each shot as soon as it fails the `Post_selection` `post_selection`, and
+        count it as rejected in the shot results. `None` disables the post-selection.
+        '''
+        self.qcp.set_post_selection(post_selection)
+
+    def upload_program(self, prog_fn, num_available_qubits=7, optimize=False):
         '''Parse the eQASM assembly file and upload it to the instruction memory of the QCP.
         Args:
         - `prog_fn` (str/Path): the eQASM file to upload
+        - `optimize` (bool): run the default optimisation passes on the program before
+          uploading it. The report is then stored in `self.pass_report`.
 
         Return:
         - `True` when everything goes on successfully, otherwise `False`.
@@ -46,13 +105,115 @@ class Quantum_coprocessor():
             return False
 
         self.set_num_available_qubits(num_available_qubits)
-        return self.qcp.upload_program(insns)
+        pipeline = Pass_pipeline() if optimize else None
+        success = self.qcp.upload_program(insns, pipeline)
+        self.pass_report = pipeline.report() if optimize else None
+        return success
 
-    def execute(self):
+    def execute(self, checkpoint_path=None, checkpoint_every_cycles=None,
+                checkpoint_every_seconds=None, log_file=None):
         '''Return True when executes successfully.
+
+        Args:
+        - `checkpoint_path` (str/Path): if given, save a checkpoint of the machine state into
+          this file every `checkpoint_every_cycles` cycles and/or every
+          `checkpoint_every_seconds` seconds, and at the end. An interrupted execution
+          continues from the last checkpoint by `resume`.
+        - `log_file` (str/Path): if given, write the log into this file, see
+          `update_log_file`. Otherwise, the current log handler is kept.
+        '''
+        if log_file is not None:
+            self.update_log_file(log_file)
+        if checkpoint_path is None:
+            return self.qcp.run()
+        run_with_checkpoints(self.qcp, checkpoint_path, checkpoint_every_cycles,
+                             checkpoint_every_seconds)
+        self.logger.info("pycactus exits after executing {} cycles.".format(self.qcp.cycle))
+        return True
+
+    def save_checkpoint(self, path):
+        '''Save the machine state into the file `path`, see `checkpoint.save_checkpoint`.'''
+        save_checkpoint(self.qcp, path)
+
+    def load_checkpoint(self, path, warm_start=False):
+        '''Restore the machine state saved in the file `path` into the uploaded program.
+
+        With `warm_start`, the uploaded program can differ from the saved one, and starts
+        from the beginning with the saved registers, data memory and qubit state. This skips
+        preparing the same state again in each experiment.
         '''
-        update_log_file()
-        return self.qcp.run()
+        load_checkpoint(self.qcp, path, warm_start)
+
+    def resume(self, path, checkpoint_every_cycles=None, checkpoint_every_seconds=None,
+               log_file=None):
+        '''Continue the execution saved in the checkpoint `path` by the uploaded program.
+
+        The execution continues bit-exactly, including the measurement results. If a period
+        is given, checkpoints keep being saved into `path`.
+        '''
+        self.load_checkpoint(path)
+        if checkpoint_every_cycles is None and checkpoint_every_seconds is None:
+            path = None
+        return self.execute(path, checkpoint_every_cycles, checkpoint_every_seconds, log_file)
+
+    async def execute_async(self, cycles_per_yield=10000, log_file=None):
+        '''Like `execute`, yielding to the event loop every `cycles_per_yield` cycles.
+
+        Cancelling the awaiting task stops the program at the last yield, leaving the QCP in
+        the state reached.
+        '''
+        if log_file is not None:
+            self.update_log_file(log_file)
+        while not self.qcp.step(cycles_per_yield):
+            await asyncio.sleep(0)
+        self.logger.info("pycactus exits after executing {} cycles.".format(self.qcp.cycle))
+        return True
+
+    def run_shots(self, num_shots: int, mem_regions=(), seed=None, num_workers=1,
+                  lockstep=False, workers=None, log_file=None):
+        '''Run the uploaded program `num_shots` times, see
+        `Quantum_control_processor.run_shots`.
+
+        Args:
+        - `seed` (int): the seed of the measurements. A given seed produces the same
+          results whatever the number of workers.
+        - `num_workers` (int): the number of processes running the shots. If more than
+          one, the shots are run by a `Parallel_shot_executor`.
+        - `lockstep` (bool): run all shots together by a `Simt_executor`, which vectorises
+          the classical instructions over the shots. The results are the same.
+        - `workers` (list): the `(host, port)` addresses of `Shot_worker`s, possibly on
+          other machines. If given, the shots are run by a `Distributed_shot_executor`.
+        - `log_file` (str/Path): if given, write the log into this file, see
+          `update_log_file`.
+
+        Return:
+        - a `Shot_result` holding the results of all shots.
+        '''
+        if log_file is not None:
+            self.update_log_file(log_file)
+        if lockstep:
+            if num_workers > 1 or workers is not None:
+                raise ValueError("Lock-step shots are run by a single process.")
+            return Simt_executor(self.qcp).run_shots(num_shots, mem_regions, seed=seed)
+        if workers is not None:
+            executor = Distributed_shot_executor(self.qcp, workers)
+            return executor.run_shots(num_shots, mem_regions, seed=seed)
+        if num_workers > 1:
+            executor = Parallel_shot_executor(self.qcp, num_workers=num_workers)
+            return executor.run_shots(num_shots, mem_regions, seed=seed)
+        return self.qcp.run_shots(num_shots, mem_regions, seed=seed)
 
     def read_result(self):
         return self.qcp.get_data_mem()
+
+    def view_result(self, addr: int, dtype, shape, writable: bool = False):
+        '''Return the array of type `dtype` and shape `shape` stored in the data memory at
+        `addr`, as a view of the memory, see `Memory.view`.
+        '''
+        return self.qcp.data_mem.view(addr, dtype, shape, writable=writable)
+
+    def load_data(self, addr: int, buffer):
+        '''Copy `buffer`, e.g., a NumPy array, into the data memory at `addr`, see
+        `Memory.load`.
+        '''
+        self.qcp.data_mem.load(addr, buffer)
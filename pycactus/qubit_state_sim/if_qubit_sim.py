@@ -8,6 +8,48 @@ class If_qubit_sim:
         """
         self.name = name
 
+    def instance_factory(self):
+        '''Return a picklable callable creating a new simulator of the same kind and with the
+        same qubits as this one, in the initial state. The executors running shots in
+        lock-step or in other processes use it to get one simulator per shot or process.
+        '''
+        raise NotImplementedError("The qubit state simulator '{}' cannot create independent "
+                                  "instances. Run its shots by `run_shots` of the "
+                                  "QCP.".format(self.name))
+
+    def new_instance(self):
+        '''Return a new simulator created by `instance_factory`.'''
+        return self.instance_factory()()
+
+    def reset(self):
+        '''Reset all qubits to the initial state, keeping the prepared gates.'''
+        raise NotImplementedError
+
+    def set_rng(self, rng):
+        '''Use the random number generator `rng`, providing `random()`, to sample the
+        measurement results.
+        '''
+        raise NotImplementedError
+
+    def save_state(self):
+        '''Return a copy of the state of all qubits, which can be restored by `restore_state`
+        any number of times.
+        '''
+        raise NotImplementedError
+
+    def restore_state(self, state):
+        raise NotImplementedError
+
+    def export_state(self):
+        '''Return the state of all qubits as `(meta, arrays)` for saving it to a file: `meta`
+        can be serialised to JSON, and `arrays` maps names onto NumPy arrays.
+        '''
+        raise NotImplementedError
+
+    def import_state(self, meta, arrays):
+        '''Restore the state returned by `export_state`.'''
+        raise NotImplementedError
+
     def apply_single_qubit_gate(self, operation, qubit):
         raise NotImplementedError
 
@@ -16,3 +58,28 @@ class If_qubit_sim:
 
     def measure_qubit(self, qubit):
         raise NotImplementedError
+
+    # The following methods operate on all qubits of an `Op_target`, which provides the
+    # qubits both as a tuple (`qubits`) and as a NumPy index array (`indices`). Backends
+    # able to operate on qubit arrays can override them to use `indices` directly.
+    def apply_single_qubit_gate_to(self, operation, target):
+        for qubit in target.qubits:
+            self.apply_single_qubit_gate(operation, qubit)
+
+    def apply_two_qubit_gate_to(self, target):
+        for qubit0, qubit1 in target.qubits:
+            self.apply_two_qubit_gate(qubit0, qubit1)
+
+    def prepare_gate(self, operation):
+        '''Return a handle of the single-qubit gate `operation`, which is prepared once when
+        the program is uploaded and passed to `apply_prepared_gate_to` on each execution.
+        By default, the handle is the operation name itself.
+        '''
+        return operation
+
+    def apply_prepared_gate_to(self, gate, target):
+        self.apply_single_qubit_gate_to(gate, target)
+
+    def measure_qubits(self, target):
+        '''Return the measurement results of the qubits in `target.qubits`, in order.'''
+        return [self.measure_qubit(qubit) for qubit in target.qubits]
@@ -1,7 +1,8 @@
 from logging import log
+from functools import partial
 from .quantumsim_wrapper import interface_quantumsim
 from .if_qubit_sim import If_qubit_sim
-from pycactus.utils import get_logger
+from pycactus.utils import get_logger, Instance_logger
 import logging
 
 logger = get_logger((__name__).split('.')[-1])
@@ -13,15 +14,41 @@ class Quantumsim(If_qubit_sim):
         Interface for the qubit state simulator .
         """
         super().__init__('quantumsim')
+        self.logger = Instance_logger(logger, log_level)
 
         self.quantumsim = interface_quantumsim()
         self.quantumsim.init_dm(num_qubit)
         self.quantumsim.print_classical_state()
         self.set_log_level(log_level)
-        logger.info("initialize quantumsim")
+        self.logger.info("initialize quantumsim")
 
     def set_log_level(self, log_level):
-        logger.setLevel(log_level)
+        self.logger.setLevel(log_level)
+
+    def set_log_handler(self, handler):
+        '''Log into `handler` only, or into the module handlers if `None`.'''
+        self.logger.set_handler(handler)
+
+    def instance_factory(self):
+        return partial(Quantumsim, self.quantumsim.num_qubit, self.logger.level)
+
+    def reset(self):
+        self.quantumsim.reset()
+
+    def set_rng(self, rng):
+        self.quantumsim.rng = rng
+
+    def save_state(self):
+        return self.quantumsim.save_state()
+
+    def restore_state(self, state):
+        self.quantumsim.restore_state(state)
+
+    def export_state(self):
+        return self.quantumsim.export_state()
+
+    def import_state(self, meta, arrays):
+        self.quantumsim.import_state(meta, arrays)
 
     def apply_idle_gate(self, idle_duration, qubit):
         self.quantumsim.calculate_gamma_lamda(idle_duration)
@@ -29,20 +56,48 @@ class Quantumsim(If_qubit_sim):
         self.quantumsim.apply_ptm()
 
     def apply_single_qubit_gate(self, operation, qubit):
-        logger.info("apply operation {} on qubit {}".format(operation, qubit))
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("apply operation {} on qubit {}".format(operation, qubit))
         if operation.lower() == 'null':
             return
         self.quantumsim.prepare_ptm(operation)
         self.quantumsim.apply_ptm(qubit)
 
+    def apply_single_qubit_gate_to(self, operation, target):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("apply operation {} on qubits {}".format(operation, list(target.qubits)))
+        if operation.lower() == 'null':
+            return
+        # the same PTM is applied on all qubits
+        self.quantumsim.prepare_ptm(operation)
+        for qubit in target.qubits:
+            self.quantumsim.apply_ptm(qubit)
+
+    def prepare_gate(self, operation):
+        '''Return the PTM of `operation`, or `None` for the null operation.'''
+        if operation.lower() == 'null':
+            return None
+        return self.quantumsim.get_ptm(operation)
+
+    def apply_prepared_gate_to(self, gate, target):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("apply a prepared PTM on qubits {}".format(list(target.qubits)))
+        if gate is None:
+            return
+        self.quantumsim.ptm = gate
+        for qubit in target.qubits:
+            self.quantumsim.apply_ptm(qubit)
+
     def apply_two_qubit_gate(self, qubit0, qubit1):
-        logger.info("apply CZ on qubit pair ({}, {})".format(qubit0, qubit1))
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("apply CZ on qubit pair ({}, {})".format(qubit0, qubit1))
         self.quantumsim.prepare_two_ptm()
         self.quantumsim.apply_two_ptm(qubit0, qubit1)
 
     def measure_qubit(self, qubit):
-        logger.info("measure qubit: {}".format(qubit))
-        self.quantumsim.prepare_idling_ptm()
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("measure qubit: {}".format(qubit))
+        self.quantumsim.ptm = self.quantumsim.get_idling_ptm()
         self.quantumsim.apply_ptm(qubit)
         self.quantumsim.apply_measurement(qubit)
         msmt_result = self.quantumsim.return_measurement_result()
@@ -5,6 +5,8 @@ from quantumsim.sparsedm import *
 from quantumsim.circuit import *
 from quantumsim.ptm import *
 import random
+import copy
+from collections import defaultdict
 
 log = get_logger((__name__).split('.')[-1])
 log.setLevel(logging.WARNING)
@@ -55,6 +57,14 @@ class interface_quantumsim:
 
         self.error_on = False
 
+        # the random number generator sampling the measurement results, which can be any
+        # object providing `random()`. Each instance has its own generator, so that
+        # simulators in different threads never share one.
+        self.rng = random.Random()
+
+        # PTMs built by `get_ptm`, by operation name
+        self.ptm_cache = {}
+
     def init_dm(self, num_qubit):
 
         self.num_qubit = num_qubit
@@ -66,6 +76,108 @@ class interface_quantumsim:
 
         log.info("The density matrix has been initialized successfully.")
 
+    def reset(self):
+        '''Reset all qubits to |0> and clear the recorded measurement results.'''
+        self.sdm = SparseDM(self.num_qubit)
+        for i in range(0, self.num_qubit):
+            self.measurements[i] = []
+        self.current_measurement = None
+
+    @staticmethod
+    def copy_sdm(sdm):
+        '''Return an independent copy of the sparse density matrix `sdm`.
+
+        `SparseDM.copy` shares the pending single-qubit PTMs with the original and drops the
+        classical probability, so that the copy cannot be used to restore a state.
+        '''
+        cp = copy.copy(sdm)
+        cp.classical = sdm.classical.copy()
+        cp.idx_in_full_dm = sdm.idx_in_full_dm.copy()
+        cp.full_dm = sdm.full_dm.copy()
+        cp.single_ptms_to_do = defaultdict(list, {bit: list(ptms) for bit, ptms
+                                                  in sdm.single_ptms_to_do.items()})
+        return cp
+
+    def save_state(self):
+        '''Return the state of the qubits and the recorded measurement results.'''
+        return (self.copy_sdm(self.sdm),
+                {qubit: list(results) for qubit, results in self.measurements.items()},
+                self.current_measurement)
+
+    def restore_state(self, state):
+        '''Restore the state returned by `save_state`, which can be restored again later.'''
+        sdm, measurements, self.current_measurement = state
+        self.sdm = self.copy_sdm(sdm)
+        self.measurements = {qubit: list(results) for qubit, results in measurements.items()}
+
+    def export_state(self):
+        '''Return the state of the qubits, the recorded measurement results and the random
+        number generator as `(meta, arrays)`, where `meta` can be serialised to JSON and
+        `arrays` maps names onto NumPy arrays. The state is restored by `import_state`.
+        '''
+        sdm = self.sdm
+        arrays = {'full_dm': sdm.full_dm.dm}
+        pending_ptms = {}
+        for bit, ptms in sdm.single_ptms_to_do.items():
+            pending_ptms[str(bit)] = len(ptms)
+            for i, ptm in enumerate(ptms):
+                arrays['ptm_{}_{}'.format(bit, i)] = ptm
+
+        meta = {
+            'num_qubit': self.num_qubit,
+            'classical': [[bit, int(value)] for bit, value in sdm.classical.items()],
+            'idx_in_full_dm': [[bit, idx] for bit, idx in sdm.idx_in_full_dm.items()],
+            'full_dm_qubits': sdm.full_dm.no_qubits,
+            'max_bits_in_full_dm': sdm.max_bits_in_full_dm,
+            'classical_probability': float(sdm.classical_probability),
+            'pending_ptms': pending_ptms,
+            'measurements': [[qubit, [int(r) for r in results]]
+                             for qubit, results in self.measurements.items()],
+            'current_measurement': (None if self.current_measurement is None
+                                    else int(self.current_measurement)),
+            'rng': self.export_rng_state()
+        }
+        return meta, arrays
+
+    def import_state(self, meta, arrays):
+        '''Restore the state returned by `export_state`.'''
+        if meta['num_qubit'] != self.num_qubit:
+            raise ValueError("The saved state has {} qubits, but the simulator has "
+                             "{}.".format(meta['num_qubit'], self.num_qubit))
+        sdm = SparseDM(self.num_qubit)
+        sdm.classical = {bit: value for bit, value in meta['classical']}
+        sdm.idx_in_full_dm = {bit: idx for bit, idx in meta['idx_in_full_dm']}
+        sdm.full_dm = type(sdm.full_dm)(meta['full_dm_qubits'])
+        sdm.full_dm.dm = np.array(arrays['full_dm'])
+        sdm.max_bits_in_full_dm = meta['max_bits_in_full_dm']
+        sdm.classical_probability = meta['classical_probability']
+        for bit, num_ptms in meta['pending_ptms'].items():
+            sdm.single_ptms_to_do[int(bit)] = [np.array(arrays['ptm_{}_{}'.format(bit, i)])
+                                               for i in range(num_ptms)]
+        self.sdm = sdm
+        self.measurements = {qubit: list(results) for qubit, results in meta['measurements']}
+        self.current_measurement = meta['current_measurement']
+        self.import_rng_state(meta['rng'])
+
+    def export_rng_state(self):
+        if isinstance(self.rng, random.Random):
+            version, internal_state, gauss_next = self.rng.getstate()
+            return {'kind': 'random', 'state': [version, list(internal_state), gauss_next]}
+        if isinstance(self.rng, np.random.Generator):
+            return {'kind': 'numpy', 'state': self.rng.bit_generator.state}
+        raise ValueError("Cannot save the state of the random number generator "
+                         "{}.".format(self.rng))
+
+    def import_rng_state(self, saved):
+        if saved['kind'] == 'random':
+            version, internal_state, gauss_next = saved['state']
+            self.rng = random.Random()
+            self.rng.setstate((version, tuple(internal_state), gauss_next))
+        else:
+            bit_generator = getattr(np.random, saved['state']['bit_generator'])()
+            bit_generator.state = saved['state']
+            self.rng = np.random.Generator(bit_generator)
+
     def extract_angle_from_op_name(self, name):
         pass
 
@@ -133,12 +245,40 @@ class interface_quantumsim:
         else:
             self.ptm = []
 
-        log.debug("PTM preprared for operation {}: \n\t{}".format(
-            quantum_operation, "{}".format(self.ptm.round(round_precision)).replace('\n', '\n\t')))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("PTM preprared for operation {}: \n\t{}".format(
+                quantum_operation,
+                "{}".format(self.ptm.round(round_precision)).replace('\n', '\n\t')))
+
+    def get_ptm(self, quantum_operation):
+        '''Return the PTM of `quantum_operation`, which is built only once per operation.
+
+        The returned PTM is read-only and shared by all applications of the operation.
+        '''
+        try:
+            return self.ptm_cache[quantum_operation]
+        except KeyError:
+            pass
+
+        self.prepare_ptm(quantum_operation)
+        ptm = np.asarray(self.ptm)
+        ptm.setflags(write=False)
+        self.ptm_cache[quantum_operation] = ptm
+        return ptm
+
+    def get_idling_ptm(self):
+        '''Return the PTM of `prepare_idling_ptm`, built once for the current error setting.'''
+        key = ('idle', self.error_on, self.gamma, self.lamda)
+        if key not in self.ptm_cache:
+            self.prepare_idling_ptm()
+            self.ptm.setflags(write=False)
+            self.ptm_cache[key] = self.ptm
+        return self.ptm_cache[key]
 
     def apply_ptm(self, bit):
-        log.debug("The following PTM is applied on qubit {}:\n\t{}".format(
-            bit, "{}".format(self.ptm.round(round_precision)).replace('\n', '\n\t')))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("The following PTM is applied on qubit {}:\n\t{}".format(
+                bit, "{}".format(self.ptm.round(round_precision)).replace('\n', '\n\t')))
         self.sdm.apply_ptm(bit, self.ptm)
 
     def apply_mock_meas(self, fn: str):
@@ -152,13 +292,15 @@ class interface_quantumsim:
         self.sdm.combine_and_apply_single_ptm(bit)
         # self.apply_all_pending()
 
-        log.debug("The full density matrix before applying measurement: \n\t{}".format(
-            "{}".format(self.sdm.full_dm.to_array().round(round_precision)).replace('\n', '\n\t')))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("The full density matrix before applying measurement: \n\t{}".format(
+                "{}".format(self.sdm.full_dm.to_array().round(round_precision)).replace(
+                    '\n', '\n\t')))
 
         # Obtain the two partial traces (p0, p1) that define the probabilities
         # for measuring bit in state (0, 1)
         p0, p1 = self.sdm.peak_measurement(bit)
-        log.debug("partial traces for this measurement: {}, {}".format(p0, p1))
+        log.debug("partial traces for this measurement: %s, %s", p0, p1)
 
         # Sample from these two possibilities
 
@@ -166,15 +308,15 @@ class interface_quantumsim:
         # declare, project, cond_prob = self.sampler.send((p0, p1))
 
         # using fully random
-        r = random.random()
-        log.debug("the random value for measuremnt: {}".format(r))
+        r = self.rng.random()
+        log.debug("the random value for measuremnt: %s", r)
 
         if r < p0 / (p0 + p1):
             project = 0
         else:
             project = 1
 
-        r = random.random()
+        r = self.rng.random()
         if r < self.readout_error:
             decl = 1 - project
             prob = self.readout_error
@@ -202,7 +344,7 @@ class interface_quantumsim:
 
     def apply_two_ptm(self, bit0, bit1):
 
-        log.debug("CZ applied on qubit {} and {}.".format(bit0, bit1))
+        log.debug("CZ applied on qubit %s and %s.", bit0, bit1)
 
         self.sdm.apply_two_ptm(bit0, bit1, self.ptm)
 
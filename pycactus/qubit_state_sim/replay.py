@@ -0,0 +1,208 @@
+'''Recording the measurement results of a run, and replaying them without simulating qubits.
+
+`Recording_sim` wraps any qubit state simulator and records every measurement result into
+a `Measurement_record`, which can be saved into a compact file. `Replay_sim` then returns
+the recorded results in the same order, and ignores all gates, so that the classical part
+of a program runs at the speed of the QCP alone.
+
+Shots are delimited by `reset`, which the QCP calls before each shot of `run_shots`: the
+next shot starts at the first measurement after a reset.
+
+File format (little-endian): `MAGIC`, the 16-bit `FORMAT_VERSION`, then zlib-compressed
+the 32-bit number of shots, the 32-bit number of measurements of each shot, and one byte
+per measurement, holding the qubit in bits 7 to 1 and the result in bit 0.
+'''
+import os
+import struct
+import zlib
+import numpy as np
+from .if_qubit_sim import If_qubit_sim
+
+MAGIC = b'PYCAMSMT'
+FORMAT_VERSION = 1
+
+_header = struct.Struct('<8sH')
+
+
+class Measurement_record():
+    def __init__(self, shots=None):
+        '''The measurement results of several shots.
+
+        Attributes:
+        - `shots` (list): for each shot, a `uint8` array with one entry per measurement,
+          `qubit << 1 | result`, in the order of the measurements.
+        '''
+        self.shots = [] if shots is None else list(shots)
+
+    def __len__(self):
+        return len(self.shots)
+
+    def results(self, shot: int):
+        '''Return the `(qubit, result)` pairs of the measurements of the shot `shot`.'''
+        return [(int(entry) >> 1, int(entry) & 1) for entry in self.shots[shot]]
+
+    def save(self, path):
+        counts = np.array([len(shot) for shot in self.shots], dtype='<u4')
+        body = struct.pack('<I', len(self.shots)) + counts.tobytes()
+        body += b''.join(np.asarray(shot, dtype=np.uint8).tobytes() for shot in self.shots)
+        with open(path, 'wb') as f:
+            f.write(_header.pack(MAGIC, FORMAT_VERSION))
+            f.write(zlib.compress(body))
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            header = f.read(_header.size)
+            if len(header) < _header.size or _header.unpack(header)[0] != MAGIC:
+                raise ValueError("The file {} is not a measurement record.".format(path))
+            version = _header.unpack(header)[1]
+            if version != FORMAT_VERSION:
+                raise ValueError("Unsupported measurement record version {} (supported: "
+                                 "{}).".format(version, FORMAT_VERSION))
+            body = zlib.decompress(f.read())
+
+        num_shots = struct.unpack_from('<I', body)[0]
+        counts = np.frombuffer(body, dtype='<u4', count=num_shots, offset=4)
+        offsets = 4 + 4 * num_shots + np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        data = np.frombuffer(body, dtype=np.uint8)
+        return Measurement_record([data[start:end] for start, end in
+                                   zip(offsets[:-1], offsets[1:])])
+
+
+class Recording_sim(If_qubit_sim):
+    def __init__(self, backend):
+        '''Qubit state simulator recording the measurement results of `backend`, to which
+        all operations are forwarded.
+        '''
+        super().__init__('recording {}'.format(backend.name))
+        self.backend = backend
+        self.shots = []
+        # the measurements of the current shot
+        self.current = []
+
+    def record(self):
+        '''Return the `Measurement_record` of the shots run so far.'''
+        shots = self.shots + ([self.current] if len(self.current) > 0 else [])
+        return Measurement_record([np.array(shot, dtype=np.uint8) for shot in shots])
+
+    def clear(self):
+        self.shots = []
+        self.current = []
+
+    def reset(self):
+        if len(self.current) > 0:
+            self.shots.append(self.current)
+            self.current = []
+        self.backend.reset()
+
+    def set_rng(self, rng):
+        self.backend.set_rng(rng)
+
+    def save_state(self):
+        return self.backend.save_state()
+
+    def restore_state(self, state):
+        self.backend.restore_state(state)
+
+    def apply_single_qubit_gate(self, operation, qubit):
+        self.backend.apply_single_qubit_gate(operation, qubit)
+
+    def apply_two_qubit_gate(self, qubit0, qubit1):
+        self.backend.apply_two_qubit_gate(qubit0, qubit1)
+
+    def measure_qubit(self, qubit):
+        result = self.backend.measure_qubit(qubit)
+        self.current.append(qubit << 1 | int(result))
+        return result
+
+    def apply_single_qubit_gate_to(self, operation, target):
+        self.backend.apply_single_qubit_gate_to(operation, target)
+
+    def apply_two_qubit_gate_to(self, target):
+        self.backend.apply_two_qubit_gate_to(target)
+
+    def prepare_gate(self, operation):
+        return self.backend.prepare_gate(operation)
+
+    def apply_prepared_gate_to(self, gate, target):
+        self.backend.apply_prepared_gate_to(gate, target)
+
+    def measure_qubits(self, target):
+        results = self.backend.measure_qubits(target)
+        self.current.extend(qubit << 1 | int(result)
+                            for qubit, result in zip(target.qubits, results))
+        return results
+
+
+class Replay_sim(If_qubit_sim):
+    def __init__(self, record, check_qubits=True):
+        '''Qubit state simulator returning the measurement results of `record`, a
+        `Measurement_record` or the path of a saved one. Gates are ignored.
+
+        Args:
+        - `check_qubits` (bool): raise a `ValueError` when a measured qubit is not the
+          recorded one, i.e., when the program diverges from the recorded run.
+        '''
+        super().__init__('replay')
+        if isinstance(record, (str, os.PathLike)):
+            record = Measurement_record.load(record)
+        elif not isinstance(record, Measurement_record):
+            raise TypeError("Given record ({}) is neither a `Measurement_record` nor a "
+                            "path.".format(type(record).__name__))
+        self.record = record
+        self.check_qubits = check_qubits
+        self.shot = 0
+        # the index of the next measurement in the current shot
+        self.pos = 0
+
+    def reset(self):
+        # a shot without measurements is not recorded, see `Recording_sim.reset`
+        if self.pos > 0:
+            self.shot += 1
+            self.pos = 0
+
+    def set_rng(self, rng):
+        pass
+
+    def save_state(self):
+        return (self.shot, self.pos)
+
+    def restore_state(self, state):
+        self.shot, self.pos = state
+
+    def apply_single_qubit_gate(self, operation, qubit):
+        pass
+
+    def apply_two_qubit_gate(self, qubit0, qubit1):
+        pass
+
+    def measure_qubit(self, qubit):
+        if self.shot >= len(self.record.shots):
+            raise ValueError("The replayed run has more shots than the record ({}).".format(
+                len(self.record.shots)))
+        shot = self.record.shots[self.shot]
+        if self.pos >= len(shot):
+            raise ValueError("The shot {} measures more qubits than recorded ({}).".format(
+                self.shot, len(shot)))
+        entry = int(shot[self.pos])
+        if self.check_qubits and entry >> 1 != qubit:
+            raise ValueError("The measurement {} of the shot {} is on the qubit {}, but the "
+                             "qubit {} was recorded.".format(self.pos, self.shot, qubit,
+                                                             entry >> 1))
+        self.pos += 1
+        return entry & 1
+
+    def apply_single_qubit_gate_to(self, operation, target):
+        pass
+
+    def apply_two_qubit_gate_to(self, target):
+        pass
+
+    def prepare_gate(self, operation):
+        return None
+
+    def apply_prepared_gate_to(self, gate, target):
+        pass
+
+    def measure_qubits(self, target):
+        return [self.measure_qubit(qubit) for qubit in target.qubits]
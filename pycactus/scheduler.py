@@ -0,0 +1,102 @@
+'''Time-sliced execution of many QCPs in one process.
+
+`Qcp_scheduler` multiplexes the programs uploaded to several QCPs by resuming each of them
+in turn for a fixed number of cycles with `Quantum_control_processor.step`, so that a short
+program finishes after a few slices even when sharing the scheduler with programs running
+for millions of cycles. Jobs can be cancelled between slices, and `run_async` yields to the
+asyncio event loop after every round.
+'''
+import asyncio
+from .utils import get_logger
+
+logger = get_logger((__name__).split('.')[-1])
+
+
+class Qcp_job():
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, qcp, name=None):
+        '''A program run by `Qcp_scheduler` on the QCP `qcp`.
+
+        Attributes:
+        - `status` (str): one of `PENDING`, `RUNNING`, `DONE` and `CANCELLED`.
+        - `num_slices` (int): the number of time slices given to the job so far.
+        '''
+        self.qcp = qcp
+        self.name = name
+        self.status = Qcp_job.PENDING
+        self.num_slices = 0
+
+    def cancel(self):
+        '''Stop giving time slices to the job. The QCP keeps the state reached.'''
+        if self.status in [Qcp_job.PENDING, Qcp_job.RUNNING]:
+            self.status = Qcp_job.CANCELLED
+
+    def is_active(self):
+        return self.status in [Qcp_job.PENDING, Qcp_job.RUNNING]
+
+    def __repr__(self):
+        return 'Qcp_job({}, {}, cycle: {})'.format(self.name, self.status, self.qcp.cycle)
+
+
+class Qcp_scheduler():
+    def __init__(self, time_slice=10000):
+        '''Round-robin scheduler of the programs of several QCPs.
+
+        Args:
+        - `time_slice` (int): the number of cycles a job runs before the next job resumes.
+        '''
+        if time_slice <= 0:
+            raise ValueError("The time slice ({}) must be positive.".format(time_slice))
+        self.time_slice = time_slice
+        self.jobs = []
+
+    def submit(self, qcp, name=None):
+        '''Add a job running the program uploaded to `qcp` from its current state.
+
+        Return:
+        - the `Qcp_job`, which can be used to follow or cancel the job.
+        '''
+        job = Qcp_job(qcp, name)
+        self.jobs.append(job)
+        return job
+
+    def active_jobs(self):
+        return [job for job in self.jobs if job.is_active()]
+
+    def run_round(self):
+        '''Give one time slice to every active job in turn.
+
+        Return:
+        - the number of jobs still active after the round.
+        '''
+        num_active = 0
+        for job in self.jobs:
+            if not job.is_active():
+                continue
+            job.status = Qcp_job.RUNNING
+            job.num_slices += 1
+            if job.qcp.step(self.time_slice):
+                job.status = Qcp_job.DONE
+                logger.info("Job %s finished after %d cycles in %d slices.",
+                            job.name, job.qcp.cycle, job.num_slices)
+            else:
+                num_active += 1
+
+        self.jobs = [job for job in self.jobs if job.is_active()]
+        return num_active
+
+    def run(self):
+        '''Run rounds until all jobs are finished or cancelled.'''
+        while self.run_round() > 0:
+            pass
+
+    async def run_async(self):
+        '''Like `run`, yielding to the event loop after every round. Jobs can be submitted
+        and cancelled by other tasks meanwhile.
+        '''
+        while self.run_round() > 0:
+            await asyncio.sleep(0)
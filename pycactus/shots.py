@@ -0,0 +1,147 @@
+import numpy as np
+
+
+def shot_rng(seed: int, shot: int):
+    '''Return the random number generator of the shot `shot` in a run seeded by `seed`.
+
+    Each shot draws from its own stream, derived from `seed` and the shot index only, so
+    that the results do not depend on how the shots are distributed over workers.
+    '''
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shot,)))
+
+
+# the value of `stop_bit` of a QCP whose shot was aborted by its post-selection
+STOP_REJECTED = 2
+
+
+class Shot_rejected(Exception):
+    '''Raised by the engines to abort a shot failing its post-selection.'''
+    pass
+
+
+class Post_selection():
+    def __init__(self):
+        '''The conditions a shot must satisfy to be accepted.
+
+        The conditions are checked right after each measurement, and the shot is aborted
+        as soon as one fails, so that rejected shots only cost the cycles up to the failing
+        measurement. The memory conditions are also checked at the end of the shot.
+        '''
+        # the required result by qubit
+        self.msmt_values = {}
+        # `(addr, value, mask)` of the words rejecting the shot when `word & mask == value`
+        self.word_rejects = []
+
+    def require_msmt(self, qubit: int, value: int):
+        '''Reject the shot if a measurement of the qubit `qubit` does not give `value`.'''
+        if value not in [0, 1]:
+            raise ValueError("The required measurement result ({}) must be 0 or 1.".format(
+                value))
+        self.msmt_values[qubit] = value
+        return self
+
+    def reject_word(self, addr: int, value: int, mask: int = 0xffffffff):
+        '''Reject the shot once the word at `addr`, masked by `mask`, equals `value`. For
+        instance, the program can write a flag there when a heralding check fails.
+        '''
+        self.word_rejects.append((addr, value & mask, mask))
+        return self
+
+    def accepts_msmt(self, qubits, results):
+        '''Return whether the measurement results `results` of the qubits `qubits` satisfy
+        the conditions.
+        '''
+        msmt_values = self.msmt_values
+        for qubit, result in zip(qubits, results):
+            required = msmt_values.get(qubit)
+            if required is not None and result != required:
+                return False
+        return True
+
+    def accepts_words(self, read_word):
+        '''Return whether the data memory, whose words are read by `read_word(addr)`,
+        satisfies the conditions.
+        '''
+        for addr, value, mask in self.word_rejects:
+            if read_word(addr) & mask == value:
+                return False
+        return True
+
+
+class Shot_result():
+    def __init__(self, num_shots: int, num_qubits: int, mem_regions=(), mem_size=None):
+        '''The results of running the same program for `num_shots` shots.
+
+        Args:
+        - `num_shots` (int): the number of shots.
+        - `num_qubits` (int): the number of available qubits.
+        - `mem_regions` (list): `(addr, size)` pairs of the data memory regions recorded
+          after each shot.
+        - `mem_size` (int): the size of the data memory, used to check the regions.
+
+        Attributes:
+        - `msmt_results` (ndarray): `(num_shots, num_qubits)` array of the last measurement
+          result of each qubit in each shot.
+        - `cycles` (ndarray): the number of cycles executed by each shot.
+        - `accepted` (ndarray): whether each shot was accepted by the post-selection. A
+          rejected shot stops at the measurement failing it.
+        - `mem_regions` (dict): maps each `(addr, size)` region onto a `(num_shots, size)`
+          array of its bytes after each shot.
+        '''
+        self.num_shots = num_shots
+        # the seed of the run, or `None` if the shots used the default generator
+        self.seed = None
+        self.msmt_results = np.zeros((num_shots, num_qubits), dtype=np.uint8)
+        self.cycles = np.zeros(num_shots, dtype=np.int64)
+        self.accepted = np.ones(num_shots, dtype=bool)
+        self.mem_regions = {}
+        for addr, size in mem_regions:
+            if addr < 0 or size <= 0 or (mem_size is not None and addr + size > mem_size):
+                raise ValueError("Given memory region (addr: 0x{:x}, size: {}) is out of "
+                                 "the data memory.".format(addr, size))
+            self.mem_regions[(addr, size)] = np.zeros((num_shots, size), dtype=np.uint8)
+
+    @staticmethod
+    def merge(results):
+        '''Return the results of consecutive chunks of shots `results` merged in order.'''
+        merged = Shot_result(0, results[0].msmt_results.shape[1])
+        merged.num_shots = sum(result.num_shots for result in results)
+        merged.seed = results[0].seed
+        merged.msmt_results = np.concatenate([result.msmt_results for result in results])
+        merged.cycles = np.concatenate([result.cycles for result in results])
+        merged.accepted = np.concatenate([result.accepted for result in results])
+        merged.mem_regions = {region: np.concatenate([result.mem_regions[region]
+                                                      for result in results])
+                              for region in results[0].mem_regions}
+        return merged
+
+    def record(self, shot: int, qcp):
+        '''Record the results of the shot `shot` from the QCP `qcp`.'''
+        self.msmt_results[shot] = qcp.msmt_result
+        self.cycles[shot] = qcp.cycle
+        self.accepted[shot] = qcp.stop_bit != STOP_REJECTED
+        for (addr, size), data in self.mem_regions.items():
+            data[shot] = np.frombuffer(qcp.data_mem.read_bytes(addr, size), dtype=np.uint8)
+
+    def memory(self, addr: int, size: int):
+        '''Return the bytes of the recorded region `(addr, size)` for all shots.'''
+        return self.mem_regions[(addr, size)]
+
+    def words(self, addr: int, size: int):
+        '''Return the recorded region `(addr, size)` as little-endian 32-bit words.'''
+        return self.mem_regions[(addr, size)].view('<u4')
+
+    def num_accepted(self):
+        return int(self.accepted.sum())
+
+    def num_rejected(self):
+        return self.num_shots - self.num_accepted()
+
+    def histogram(self):
+        '''Return a dict mapping each outcome, a tuple with the measurement result of each
+        qubit, onto the number of accepted shots producing it.
+        '''
+        outcomes, counts = np.unique(self.msmt_results[self.accepted], axis=0,
+                                     return_counts=True)
+        return {tuple(int(bit) for bit in outcome): int(count)
+                for outcome, count in zip(outcomes, counts)}
@@ -0,0 +1,544 @@
+'''Lock-step (SIMT) execution of many shots of one program.
+
+Most shots of a program run the same classical control flow and differ only in the
+measurement results. `Simt_executor` runs `K` shots, the lanes, together: the GPRs, FPRs,
+comparison flags and measurement results are NumPy arrays with one column per lane, and
+each instruction is executed by one vectorised operation over all lanes at its address.
+
+Lanes diverging at a branch are scheduled by their PC: each step executes the instruction
+at the lowest PC of the running lanes, on the lanes at that PC only (the active mask).
+Diverged lanes thus reconverge as soon as they reach the same address, e.g., after the
+two sides of an `if`. Since each lane executes exactly its own instruction sequence, the
+results are those of running the shots one after another.
+
+Each lane has its own qubit state simulator, on which the bundles are applied lane by
+lane, and its own view of the data memory, stored as the pages written by any lane on
+top of the shared initial image.
+
+The debug instruction DUMPMEM is skipped: the lanes do not print the registers and memory
+dumped by the serial engines. A warning is logged once per executor for such programs.
+'''
+import numpy as np
+from .insn import *
+from .memory import PAGE_BITS, PAGE_SIZE, PAGE_MASK
+from .shots import Shot_result, shot_rng
+import pycactus.global_config as gc
+
+logger = get_logger((__name__).split('.')[-1])
+logger.setLevel(logging.WARNING)
+
+
+def _make_flag_evaluator(key):
+    op = cmp_op[key]
+    if key in ['lt', 'ge', 'le', 'gt']:
+        return lambda a, b: op(a.view(np.int32), b.view(np.int32))
+    return op
+
+
+# functions evaluating each comparison flag over lanes from the `uint32` CMP operands,
+# indexed by `CMP_FLAG`
+simt_flag_evaluators = [None] * len(CMP_FLAG)
+simt_flag_evaluators[CMP_FLAG['always']] = lambda a, b: np.ones(a.shape, dtype=bool)
+simt_flag_evaluators[CMP_FLAG['never']] = lambda a, b: np.zeros(a.shape, dtype=bool)
+for _key in cmp_op:
+    simt_flag_evaluators[CMP_FLAG[_key]] = _make_flag_evaluator(_key)
+
+
+class Simt_memory():
+    def __init__(self, image, num_lanes: int):
+        '''The data memory of `num_lanes` lanes, all starting with the content `image`.
+
+        A page written by any lane is copied for all lanes into a `(num_lanes, PAGE_SIZE)`
+        array. The other pages are read from the shared image.
+        '''
+        self.image = np.frombuffer(bytes(image), dtype=np.uint8)
+        self.size = len(self.image)
+        self.num_lanes = num_lanes
+        self.pages = {}
+
+    def lane_page(self, page: int):
+        '''Return the array of the page `page` for all lanes, copying it at the first write.'''
+        data = self.pages.get(page)
+        if data is None:
+            start = page << PAGE_BITS
+            data = np.tile(self.image[start:start + PAGE_SIZE], (self.num_lanes, 1))
+            self.pages[page] = data
+        return data
+
+    def check_addrs(self, addrs, num_bytes: int):
+        if addrs.size > 0 and (addrs.min() < 0 or addrs.max() > self.size - num_bytes):
+            bad = addrs[(addrs < 0) | (addrs > self.size - num_bytes)][0]
+            raise ValueError("Given address ({}) of a {}-byte access exceeds the memory "
+                             "(size: {}).".format(bad, num_bytes, self.size))
+
+    def read_bytes(self, lanes, addrs):
+        '''Return the byte at `addrs[i]` in the lane `lanes[i]` for each `i`.'''
+        values = self.image[addrs]
+        if len(self.pages) > 0:
+            pages = addrs >> PAGE_BITS
+            for page in np.unique(pages):
+                data = self.pages.get(int(page))
+                if data is not None:
+                    sel = pages == page
+                    values[sel] = data[lanes[sel], addrs[sel] & PAGE_MASK]
+        return values
+
+    def write_bytes(self, lanes, addrs, values):
+        '''Write the byte `values[i]` at `addrs[i]` in the lane `lanes[i]` for each `i`.'''
+        pages = addrs >> PAGE_BITS
+        for page in np.unique(pages):
+            sel = pages == page
+            self.lane_page(int(page))[lanes[sel], addrs[sel] & PAGE_MASK] = values[sel]
+
+    def read_words(self, lanes, addrs):
+        '''Return the little-endian words at `addrs` as `uint32`, see `read_bytes`.'''
+        self.check_addrs(addrs, 4)
+        words = np.zeros(len(addrs), dtype=np.uint32)
+        for i in range(4):
+            words |= self.read_bytes(lanes, addrs + i).astype(np.uint32) << np.uint32(8 * i)
+        return words
+
+    def write_words(self, lanes, addrs, words):
+        self.check_addrs(addrs, 4)
+        for i in range(4):
+            self.write_bytes(lanes, addrs + i, (words >> np.uint32(8 * i)).astype(np.uint8))
+
+    def region(self, addr: int, size: int):
+        '''Return the `(num_lanes, size)` array of the bytes `addr` to `addr + size - 1`.'''
+        data = np.tile(self.image[addr:addr + size], (self.num_lanes, 1))
+        for page in range(addr >> PAGE_BITS, ((addr + size - 1) >> PAGE_BITS) + 1):
+            if page in self.pages:
+                start = max(addr, page << PAGE_BITS)
+                end = min(addr + size, (page + 1) << PAGE_BITS)
+                data[:, start - addr:end - addr] = \
+                    self.pages[page][:, start & PAGE_MASK:((end - 1) & PAGE_MASK) + 1]
+        return data
+
+
+class Simt_executor():
+    # the handler of each instruction, see `decode_insn`
+    _handler_names = {
+        eqasm_insn.NOP: '_exec_nop',
+        eqasm_insn.QWAIT: '_exec_nop',
+        eqasm_insn.QWAITR: '_exec_nop',
+        eqasm_insn.DUMPMEM: '_exec_nop',
+        eqasm_insn.STOP: '_exec_stop',
+        eqasm_insn.SMIS: '_exec_smis',
+        eqasm_insn.SMIT: '_exec_smit',
+        eqasm_insn.BUNDLE: '_exec_bundle',
+        eqasm_insn.NOT: '_exec_not',
+        eqasm_insn.CMP: '_exec_cmp',
+        eqasm_insn.BR: '_exec_br',
+        eqasm_insn.FBR: '_exec_fbr',
+        eqasm_insn.FMR: '_exec_fmr',
+        eqasm_insn.LDI: '_exec_ldi',
+        eqasm_insn.LDUI: '_exec_ldui',
+        eqasm_insn.ADDI: '_exec_addi',
+        eqasm_insn.ADD: '_exec_add',
+        eqasm_insn.SUB: '_exec_sub',
+        eqasm_insn.AND: '_exec_and',
+        eqasm_insn.OR: '_exec_or',
+        eqasm_insn.XOR: '_exec_xor',
+        eqasm_insn.MUL: '_exec_mul',
+        eqasm_insn.DIV: '_exec_div',
+        eqasm_insn.REM: '_exec_rem',
+        eqasm_insn.LW: '_exec_lw',
+        eqasm_insn.LB: '_exec_lb',
+        eqasm_insn.LBU: '_exec_lbu',
+        eqasm_insn.SW: '_exec_sw',
+        eqasm_insn.SB: '_exec_sb',
+        eqasm_insn.FLW: '_exec_flw',
+        eqasm_insn.FSW: '_exec_fsw',
+        eqasm_insn.FCVT_W_S: '_exec_fcvt_w_s',
+        eqasm_insn.FCVT_S_W: '_exec_fcvt_s_w',
+        eqasm_insn.FMV_W_X: '_exec_fmv_w_x',
+        eqasm_insn.FMV_X_W: '_exec_fmv_x_w',
+        eqasm_insn.FADD_S: '_exec_fp_arith',
+        eqasm_insn.FSUB_S: '_exec_fp_arith',
+        eqasm_insn.FMUL_S: '_exec_fp_arith',
+        eqasm_insn.FDIV_S: '_exec_fp_arith',
+        eqasm_insn.FEQ_S: '_exec_fp_cmp',
+        eqasm_insn.FLT_S: '_exec_fp_cmp',
+        eqasm_insn.FLE_S: '_exec_fp_cmp'
+    }
+
+    def __init__(self, qcp):
+        '''Executor running the shots of the program uploaded to `qcp` in lock-step.
+
+        The registers and data memory of `qcp` at the time of `run_shots` are the initial
+        state of every shot, as in `Quantum_control_processor.run_shots`, and the qubit
+        state simulator class of `qcp` is instantiated for each lane. The state of `qcp`
+        itself is not changed.
+        '''
+        self.qcp = qcp
+        self.num_qubits = qcp._num_available_qubits
+        self.sims = []
+        self.program = [self.decode_insn(insn) for insn in qcp.insn_mem]
+        if any(insn.name == eqasm_insn.DUMPMEM for insn in qcp.insn_mem):
+            logger.warning("The memory dumps (DUMPMEM) of the program are skipped by "
+                           "lock-step shots.")
+
+    def decode_insn(self, insn):
+        '''Decode an instruction into a `(handler, operands)` pair, as the decoded engine.'''
+        try:
+            handler = getattr(self, self._handler_names[insn.name])
+        except KeyError:
+            raise ValueError("Found undefined instruction ({}).".format(insn))
+        qcp = self.qcp
+
+        if insn.name == eqasm_insn.SMIS:
+            return handler, (insn.si, qcp.qotrf.sq_target(insn.sq_list))
+        if insn.name == eqasm_insn.SMIT:
+            return handler, (insn.ti, qcp.qotrf.tq_target(insn.tq_list))
+        if insn.name == eqasm_insn.BUNDLE:
+            return handler, (tuple(qcp.decode_qop(qop) for qop in insn.q_ops),)
+        if insn.name == eqasm_insn.BR:
+            if insn.target_label not in qcp.label_addr:
+                raise ValueError("Found undefined label ({}) in the instruction "
+                                 "{}.".format(insn.target_label, insn))
+            return handler, (qcp.decode_cmp_flag(insn), qcp.label_addr[insn.target_label])
+        if insn.name == eqasm_insn.FBR:
+            return handler, (qcp.decode_cmp_flag(insn), insn.rd)
+        if insn.name in fp_op:
+            return handler, (fp_op[insn.name], insn.fd, insn.fs, insn.ft)
+        if insn.name in fp_cmp_op:
+            return handler, (fp_cmp_op[insn.name], insn.rd, insn.fs, insn.ft)
+        if insn.name in [eqasm_insn.NOP, eqasm_insn.QWAIT, eqasm_insn.QWAITR,
+                         eqasm_insn.DUMPMEM, eqasm_insn.STOP]:
+            return handler, ()
+
+        return handler, tuple(getattr(insn, field) for field in eqasm_insn_fields[insn.name])
+
+    def prepare_lanes(self, num_lanes: int, seed=None, first_shot=0):
+        '''Set the initial state of `num_lanes` lanes from the state of the QCP.'''
+        qcp = self.qcp
+        gpr_values = np.array(qcp.gprf.save_state(), dtype=np.uint32)
+        fpr_bits = np.array([qcp.fprf.read_bits(i) for i in range(gc.NUM_FPR)],
+                            dtype=np.uint32)
+
+        self.num_lanes = num_lanes
+        self.all_lanes = np.arange(num_lanes)
+        self.pc = np.full(num_lanes, qcp.start_addr, dtype=np.int64)
+        self.cycle = np.zeros(num_lanes, dtype=np.int64)
+        self.stopped = np.zeros(num_lanes, dtype=bool)
+        # lanes aborted by the post-selection of the QCP, which are also stopped
+        self.rejected = np.zeros(num_lanes, dtype=bool)
+        self.gpr = np.tile(gpr_values[:, None], (1, num_lanes))
+        self.fpr = np.tile(fpr_bits[:, None], (1, num_lanes)).view(np.float32)
+        # as after `Quantum_control_processor.restart`, only the 'always' flag is set
+        self.cmp_flags = np.zeros((len(CMP_FLAG), num_lanes), dtype=bool)
+        self.cmp_flags[CMP_FLAG['always']] = True
+        self.msmt_result = np.zeros((self.num_qubits, num_lanes), dtype=np.uint8)
+
+        # the operation target registers hold indices into `targets`, -1 if unset
+        self.targets = []
+        self.sq_regs = np.full((gc.NUM_SQ_QOTR, num_lanes), -1, dtype=np.int64)
+        self.tq_regs = np.full((gc.NUM_TQ_QOTR, num_lanes), -1, dtype=np.int64)
+        sq_state, tq_state = qcp.qotrf.save_state()
+        for regs, state in [(self.sq_regs, sq_state), (self.tq_regs, tq_state)]:
+            for reg, target in enumerate(state):
+                if target is not None:
+                    regs[reg, :] = self.target_index(target)
+
+        self.data_mem = Simt_memory(qcp.data_mem.get_entire_mem(), num_lanes)
+
+        sim = qcp.qubit_state_sim
+        if sim is not None:
+            if len(self.sims) < num_lanes:
+                new_sim = sim.instance_factory()
+            while len(self.sims) < num_lanes:
+                self.sims.append(new_sim())
+            for lane in range(num_lanes):
+                self.sims[lane].reset()
+                if seed is not None:
+                    self.sims[lane].set_rng(shot_rng(seed, first_shot + lane))
+
+    def target_index(self, target):
+        for index, known in enumerate(self.targets):
+            if known is target:
+                return index
+        self.targets.append(target)
+        return len(self.targets) - 1
+
+    def run_shots(self, num_shots: int, mem_regions=(), seed=None, first_shot=0):
+        '''Run `num_shots` shots of the program in lock-step.
+
+        The arguments and the result are those of `Quantum_control_processor.run_shots`,
+        which gives the same results for the same `seed`.
+        '''
+        result = Shot_result(num_shots, self.num_qubits, mem_regions, self.qcp.data_mem.size)
+        result.seed = seed
+        if num_shots == 0:
+            return result
+
+        self.prepare_lanes(num_shots, seed, first_shot)
+        self.run()
+
+        result.msmt_results[:] = self.msmt_result.T
+        result.cycles[:] = self.cycle
+        post_selection = self.qcp.post_selection
+        if post_selection is not None:
+            # the memory conditions are checked again at STOP
+            for lane in np.flatnonzero(self.stopped & ~self.rejected):
+                self.rejected[lane] = not post_selection.accepts_words(
+                    lambda addr: self.read_lane_word(lane, addr))
+        result.accepted[:] = ~self.rejected
+        for (addr, size), data in result.mem_regions.items():
+            data[:] = self.data_mem.region(addr, size)
+        return result
+
+    def run(self):
+        '''Run all lanes until STOP or `max_exec_cycle` is reached.'''
+        program = self.program
+        max_exec_cycle = self.qcp.max_exec_cycle
+        pc = self.pc
+        cycle = self.cycle
+        stopped = self.stopped
+        num_steps = 0
+
+        while True:
+            running = ~stopped & (cycle <= max_exec_cycle)
+            if running.all():
+                pc_min = pc.min()
+                active = pc == pc_min
+            else:
+                if not running.any():
+                    break
+                pc_min = pc[running].min()
+                active = running & (pc == pc_min)
+
+            lanes = self.all_lanes if active.all() else np.flatnonzero(active)
+            cycle[lanes] += 1
+            handler, operands = program[pc_min]
+            handler(lanes, *operands)
+            num_steps += 1
+
+        logger.info("%d lanes finished after %d lock-step instructions, %d cycles in total.",
+                    self.num_lanes, num_steps, int(cycle.sum()))
+
+    # ------------------------- handlers -------------------------
+    # Each handler executes its instruction on the lanes `lanes`, an array of lane indices.
+    def _exec_nop(self, lanes):
+        self.pc[lanes] += 1
+
+    def _exec_stop(self, lanes):
+        self.stopped[lanes] = True
+        self.pc[lanes] += 1
+
+    def _exec_smis(self, lanes, si, target):
+        self.sq_regs[si, lanes] = self.target_index(target)
+        self.pc[lanes] += 1
+
+    def _exec_smit(self, lanes, ti, target):
+        self.tq_regs[ti, lanes] = self.target_index(target)
+        self.pc[lanes] += 1
+
+    def _exec_bundle(self, lanes, q_ops):
+        for kind, reg, gate, op_name in q_ops:
+            if kind is Qop_kind.NULL:
+                continue
+            if len(self.sims) == 0:
+                raise ValueError("Cannot execute the quantum operation {} without a qubit "
+                                 "state simulator.".format(op_name))
+            # currently only support CZ operation
+            assert(kind is not Qop_kind.UNSUPPORTED)
+            regs = self.tq_regs[reg] if kind is Qop_kind.CZ else self.sq_regs[reg]
+            if (regs[lanes] < 0).any():
+                raise ValueError("The quantum operation {} uses the unset target register "
+                                 "{}.".format(op_name, reg))
+
+        targets = self.targets
+        post_selection = self.qcp.post_selection
+        rejected = []
+        for lane in lanes:
+            sim = self.sims[lane]
+            for kind, reg, gate, op_name in q_ops:
+                if kind is Qop_kind.GATE:
+                    target = targets[self.sq_regs[reg, lane]]
+                    if gate is None:
+                        sim.apply_single_qubit_gate_to(op_name, target)
+                    else:
+                        sim.apply_prepared_gate_to(gate, target)
+
+                elif kind is Qop_kind.MEASURE:
+                    target = targets[self.sq_regs[reg, lane]]
+                    results = sim.measure_qubits(target)
+                    self.msmt_result[target.indices, lane] = results
+                    if post_selection is not None and not (
+                            post_selection.accepts_msmt(target.qubits, results) and
+                            post_selection.accepts_words(
+                                lambda addr: self.read_lane_word(lane, addr))):
+                        rejected.append(lane)
+                        break
+
+                elif kind is Qop_kind.CZ:
+                    sim.apply_two_qubit_gate_to(targets[self.tq_regs[reg, lane]])
+
+        if len(rejected) > 0:
+            # as in the serial engines, a rejected shot stops at the failing measurement
+            self.rejected[rejected] = True
+            self.stopped[rejected] = True
+            lanes = lanes[~self.rejected[lanes]]
+        self.pc[lanes] += 1
+
+    def read_lane_word(self, lane: int, addr: int):
+        return int(self.data_mem.read_words(np.array([lane]), np.array([addr]))[0])
+
+    def _exec_not(self, lanes, rd, rt):
+        self.gpr[rd, lanes] = ~self.gpr[rt, lanes]
+        self.pc[lanes] += 1
+
+    def _exec_cmp(self, lanes, rs, rt):
+        a = self.gpr[rs, lanes]
+        b = self.gpr[rt, lanes]
+        for flag, evaluator in enumerate(simt_flag_evaluators):
+            self.cmp_flags[flag, lanes] = evaluator(a, b)
+        self.pc[lanes] += 1
+
+    def _exec_br(self, lanes, flag, target_addr):
+        self.pc[lanes] = np.where(self.cmp_flags[flag, lanes], target_addr,
+                                  self.pc[lanes] + 1)
+
+    def _exec_fbr(self, lanes, flag, rd):
+        self.gpr[rd, lanes] = self.cmp_flags[flag, lanes]
+        self.pc[lanes] += 1
+
+    def _exec_fmr(self, lanes, rd, qs):
+        self.gpr[rd, lanes] = self.msmt_result[qs, lanes]
+        self.pc[lanes] += 1
+
+    def _exec_ldi(self, lanes, rd, imm):
+        self.gpr[rd, lanes] = imm & 0xffffffff
+        self.pc[lanes] += 1
+
+    def _exec_ldui(self, lanes, rd, rs, imm):
+        self.gpr[rd, lanes] = ((imm << 17) & 0xffffffff) | (self.gpr[rs, lanes] & 0x1ffff)
+        self.pc[lanes] += 1
+
+    def _exec_addi(self, lanes, rd, rs, imm):
+        self.gpr[rd, lanes] = self.gpr[rs, lanes] + np.uint32(imm & 0xffffffff)
+        self.pc[lanes] += 1
+
+    def _exec_add(self, lanes, rd, rs, rt):
+        self.gpr[rd, lanes] = self.gpr[rs, lanes] + self.gpr[rt, lanes]
+        self.pc[lanes] += 1
+
+    def _exec_sub(self, lanes, rd, rs, rt):
+        self.gpr[rd, lanes] = self.gpr[rs, lanes] - self.gpr[rt, lanes]
+        self.pc[lanes] += 1
+
+    def _exec_and(self, lanes, rd, rs, rt):
+        self.gpr[rd, lanes] = self.gpr[rs, lanes] & self.gpr[rt, lanes]
+        self.pc[lanes] += 1
+
+    def _exec_or(self, lanes, rd, rs, rt):
+        self.gpr[rd, lanes] = self.gpr[rs, lanes] | self.gpr[rt, lanes]
+        self.pc[lanes] += 1
+
+    def _exec_xor(self, lanes, rd, rs, rt):
+        self.gpr[rd, lanes] = self.gpr[rs, lanes] ^ self.gpr[rt, lanes]
+        self.pc[lanes] += 1
+
+    def signed_operands(self, lanes, rs, rt):
+        return (self.gpr[rs, lanes].view(np.int32).astype(np.int64),
+                self.gpr[rt, lanes].view(np.int32).astype(np.int64))
+
+    def _exec_mul(self, lanes, rd, rs, rt):
+        a, b = self.signed_operands(lanes, rs, rt)
+        self.gpr[rd, lanes] = (a * b).astype(np.uint32)
+        self.pc[lanes] += 1
+
+    def _exec_div(self, lanes, rd, rs, rt):
+        a, b = self.signed_operands(lanes, rs, rt)
+        if (b == 0).any():
+            raise ZeroDivisionError("division by zero in r{}".format(rt))
+        # signed division rounding towards zero, as the scalar engines
+        self.gpr[rd, lanes] = np.trunc(a / b).astype(np.int64).astype(np.uint32)
+        self.pc[lanes] += 1
+
+    def _exec_rem(self, lanes, rd, rs, rt):
+        a, b = self.signed_operands(lanes, rs, rt)
+        if (b == 0).any():
+            raise ZeroDivisionError("modulo by zero in r{}".format(rt))
+        self.gpr[rd, lanes] = np.mod(a, b).astype(np.uint32)
+        self.pc[lanes] += 1
+
+    def mem_addrs(self, lanes, base, imm):
+        return self.gpr[base, lanes].astype(np.int64) + imm
+
+    def _exec_lw(self, lanes, rd, imm, rt):
+        addrs = self.mem_addrs(lanes, rt, imm)
+        self.gpr[rd, lanes] = self.data_mem.read_words(lanes, addrs)
+        self.pc[lanes] += 1
+
+    def _exec_lb(self, lanes, rd, imm, rt):
+        addrs = self.mem_addrs(lanes, rt, imm)
+        self.data_mem.check_addrs(addrs, 1)
+        # signed extension
+        self.gpr[rd, lanes] = self.data_mem.read_bytes(lanes, addrs).view(np.int8)
+        self.pc[lanes] += 1
+
+    def _exec_lbu(self, lanes, rd, imm, rt):
+        addrs = self.mem_addrs(lanes, rt, imm)
+        self.data_mem.check_addrs(addrs, 1)
+        self.gpr[rd, lanes] = self.data_mem.read_bytes(lanes, addrs)
+        self.pc[lanes] += 1
+
+    def _exec_sw(self, lanes, rs, imm, rt):
+        addrs = self.mem_addrs(lanes, rt, imm)
+        self.data_mem.write_words(lanes, addrs, self.gpr[rs, lanes])
+        self.pc[lanes] += 1
+
+    def _exec_sb(self, lanes, rs, imm, rt):
+        addrs = self.mem_addrs(lanes, rt, imm)
+        self.data_mem.check_addrs(addrs, 1)
+        self.data_mem.write_bytes(lanes, addrs, self.gpr[rs, lanes].astype(np.uint8))
+        self.pc[lanes] += 1
+
+    def _exec_flw(self, lanes, fd, imm, rs):
+        addrs = self.mem_addrs(lanes, rs, imm)
+        self.fpr[fd, lanes] = self.data_mem.read_words(lanes, addrs).view(np.float32)
+        self.pc[lanes] += 1
+
+    def _exec_fsw(self, lanes, fs, imm, rs):
+        addrs = self.mem_addrs(lanes, rs, imm)
+        self.data_mem.write_words(lanes, addrs, self.fpr[fs, lanes].view(np.uint32))
+        self.pc[lanes] += 1
+
+    def _exec_fcvt_w_s(self, lanes, rd, fs):
+        values = self.fpr[fs, lanes]
+        if not np.isfinite(values).all():
+            raise ValueError("Cannot convert the non-finite value in f{} to an "
+                             "integer.".format(fs))
+        self.gpr[rd, lanes] = np.trunc(values).astype(np.int64).astype(np.uint32)
+        self.pc[lanes] += 1
+
+    def _exec_fcvt_s_w(self, lanes, fd, rs):
+        self.fpr[fd, lanes] = self.gpr[rs, lanes].view(np.int32).astype(np.float32)
+        self.pc[lanes] += 1
+
+    def _exec_fmv_w_x(self, lanes, fd, rs):
+        self.fpr[fd, lanes] = self.gpr[rs, lanes].view(np.float32)
+        self.pc[lanes] += 1
+
+    def _exec_fmv_x_w(self, lanes, rd, fs):
+        self.gpr[rd, lanes] = self.fpr[fs, lanes].view(np.uint32)
+        self.pc[lanes] += 1
+
+    def _exec_fp_arith(self, lanes, op, fd, fs, ft):
+        a = self.fpr[fs, lanes].astype(np.float64)
+        b = self.fpr[ft, lanes].astype(np.float64)
+        if op is fp_op[eqasm_insn.FDIV_S] and (b == 0).any():
+            raise ZeroDivisionError("float division by zero in f{}".format(ft))
+        # computed in double precision and rounded, as the scalar engines
+        result = op(a, b)
+        with np.errstate(over='ignore'):
+            rounded = result.astype(np.float32)
+        if (np.isinf(rounded) & np.isfinite(result)).any():
+            raise OverflowError("float too large to pack with f format in f{}".format(fd))
+        self.fpr[fd, lanes] = rounded
+        self.pc[lanes] += 1
+
+    def _exec_fp_cmp(self, lanes, op, rd, fs, ft):
+        self.gpr[rd, lanes] = op(self.fpr[fs, lanes], self.fpr[ft, lanes])
+        self.pc[lanes] += 1
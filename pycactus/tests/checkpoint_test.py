@@ -0,0 +1,133 @@
+import itertools
+import random
+import time
+import pytest
+from types import SimpleNamespace
+from pycactus.qcp import Quantum_control_processor
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+from pycactus.checkpoint import save_checkpoint, load_checkpoint, run_with_checkpoints
+import pycactus.checkpoint as checkpoint
+import pycactus.global_config as gc
+from helpers import parse_program, new_qcp
+
+
+def seeded_qcp(fn='checkpoint.eqasm', seed=7):
+    qcp = new_qcp(fn, Quantumsim(2), num_available_qubits=2)
+    qcp.qubit_state_sim.set_rng(random.Random(seed))
+    return qcp
+
+
+def machine_state(qcp):
+    return ([qcp.read_gpr_uint(i) for i in range(gc.NUM_GPR)], qcp.cycle, qcp.pc,
+            qcp.stop_bit, qcp.msmt_result, bytes(qcp.data_mem.get_entire_mem()))
+
+
+def test_resume(tmp_path):
+    qcp = seeded_qcp()
+    qcp.run()
+    expected = machine_state(qcp)
+    # the measurement results are not all the same
+    assert(0 < qcp.data_mem.read_word_uint(0x80) < 20)
+
+    path = tmp_path / 'run.ckpt'
+    for num_cycles in [1, 37, 200]:
+        qcp = seeded_qcp()
+        qcp.step(num_cycles)
+        save_checkpoint(qcp, path)
+        # keep running the saved QCP, which must not change the checkpoint
+        qcp.run()
+
+        resumed = seeded_qcp(seed=0)
+        load_checkpoint(resumed, path)
+        assert(resumed.cycle == num_cycles)
+        resumed.run()
+        assert(machine_state(resumed) == expected)
+
+
+def test_periodic_checkpoints(tmp_path):
+    qcp = seeded_qcp()
+    qcp.run()
+    expected = machine_state(qcp)
+
+    path = tmp_path / 'run.ckpt'
+    qcp = seeded_qcp()
+    run_with_checkpoints(qcp, path, every_cycles=50)
+    assert(machine_state(qcp) == expected)
+    resumed = seeded_qcp(seed=0)
+    load_checkpoint(resumed, path)
+    assert(machine_state(resumed) == expected)
+
+
+def test_checkpoint_periods(tmp_path, monkeypatch):
+    qcp = seeded_qcp()
+    qcp.run()
+    expected = machine_state(qcp)
+
+    saved_cycles = []
+
+    def record(qcp, path):
+        saved_cycles.append(qcp.cycle)
+        save_checkpoint(qcp, path)
+    monkeypatch.setattr(checkpoint, 'save_checkpoint', record)
+    monkeypatch.setattr(checkpoint, 'TIME_CHECK_CYCLES', 10)
+    # a clock advancing by one second at each look
+    clock = itertools.count()
+    monkeypatch.setattr(checkpoint, 'time',
+                        SimpleNamespace(time=time.time, monotonic=lambda: next(clock)))
+
+    path = tmp_path / 'run.ckpt'
+    for every_cycles, every_seconds in [(50, 1000), (10**6, 3), (None, 3)]:
+        saved_cycles.clear()
+        qcp = seeded_qcp()
+        run_with_checkpoints(qcp, path, every_cycles, every_seconds)
+        assert(machine_state(qcp) == expected)
+        resumed = seeded_qcp(seed=0)
+        load_checkpoint(resumed, path)
+        assert(machine_state(resumed) == expected)
+
+        if every_cycles == 50:
+            # the cycle period is met though the period in seconds is long
+            assert(saved_cycles == [50, 100, 150, 200, expected[1]])
+        else:
+            # the period in seconds is met, by time checks every 10 cycles
+            assert(len(saved_cycles) > 5)
+            assert(all(b - a <= 40 for a, b in zip(saved_cycles, saved_cycles[1:])))
+
+
+def test_warm_start(tmp_path):
+    # prepare a Bell state and a register value, and start another program from them
+    prepare = parse_program(data='''
+smis s0, {0}
+smis s1, {1}
+smit t0, {(0, 1)}
+ldi r9, 5
+H s0
+H s1
+CZ t0
+H s1
+stop
+''')
+    qcp = Quantum_control_processor(Quantumsim(2), num_available_qubits=2)
+    qcp.upload_program(prepare)
+    qcp.run()
+    path = tmp_path / 'bell.ckpt'
+    save_checkpoint(qcp, path)
+
+    measure = parse_program(data='''
+smis s2, {0, 1}
+MeasZ s2
+qwait 30
+fmr r1, q0
+fmr r2, q1
+stop
+''')
+    for seed in range(10):
+        qcp = Quantum_control_processor(Quantumsim(2), num_available_qubits=2)
+        qcp.upload_program(measure)
+        with pytest.raises(ValueError):
+            load_checkpoint(qcp, path)
+        load_checkpoint(qcp, path, warm_start=True)
+        assert(qcp.cycle == 0 and qcp.read_gpr_uint(9) == 5)
+        qcp.qubit_state_sim.set_rng(random.Random(seed))
+        qcp.run()
+        assert(qcp.read_gpr_uint(1) == qcp.read_gpr_uint(2))
@@ -0,0 +1,72 @@
+import json
+import socket
+import pytest
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+from pycactus.distributed import (Distributed_shot_executor, Local_workers, decode_insn,
+                                  encode_insn, recv_message, send_message)
+from pycactus.shots import Post_selection
+from helpers import parse_program, new_qcp
+
+
+def test_distributed_shots():
+    qcp = new_qcp('shots.eqasm', Quantumsim(7))
+    qcp.data_mem.write_words(0x100, [41])
+    qcp.data_mem.write_words(0x9000, [3])
+
+    serial = qcp.run_shots(50, mem_regions=[(0x100, 8), (0x9000, 4)], seed=1234)
+    with Local_workers(3) as workers:
+        # the same seed gives the same results, whatever the distribution of the shots
+        for num_workers, chunk_size in [(1, None), (3, 4), (3, None)]:
+            executor = Distributed_shot_executor(qcp, workers.addresses[:num_workers],
+                                                 chunk_size=chunk_size)
+            result = executor.run_shots(50, mem_regions=[(0x100, 8), (0x9000, 4)],
+                                        seed=1234)
+            assert(result.seed == 1234)
+            assert((result.msmt_results == serial.msmt_results).all())
+            assert((result.memory(0x100, 8) == serial.memory(0x100, 8)).all())
+            assert((result.words(0x9000, 4) == 3).all())
+            assert((result.cycles == serial.cycles).all())
+
+        # the workers keep the program, and receive it again when the state changes
+        qcp.data_mem.write_words(0x100, [9])
+        result = Distributed_shot_executor(qcp, workers.addresses).run_shots(
+            10, mem_regions=[(0x100, 4)], seed=1)
+        assert((result.words(0x100, 4) == 10).all())
+
+        with pytest.raises(ValueError):
+            Distributed_shot_executor(qcp, workers.addresses).run_shots(
+                10, mem_regions=[(qcp.data_mem.size, 4)])
+
+
+def test_program_encoding():
+    insns = parse_program(data='''
+        SMIT t1, {(1, 2), (3, 4)}
+        SMIS s2, {1, 3}
+    loop:
+        1, H s2 | CZ t1
+        LDI r1, -5
+        BR always, loop
+    ''')
+    decoded = [decode_insn(json.loads(json.dumps(encode_insn(insn)))) for insn in insns]
+    assert([str(insn) for insn in decoded] == [str(insn) for insn in insns])
+    assert(decoded[0].tq_list == [(1, 2), (3, 4)])
+
+
+def test_worker_rejects_bad_program():
+    qcp = new_qcp('postselect.eqasm', Quantumsim(2), num_available_qubits=2)
+    qcp.set_post_selection(Post_selection().require_msmt(0, 0))
+
+    with Local_workers(1) as workers:
+        with socket.create_connection(workers.addresses[0]) as sock:
+            f = sock.makefile('rwb')
+            send_message(f, b'HASH', b'key')
+            assert(recv_message(f)[0] == b'NEED')
+            send_message(f, b'PROG', b'\0' * 64)
+            assert(recv_message(f)[0] == b'ERR ')
+            send_message(f, b'BYE ')
+
+        # the worker survives, and receives the post-selection
+        serial = qcp.run_shots(20, seed=2)
+        result = Distributed_shot_executor(qcp, workers.addresses).run_shots(20, seed=2)
+        assert((result.accepted == serial.accepted).all())
+        assert(result.num_rejected() > 0)
@@ -0,0 +1,130 @@
+import pytest
+from pycactus.qcp import Quantum_control_processor, EXEC_MODES
+from pycactus.insn import eqasm_insn, CMP_FLAG, Qop_kind
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+import pycactus.global_config as gc
+from helpers import parse_program, new_qcp
+
+
+def run_program(fn, exec_mode):
+    qcp = new_qcp(fn, exec_mode=exec_mode)
+    qcp.run()
+    return qcp
+
+
+def arch_state(qcp):
+    return ([qcp.read_gpr_uint(i) for i in range(gc.NUM_GPR)],
+            [qcp.fprf.read(i).uint for i in range(gc.NUM_FPR)],
+            qcp.cycle, qcp.pc)
+
+
+def test_engines_agree():
+    for fn in ['test_add.eqasm', 'fp.eqasm', 'ld_st_test.eqasm']:
+        states = [arch_state(run_program(fn, mode)) for mode in EXEC_MODES]
+        assert(all(state == states[0] for state in states))
+
+
+def test_decoded_branch_target():
+    qcp = run_program('test_add.eqasm', 'decoded')
+    br_insns = [(i, insn) for i, insn in enumerate(qcp.insn_mem) 
+                if insn.name == eqasm_insn.BR]
+    for i, insn in br_insns:
+        handler, operands = qcp.decoded_insns[i]
+        assert(operands[1] == qcp.label_addr[insn.target_label])
+    assert(qcp.read_gpr_int(7) == 10)
+
+
+def test_translated_blocks():
+    qcp = run_program('test_add.eqasm', 'translated')
+    assert(qcp.read_gpr_int(7) == 10)
+    assert(qcp.read_gpr_int(20) == 100)
+
+    # blocks start at the program entry, at labels and after branches
+    for start, block in qcp.block_translator.block_cache.items():
+        assert(start == 0 or len(qcp.insn_mem[start].labels) > 0
+               or qcp.insn_mem[start - 1].name == eqasm_insn.BR)
+        body = qcp.insn_mem[start:start + block.num_insns - 1]
+        assert(all(insn.name != eqasm_insn.BR for insn in body))
+
+
+def test_fault_mid_block():
+    # the register writes before a faulting instruction are kept by every engine
+    for fault, error in [('LW r5, 0(r4)', ValueError), ('FADD.S f3, f2, f2', OverflowError)]:
+        insns = parse_program(data='''
+            LDI r1, 5
+            ADDI r2, r1, 3
+            FCVT.S.W f1, r1
+            SW r2, 0x10(r0)
+            {}
+            ADDI r6, r1, 1
+            STOP
+        '''.format(fault))
+        states = []
+        for exec_mode in EXEC_MODES:
+            qcp = Quantum_control_processor(exec_mode=exec_mode)
+            qcp.upload_program(insns)
+            qcp.write_gpr_value(4, uint=0xfffffff0)
+            qcp.fprf.write_bits(2, 0x7f000000)
+            with pytest.raises(error):
+                qcp.run()
+            states.append(arch_state(qcp))
+        assert(all(state == states[0] for state in states))
+        assert(states[0][0][2] == 8 and states[0][1][1] != 0 and states[0][3] == 4)
+
+
+def test_fused_insns():
+    states = [arch_state(run_program('fusion.eqasm', mode)) for mode in EXEC_MODES]
+    assert(all(state == states[0] for state in states))
+
+    qcp = run_program('fusion.eqasm', 'decoded')
+    assert(qcp.fused_insns[0][0] == qcp._exec_ldi_ldui)
+    assert(qcp.fused_insns[12][0] == qcp._exec_addi_cmp_br)
+    assert(qcp.read_gpr_int(7) == 4)
+    assert([qcp.read_gpr_int(i) for i in range(10, 16)] == [1, 0, 0, 1, 1, 0])
+
+    # the flags are only evaluated on demand
+    assert(qcp.cmp_operands is not None)
+    qcp.sync_cmp_flags()
+    assert(qcp.cmp_flags[CMP_FLAG['eq']])
+
+
+def test_fused_insns_cycle_limit():
+    insns = parse_program('fusion.eqasm')
+    for max_exec_cycle in range(10, 30):
+        states = []
+        for mode in EXEC_MODES:
+            qcp = Quantum_control_processor(exec_mode=mode, max_exec_cycle=max_exec_cycle)
+            qcp.upload_program(insns)
+            qcp.run()
+            states.append(arch_state(qcp))
+        assert(all(state == states[0] for state in states))
+
+
+def test_bundle_prepared_gates():
+    insns = parse_program('bundle_test.eqasm')
+    kinds = [[qop.kind for qop in insn.q_ops] for insn in insns
+             if insn.name == eqasm_insn.BUNDLE]
+    assert(kinds == [[Qop_kind.GATE], [Qop_kind.GATE], [Qop_kind.CZ], [Qop_kind.GATE],
+                     [Qop_kind.MEASURE]])
+
+    qcp = Quantum_control_processor(Quantumsim(7))
+    qcp.upload_program(insns)
+    q_ops = [qcp.decoded_insns[i][1][0] for i, insn in enumerate(insns)
+             if insn.name == eqasm_insn.BUNDLE]
+    # the PTM of each gate is built once and shared
+    assert(q_ops[0][0][2] is not None and q_ops[0][0][2] is q_ops[1][0][2])
+    qcp.run()
+    assert(qcp.stop_bit == 1)
+
+
+def test_translated_blocks_cleared_with_qubits():
+    insns = parse_program(data='SMIS s1, {5}\nSTOP\n')
+    for exec_mode in EXEC_MODES:
+        qcp = Quantum_control_processor(exec_mode=exec_mode)
+        qcp.upload_program(insns)
+        qcp.run()
+        # the qubit 5 is no longer available, whatever the engine
+        qcp.set_num_available_qubits(3)
+        qcp.restart()
+        with pytest.raises(ValueError):
+            qcp.run()
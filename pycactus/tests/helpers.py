@@ -0,0 +1,26 @@
+'''Helpers shared by the tests.'''
+from pathlib import Path
+from pycactus.eqasm_parser import Eqasm_parser
+from pycactus.qcp import Quantum_control_processor
+
+eqasm_dir = Path(__file__).absolute().parent / 'eqasm'
+eqasm_parser = Eqasm_parser()
+
+
+def parse_program(fn=None, data=None):
+    '''Return the instructions of the eQASM file `fn` in `eqasm_dir`, or of the source
+    `data`, asserting that the program is parsed successfully.
+    '''
+    success, insns = eqasm_parser.parse(data=data,
+                                        filename=None if fn is None else eqasm_dir / fn)
+    assert(success)
+    return insns
+
+
+def new_qcp(fn, qubit_state_sim=None, **qcp_kwargs):
+    '''Return a QCP with the qubit state simulator `qubit_state_sim` and the arguments
+    `qcp_kwargs`, with the program of the eQASM file `fn` uploaded.
+    '''
+    qcp = Quantum_control_processor(qubit_state_sim, **qcp_kwargs)
+    qcp.upload_program(parse_program(fn))
+    return qcp
@@ -0,0 +1,63 @@
+'''Measure the cost of the per-cycle instrumentation of the QCP.
+
+Run it as a script:
+    python -m pycactus.tests.logging_bench
+'''
+import logging
+import time
+from pycactus.eqasm_parser import Eqasm_parser
+from pycactus.qcp import Quantum_control_processor, EXEC_MODES
+from pycactus.utils import loggers
+
+counting_loop = '''
+ldi r1, 1
+ldi r7, 0
+ldi r8, {}
+ldi r2, 0x100
+loop_start:
+add r7, r7, r1
+addi r3, r3, 3
+sw r7, 0(r2)
+lw r4, 0(r2)
+bne r7, r8, loop_start
+stop
+'''
+
+
+def cycles_per_second(insns, exec_mode, log_level):
+    qcp = Quantum_control_processor(exec_mode=exec_mode, log_level=log_level)
+    qcp.upload_program(insns)
+    start = time.perf_counter()
+    qcp.run()
+    elapsed = time.perf_counter() - start
+    return qcp.cycle / elapsed
+
+
+def main(num_iterations=20000):
+    success, insns = Eqasm_parser().parse(data=counting_loop.format(num_iterations))
+    assert(success)
+
+    # keep the trace of the traced runs out of the console
+    saved_handlers = {}
+    for logname in loggers:
+        log = logging.getLogger(logname)
+        saved_handlers[logname] = log.handlers
+        log.handlers = [logging.NullHandler()]
+
+    results = []
+    try:
+        for exec_mode in EXEC_MODES:
+            untraced = cycles_per_second(insns, exec_mode, logging.WARNING)
+            traced = cycles_per_second(insns, exec_mode, logging.DEBUG)
+            results.append((exec_mode, untraced, traced))
+    finally:
+        for logname, handlers in saved_handlers.items():
+            logging.getLogger(logname).handlers = handlers
+
+    print("{:>12}  {:>18}  {:>18}".format('mode', 'untraced cycles/s', 'traced cycles/s'))
+    for exec_mode, untraced, traced in results:
+        print("{:>12}  {:>18.0f}  {:>18.0f}".format(exec_mode, untraced, traced))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import multiprocessing
+import pytest
+import numpy as np
+from bitstring import BitArray
+from pycactus.memory import Memory, Paged_memory, Shared_memory, PAGE_SIZE
+from pycactus.quantum_coprocessor import Quantum_coprocessor
+
+
+def test_word_little_endian():
+    mem = Memory(size=0x100)
+    mem.write_word_uint(0x40, 0x78563412)
+    assert(list(mem.get_entire_mem()[0x40:0x44]) == [0x12, 0x34, 0x56, 0x78])
+    assert(mem.read_word_uint(0x40) == 0x78563412)
+    assert(mem.read_word(0x40) == BitArray(uint=0x78563412, length=32))
+
+    mem.write_word(0x44, BitArray(int=-2, length=32))
+    assert(mem.read_word_uint(0x44) == 0xfffffffe)
+    assert(mem.read_byte_uint(0x44) == 0xfe)
+
+
+def test_bulk_words():
+    mem = Memory(size=0x100)
+    mem.write_words(0x10, [1, 2, -1, 0x12345678])
+    assert(mem.read_words(0x10, 4) == (1, 2, 0xffffffff, 0x12345678))
+    assert(mem.read_word_uint(0x1c) == 0x12345678)
+
+    with pytest.raises(ValueError):
+        mem.write_words(0xf8, [1, 2, 3])
+    with pytest.raises(ValueError):
+        mem.read_word_uint(0xfd)
+
+
+def test_empty_word_ranges():
+    for mem in [Memory(1024), Paged_memory(1024)]:
+        assert(mem.read_words(0, 0) == () and mem.read_words(1024, 0) == ())
+        mem.write_words(0, [])
+        mem.write_words(1024, [])
+        assert(mem.read_words(1020, 1) == (0,))
+        with pytest.raises(ValueError):
+            mem.read_words(1024, 1)
+        with pytest.raises(ValueError):
+            mem.read_words(1021, 1)
+        with pytest.raises(ValueError):
+            mem.read_words(-4, 1)
+
+
+def test_paged_memory():
+    dense = Memory(size=4 * PAGE_SIZE)
+    mem = Paged_memory(size=4 * PAGE_SIZE)
+    assert(mem.num_allocated_pages() == 0)
+    assert(mem.read_word_uint(0x100) == 0 and mem.read_byte_uint(3 * PAGE_SIZE) == 0)
+
+    # the same accesses give the same content, including words spanning two pages
+    for m in [dense, mem]:
+        m.write_word_uint(0x40, 0x78563412)
+        m.write_word_uint(PAGE_SIZE - 2, 0xa1b2c3d4)
+        m.write_byte_uint(2 * PAGE_SIZE + 5, 0x99)
+        m.write_words(0x80, [1, 2, -1])
+    assert(mem.get_entire_mem() == dense.get_entire_mem())
+    assert(mem.read_word_uint(PAGE_SIZE - 2) == 0xa1b2c3d4)
+    assert(mem.read_words(0x80, 3) == (1, 2, 0xffffffff))
+    assert(mem.num_allocated_pages() == 3)
+
+    # zero bytes do not allocate pages
+    mem.write_bytes(0, bytes(4 * PAGE_SIZE))
+    assert(mem.num_allocated_pages() == 3 and mem.read_word_uint(0x40) == 0)
+    with pytest.raises(ValueError):
+        mem.read_word_uint(4 * PAGE_SIZE - 3)
+
+
+def test_paged_memory_copy_on_write():
+    mem = Paged_memory(size=4 * PAGE_SIZE)
+    mem.write_words(0x10, [7])
+    snap = mem.snapshot()
+    clone = mem.clone()
+    # the snapshot and the clone share the page until it is written
+    assert(snap[0][0] is clone._page_table[0])
+
+    mem.write_words(0x10, [8])
+    clone.write_words(0x14, [9])
+    assert(mem.read_words(0x10, 2) == (8, 0))
+    assert(clone.read_words(0x10, 2) == (7, 9))
+    mem.restore(snap)
+    assert(mem.read_words(0x10, 2) == (7, 0))
+    assert(clone.num_allocated_pages() == 1)
+
+
+def test_view_and_load():
+    for mem in [Memory(size=4 * PAGE_SIZE), Paged_memory(size=4 * PAGE_SIZE)]:
+        table = np.arange(-8, 8, dtype=np.int32).reshape(4, 4)
+        mem.load(0x100, table)
+        assert(mem.read_word_uint(0x100) == 0xfffffff8)
+        assert((mem.view(0x100, '<i4', (4, 4), writable=False) == table).all())
+
+        # writes through a view are seen by the memory, and restored by a snapshot
+        snap = mem.snapshot()
+        view = mem.view(0x200, np.float32, 2)
+        view[:] = [1.5, -2.0]
+        assert(mem.read_bytes(0x200, 8) == np.array([1.5, -2.0], dtype='<f4').tobytes())
+        mem.restore(snap)
+        assert(mem.read_words(0x200, 2) == (0, 0))
+
+        # big-endian arrays are stored little-endian
+        mem.load(PAGE_SIZE - 2, np.array([0x11223344], dtype='>u4'))
+        assert(mem.read_word_uint(PAGE_SIZE - 2) == 0x11223344)
+        assert(mem.view(PAGE_SIZE - 2, '<u4', 1, writable=False)[0] == 0x11223344)
+        with pytest.raises(ValueError):
+            mem.view(4 * PAGE_SIZE - 4, '<u4', 2)
+        with pytest.raises(ValueError):
+            mem.view(0, '>u4', 1)
+
+
+def _write_from_other_process(name, size):
+    mem = Shared_memory(size, name=name)
+    mem.view(0x10, '<u4', 2)[:] = mem.view(0x20, '<u4', 2) + 1
+    mem.close()
+
+
+def test_shared_memory():
+    with Quantum_coprocessor(mem_backend='shared') as qcp:
+        name = qcp.shared_mem_name
+        data_mem = qcp.qcp.data_mem
+        data_mem.load(0x20, np.array([41, 99], dtype=np.uint32))
+
+        # another process reads and writes the memory in place
+        process = multiprocessing.get_context('spawn').Process(
+            target=_write_from_other_process, args=(name, data_mem.size))
+        process.start()
+        process.join()
+        assert(process.exitcode == 0)
+        assert(data_mem.read_words(0x10, 2) == (42, 100))
+
+        # the segment outlives the attached memories, and is shared copy-on-write by clones
+        other = Shared_memory(data_mem.size, name=name)
+        clone = data_mem.clone()
+        data_mem.write_word_uint(0x10, 7)
+        assert(other.read_word_uint(0x10) == 7 and clone.read_word_uint(0x10) == 42)
+        other.close()
+        clone.close()
+
+    # the coprocessor destroyed the segment
+    with pytest.raises(FileNotFoundError):
+        Shared_memory(PAGE_SIZE, name=name)
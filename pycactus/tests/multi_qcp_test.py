@@ -0,0 +1,97 @@
+import pytest
+from pycactus.multi_qcp import Multi_qcp
+from pycactus.checkpoint import save_checkpoint
+from helpers import parse_program
+
+# waits for the other QCP through the shared region, then measures a Bell state
+bell_program = '''
+smis s0, {0}
+smis s1, {1}
+smis s2, {0, 1}
+smit t0, {(0, 1)}
+ldi r0, 0
+wait:
+lw r1, 0x800(r0)
+cmp r1, r0
+br eq, wait
+H s0
+H s1
+CZ t0
+H s1
+MeasZ s2
+qwait 30
+fmr r2, q0
+fmr r3, q1
+sw r2, 0x804(r0)
+sw r3, 0x808(r0)
+stop
+'''
+
+# counts in a loop, publishes the count, then measures its qubit in superposition
+count_program = '''
+smis s0, {0}
+ldi r1, 1
+ldi r5, 3000
+loop:
+add r4, r4, r1
+cmp r4, r5
+br lt, loop
+sw r4, 0x800(r0)
+H s0
+MeasZ s0
+qwait 30
+fmr r2, q0
+sw r2, 0x80c(r0)
+stop
+'''
+
+
+def run_multi_qcp(seed, use_threads):
+    multi = Multi_qcp([[3, 1], [2]], shared_region=(0x800, 16), sync_cycles=100, seed=seed)
+    multi.upload_programs([parse_program(data=bell_program),
+                           parse_program(data=count_program)])
+    multi.run(use_threads=use_threads)
+    return multi
+
+
+def test_multi_qcp():
+    results = set()
+    for seed in range(8):
+        multi = run_multi_qcp(seed, use_threads=True)
+        bell, count = multi.qcps
+        assert(bell.is_finished() and count.is_finished())
+        # the Bell QCP waited for the count to be published
+        assert(bell.cycle > count.cycle - 100)
+        assert(bell.read_gpr_uint(1) == 3000)
+
+        shared = multi.read_shared()
+        assert(shared[0:4] == (3000).to_bytes(4, 'little'))
+        assert(shared[4] == shared[8] == bell.read_gpr_uint(2))
+        assert(shared[12] == count.read_gpr_uint(2))
+        assert(bytes(count.data_mem.get_entire_mem()[0x800:0x810]) == shared)
+        results.add(shared)
+
+        # running the QCPs one after the other gives the same results
+        assert(run_multi_qcp(seed, use_threads=False).read_shared() == shared)
+    assert(len(results) > 1)
+
+    with pytest.raises(ValueError):
+        Multi_qcp([[0, 1], [1]])
+
+
+def test_multi_qcp_rejects_qubit_restore(tmp_path):
+    multi = Multi_qcp([[3, 1], [2]], shared_region=(0x800, 16), sync_cycles=100, seed=1)
+    multi.upload_programs([parse_program(data=bell_program),
+                           parse_program(data=count_program)])
+    bell = multi.qcps[0]
+    # the qubits of a group cannot be reset or saved apart from the other groups
+    for call in [lambda: bell.run_shots(4), bell.snapshot, bell.capture_baseline,
+                 lambda: save_checkpoint(bell, tmp_path / 'bell.ckpt')]:
+        with pytest.raises(NotImplementedError):
+            call()
+    assert(bell.cycle == 0)
+
+    assert(multi.run(use_threads=False))
+    multi.reset()
+    assert(multi.run(use_threads=False))
+    assert(bell.read_gpr_uint(1) == 3000)
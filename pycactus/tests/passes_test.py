@@ -0,0 +1,69 @@
+from pycactus.qcp import Quantum_control_processor
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+from pycactus.passes import Pass_pipeline, default_pipeline
+from pycactus.insn import eqasm_insn
+import pycactus.global_config as gc
+from helpers import parse_program
+
+
+def run_program(insns, pipeline=None):
+    qcp = Quantum_control_processor(Quantumsim(7))
+    qcp.upload_program(insns, pipeline)
+    qcp.run()
+    return qcp
+
+
+def test_pass_pipeline():
+    insns = parse_program('passes.eqasm')
+    pipeline = Pass_pipeline()
+    qcp = run_program(insns, pipeline)
+    ref_qcp = run_program(insns)
+
+    names = [insn.name for insn in qcp.insn_mem]
+    assert(eqasm_insn.NOP not in names and eqasm_insn.QWAIT not in names)
+    # only `ldi r1, ...` is left of the constant chain, and `ldi r4, 7` is removed
+    assert(len([name for name in names if name == eqasm_insn.LDI]) == 4)
+    # SMIS and SMIT are moved in front of the loop
+    loop_start = qcp.label_addr['loop']
+    assert(all(insn.name not in [eqasm_insn.SMIS, eqasm_insn.SMIT]
+               for insn in qcp.insn_mem[loop_start:]))
+
+    assert(qcp.read_gpr_uint(1) == (1 << 17) | 0x14)
+    assert([qcp.read_gpr_uint(i) for i in range(gc.NUM_GPR)] ==
+           [ref_qcp.read_gpr_uint(i) for i in range(gc.NUM_GPR)])
+    assert(qcp.cycle < ref_qcp.cycle)
+
+    # the parsed instructions are not modified
+    assert(len(insns) == 19 and insns[0].name == eqasm_insn.NOP)
+
+    report = pipeline.report()
+    for name in default_pipeline:
+        assert(name in report)
+
+
+def test_pass_pipeline_entry():
+    insns = parse_program(data='''
+        NOP
+        LDI r1, 5
+        ADDI r1, r1, 3
+        SW r1, 0x10(r0)
+        STOP
+    ''')
+    qcp = Quantum_control_processor(start_addr=2)
+    qcp.upload_program(insns, Pass_pipeline())
+    qcp.write_gpr_value(1, uint=10)
+    qcp.run()
+    # the instructions before the entry are kept, and `ADDI` is not folded
+    assert(qcp.insn_mem[2].name == eqasm_insn.ADDI)
+    assert(qcp.data_mem.read_word_uint(0x10) == 13)
+
+
+def test_dead_store_dumpmem():
+    insns = parse_program(data='''
+        LDI r3, 5
+        DUMPMEM 0 'r3'
+        LDI r3, 6
+        STOP
+    ''')
+    # the first load is read by `DUMPMEM`
+    assert(len(Pass_pipeline(['dead_store_elimination']).run(insns)) == 4)
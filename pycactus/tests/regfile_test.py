@@ -0,0 +1,106 @@
+import pytest
+from bitstring import BitArray
+from pycactus.gpr import GPRF, Int_GPRF
+from pycactus.fpr import FPRF, Packed_FPRF, fprf_backends
+from pycactus.qotr import QOTRF
+from pycactus.qcp import Quantum_control_processor, EXEC_MODES
+from pycactus.insn import *
+from helpers import parse_program
+
+
+def test_int_gprf_wraparound():
+    gprf = Int_GPRF(num_gpr=4, gpr_width=32)
+    gprf.write_uint(1, 2**31 - 1)
+    gprf.write_uint(2, gprf.read_unsigned(1) + 1)
+    assert(gprf.read_signed(2) == -2**31)
+    assert(gprf.read_unsigned(2) == 2**31)
+
+    gprf.write_uint(3, -1)
+    assert(gprf.read_unsigned(3) == 0xffffffff)
+    assert(gprf.read_signed(3) == -1)
+    assert(gprf.read(3) == BitArray('0xffffffff'))
+
+    gprf.write(0, BitArray(int=-5, length=32))
+    assert(gprf.read_signed(0) == -5)
+
+
+def test_gprf_backends_agree():
+    insns = [Instruction(eqasm_insn.LDI, rd=1, imm=-7),
+             Instruction(eqasm_insn.LDI, rd=2, imm=0x1ffff),
+             Instruction(eqasm_insn.LDUI, rd=2, rs=2, imm=0x7fff),
+             Instruction(eqasm_insn.ADD, rd=3, rs=1, rt=2),
+             Instruction(eqasm_insn.SUB, rd=4, rs=1, rt=2),
+             Instruction(eqasm_insn.MUL, rd=5, rs=1, rt=1),
+             Instruction(eqasm_insn.ADDI, rd=6, rs=2, imm=1),
+             Instruction(eqasm_insn.NOT, rd=7, rt=1),
+             Instruction(eqasm_insn.STOP)]
+
+    values = []
+    for backend in ['bitarray', 'int']:
+        qcp = Quantum_control_processor(gpr_backend=backend)
+        qcp.upload_program(insns)
+        qcp.run()
+        values.append([qcp.read_gpr_uint(i) for i in range(8)])
+
+    assert(values[0] == values[1])
+    assert(values[1][3] == 0xfffffff8)
+    assert(values[1][6] == 0)
+
+
+def test_packed_fprf():
+    fprf = Packed_FPRF(num_fpr=4)
+    ref_fprf = FPRF(num_fpr=4)
+    for value in [0.1, 1/3, -2.5e-7, 3.0e38]:
+        fprf.write_float(0, value)
+        ref_fprf.write_float(0, value)
+        # rounded to single precision, bit-identical with the BitArray register file
+        assert(fprf.read_bits(0) == ref_fprf.read_bits(0))
+        assert(fprf.read_float(0) == ref_fprf.read_float(0))
+
+    # raw bit patterns are moved without conversion, NaN payloads included
+    fprf.write_bits(1, 0x7fa00001)
+    assert(fprf.read_bits(1) == 0x7fa00001)
+    assert(fprf.read(1) == BitArray(uint=0x7fa00001, length=32))
+
+    # infinities are kept, but overflowing values raise as in the BitArray register file
+    fprf.write_float(2, float('-inf'))
+    assert(fprf.read_bits(2) == 0xff800000)
+    for backend in [fprf, ref_fprf]:
+        with pytest.raises(OverflowError):
+            backend.write_float(2, 1e39)
+        with pytest.raises(OverflowError):
+            backend.float_to_bits(-1e300)
+    assert(fprf.read_bits(2) == 0xff800000)
+
+
+def test_fp_overflow_backends_agree():
+    insns = parse_program(data='''
+        FMV.W.X f1, r1
+        FADD.S f2, f1, f1
+        STOP
+    ''')
+    for fpr_backend in fprf_backends:
+        for exec_mode in EXEC_MODES:
+            qcp = Quantum_control_processor(fpr_backend=fpr_backend, exec_mode=exec_mode)
+            qcp.upload_program(insns)
+            # 2**127, whose double does not fit into single precision
+            qcp.write_gpr_value(1, uint=0x7f000000)
+            with pytest.raises(OverflowError):
+                qcp.run()
+
+
+def test_qotrf_targets():
+    qotrf = QOTRF(max_qubit_num=7)
+    qotrf.set_sq_reg(0, [2, 0, 2])
+    target = qotrf.read_sq_reg(0)
+    assert(target.mask == 0b101 and target.qubits == (0, 2))
+    assert(list(target.indices) == [0, 2])
+    # the targets are shared by all lists with the same mask
+    assert(qotrf.sq_target([0, 2]) is target)
+
+    qotrf.set_tq_reg(1, [(1, 2), (0, 1)])
+    assert(qotrf.read_tq_reg(1).qubits == ((0, 1), (1, 2)))
+    assert(qotrf.read_tq_reg(1).indices.shape == (2, 2))
+
+    with pytest.raises(ValueError):
+        qotrf.set_sq_reg(1, [7])
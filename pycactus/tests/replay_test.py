@@ -0,0 +1,45 @@
+import pytest
+from pycactus.parallel import Parallel_shot_executor
+from pycactus.simt import Simt_executor
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+from pycactus.qubit_state_sim.replay import Measurement_record, Recording_sim, Replay_sim
+from helpers import new_qcp
+
+
+def test_record_replay(tmp_path):
+    recorder = Recording_sim(Quantumsim(2))
+    qcp = new_qcp('checkpoint.eqasm', recorder, num_available_qubits=2)
+    recorded = qcp.run_shots(10, mem_regions=[(0x80, 4), (0x100, 80)], seed=3)
+    record = recorder.record()
+    assert(len(record) == 10)
+    assert(record.results(0) == [(0, int(bit)) for bit in recorded.words(0x100, 80)[0]])
+
+    path = tmp_path / 'run.msmt'
+    record.save(path)
+    loaded = Measurement_record.load(path)
+    assert(all((a == b).all() for a, b in zip(loaded.shots, record.shots)))
+
+    qcp = new_qcp('checkpoint.eqasm', Replay_sim(path), num_available_qubits=2)
+    replayed = qcp.run_shots(10, mem_regions=[(0x80, 4), (0x100, 80)])
+    assert((replayed.msmt_results == recorded.msmt_results).all())
+    assert((replayed.memory(0x100, 80) == recorded.memory(0x100, 80)).all())
+    assert((replayed.words(0x80, 4) == recorded.words(0x80, 4)).all())
+    assert((replayed.cycles == recorded.cycles).all())
+
+    # a single run replays the first shot
+    qcp = new_qcp('checkpoint.eqasm', Replay_sim(record), num_available_qubits=2)
+    qcp.run()
+    assert(qcp.data_mem.read_word_uint(0x80) == recorded.words(0x80, 4)[0, 0])
+
+    # a program measuring other qubits diverges from the record
+    qcp = new_qcp('postselect.eqasm', Replay_sim(record), num_available_qubits=2)
+    with pytest.raises(ValueError):
+        qcp.run()
+
+    # the replayed shots cannot be distributed over other simulators
+    with pytest.raises(NotImplementedError):
+        Simt_executor(qcp).run_shots(2)
+    with pytest.raises(NotImplementedError):
+        Parallel_shot_executor(qcp, num_workers=2).run_shots(2)
+    with pytest.raises(TypeError):
+        Replay_sim(7)
@@ -0,0 +1,70 @@
+import asyncio
+from pycactus.qcp import EXEC_MODES
+from pycactus.quantum_coprocessor import Quantum_coprocessor
+from pycactus.scheduler import Qcp_scheduler, Qcp_job
+import pycactus.global_config as gc
+from helpers import eqasm_dir, new_qcp
+
+
+def arch_state(qcp):
+    return ([qcp.read_gpr_uint(i) for i in range(gc.NUM_GPR)], qcp.cycle, qcp.pc)
+
+
+def test_step():
+    for fn in ['test_add.eqasm', 'fusion.eqasm']:
+        for mode in EXEC_MODES:
+            qcp = new_qcp(fn, exec_mode=mode)
+            qcp.run()
+            expected = arch_state(qcp)
+
+            for num_cycles in [1, 2, 7]:
+                qcp = new_qcp(fn, exec_mode=mode)
+                num_steps = 1
+                while not qcp.step(num_cycles):
+                    assert(qcp.cycle == num_steps * num_cycles)
+                    num_steps += 1
+                assert(arch_state(qcp) == expected)
+
+    # `max_exec_cycle` bounds the steps as it bounds `run`
+    qcp = new_qcp('test_add.eqasm')
+    qcp.set_max_exec_cycle(10)
+    assert(qcp.step(4) is False and qcp.cycle == 4)
+    assert(qcp.step(100) is True and qcp.cycle == 11)
+
+
+def test_scheduler():
+    scheduler = Qcp_scheduler(time_slice=5)
+    long_job = scheduler.submit(new_qcp('test_add.eqasm'), 'long')
+    short_job = scheduler.submit(new_qcp('fp.eqasm'), 'short')
+    cancelled_job = scheduler.submit(new_qcp('test_add.eqasm'), 'cancelled')
+
+    scheduler.run_round()
+    cancelled_job.cancel()
+    scheduler.run()
+
+    assert(long_job.status == Qcp_job.DONE and short_job.status == Qcp_job.DONE)
+    assert(short_job.num_slices < long_job.num_slices)
+    assert(cancelled_job.status == Qcp_job.CANCELLED and cancelled_job.qcp.cycle == 5)
+    assert(long_job.qcp.read_gpr_int(7) == 10)
+    assert(scheduler.jobs == [])
+
+
+def test_execute_async():
+    coprocessor = Quantum_coprocessor()
+    assert(coprocessor.upload_program(eqasm_dir / 'test_add.eqasm'))
+
+    async def count_yields(task):
+        num_yields = 0
+        while not task.done():
+            num_yields += 1
+            await asyncio.sleep(0)
+        return num_yields
+
+    async def main():
+        task = asyncio.ensure_future(coprocessor.execute_async(cycles_per_yield=3))
+        return await count_yields(task), await task
+
+    num_yields, success = asyncio.run(main())
+    assert(success)
+    assert(num_yields > 1)
+    assert(coprocessor.qcp.read_gpr_int(7) == 10)
@@ -0,0 +1,132 @@
+from pycactus.qcp import Quantum_control_processor, EXEC_MODES
+from pycactus.parallel import Parallel_shot_executor
+from pycactus.shots import Post_selection
+from pycactus.simt import Simt_executor
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+from helpers import parse_program, new_qcp
+
+
+def test_run_shots():
+    qcp = new_qcp('shots.eqasm', Quantumsim(7))
+    qcp.data_mem.write_words(0x100, [41])
+
+    result = qcp.run_shots(100, mem_regions=[(0x100, 12)])
+    words = result.words(0x100, 12)
+    # each shot starts from the state after uploading and preloading the memory
+    assert((words[:, 0] == 42).all())
+    # the bell state
+    assert((result.msmt_results[:, 0] == result.msmt_results[:, 1]).all())
+    assert((words[:, 1] == result.msmt_results[:, 0]).all())
+    assert((result.cycles == result.cycles[0]).all())
+
+    histogram = result.histogram()
+    assert(sum(histogram.values()) == 100)
+    assert(set(histogram.keys()) <= {(0, 0, 0, 0, 0, 0, 0), (1, 1, 0, 0, 0, 0, 0)})
+
+    # the state is restored after the shots
+    assert(qcp.data_mem.read_word_uint(0x100) == 41)
+    assert(qcp.read_gpr_uint(2) == 0)
+
+
+def test_parallel_shots():
+    qcp = new_qcp('shots.eqasm', Quantumsim(7))
+    qcp.data_mem.write_words(0x100, [41])
+
+    serial = qcp.run_shots(50, mem_regions=[(0x100, 8)], seed=1234)
+    assert((serial.words(0x100, 8)[:, 0] == 42).all())
+    assert(len(serial.histogram()) == 2)
+    # the same seed gives the same results, whatever the distribution of the shots
+    for num_workers, chunk_size in [(1, None), (2, 7), (3, None)]:
+        executor = Parallel_shot_executor(qcp, num_workers=num_workers,
+                                          chunk_size=chunk_size)
+        result = executor.run_shots(50, mem_regions=[(0x100, 8)], seed=1234)
+        assert(result.seed == 1234)
+        assert((result.msmt_results == serial.msmt_results).all())
+        assert((result.memory(0x100, 8) == serial.memory(0x100, 8)).all())
+        assert((result.cycles == serial.cycles).all())
+
+
+def test_parallel_shots_start_addr():
+    insns = parse_program(data='''
+        ADDI r1, r1, 5
+        ADDI r1, r1, 1
+        SW r1, 0x100(r0)
+        STOP
+    ''')
+    qcp = Quantum_control_processor(Quantumsim(7), start_addr=1)
+    qcp.upload_program(insns)
+
+    serial = qcp.run_shots(2, mem_regions=[(0x100, 4)], seed=1)
+    result = Parallel_shot_executor(qcp, num_workers=2).run_shots(
+        2, mem_regions=[(0x100, 4)], seed=1)
+    # the workers skip the first instruction as well
+    assert((result.words(0x100, 4)[:, 0] == 1).all())
+    assert((result.cycles == serial.cycles).all())
+
+def test_classical_shots():
+    insns = parse_program(data='''
+        LDI r1, 3
+        SW r1, 0x100(r0)
+        STOP
+    ''')
+    # a QCP without qubit state simulator
+    qcp = Quantum_control_processor()
+    qcp.upload_program(insns)
+    serial = qcp.run_shots(3, mem_regions=[(0x100, 4)], seed=1)
+    result = Parallel_shot_executor(qcp, num_workers=2).run_shots(
+        3, mem_regions=[(0x100, 4)], seed=1)
+    assert((serial.words(0x100, 4)[:, 0] == 3).all())
+    assert((result.words(0x100, 4) == serial.words(0x100, 4)).all())
+
+def test_parallel_shots_shared_memory():
+    qcp = new_qcp('shots.eqasm', Quantumsim(7), mem_backend='shared')
+    qcp.data_mem.write_words(0x100, [41])
+
+    # the workers read the initial memory from the shared segment
+    config = Parallel_shot_executor(qcp).worker_config(attach_shared=True)
+    assert(config[-1] == qcp.data_mem.name)
+    serial = qcp.run_shots(20, mem_regions=[(0x100, 8)], seed=3)
+    result = Parallel_shot_executor(qcp, num_workers=2).run_shots(
+        20, mem_regions=[(0x100, 8)], seed=3)
+    assert((result.words(0x100, 8)[:, 0] == 42).all())
+    assert((result.msmt_results == serial.msmt_results).all())
+    qcp.data_mem.close()
+
+
+def test_post_selection():
+    qcp = new_qcp('postselect.eqasm', Quantumsim(2), num_available_qubits=2)
+    full = qcp.run_shots(40, mem_regions=[(0x300, 8)], seed=5)
+    assert(full.accepted.all() and full.num_rejected() == 0)
+
+    qcp.set_post_selection(Post_selection().require_msmt(0, 0))
+    result = qcp.run_shots(40, mem_regions=[(0x300, 8)], seed=5)
+    heralded = full.msmt_results[:, 0] == 0
+    assert(0 < result.num_rejected() < 40)
+    assert((result.accepted == heralded).all())
+    # the accepted shots are not changed, and the rejected ones stop at the herald
+    assert((result.memory(0x300, 8)[heralded] == full.memory(0x300, 8)[heralded]).all())
+    assert((result.cycles[heralded] == full.cycles[heralded]).all())
+    assert((result.cycles[~heralded] < 10).all())
+    assert(sum(result.histogram().values()) == result.num_accepted())
+    assert(all(outcome[0] == 0 for outcome in result.histogram()))
+
+    # the shots are rejected in the same way by all engines and executors
+    for mode in EXEC_MODES:
+        qcp.set_exec_mode(mode)
+        other = qcp.run_shots(40, mem_regions=[(0x300, 8)], seed=5)
+        assert((other.accepted == result.accepted).all())
+        assert((other.cycles == result.cycles).all())
+    lockstep = Simt_executor(qcp).run_shots(40, mem_regions=[(0x300, 8)], seed=5)
+    assert((lockstep.accepted == result.accepted).all())
+    assert((lockstep.cycles == result.cycles).all())
+    parallel = Parallel_shot_executor(qcp, num_workers=2).run_shots(40, seed=5)
+    assert((parallel.accepted == result.accepted).all())
+
+    # a flag written into the memory rejects the shot at the next measurement
+    qcp.set_post_selection(Post_selection().reject_word(0x300, 1))
+    for executor in [qcp, Simt_executor(qcp)]:
+        flagged = executor.run_shots(40, mem_regions=[(0x300, 8)], seed=5)
+        assert((flagged.accepted == heralded).all())
+        assert((flagged.cycles[heralded] == full.cycles[heralded]).all())
+        assert((flagged.cycles[~heralded] < full.cycles[~heralded]).all())
+        assert((flagged.words(0x300, 8)[~heralded, 1] == 0).all())
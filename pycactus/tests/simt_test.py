@@ -0,0 +1,61 @@
+import logging
+import pytest
+from logging.handlers import BufferingHandler
+from pycactus.qcp import Quantum_control_processor
+from pycactus.simt import Simt_executor
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+from pycactus.utils import get_logger
+from helpers import parse_program, new_qcp
+
+
+def test_simt_matches_shots():
+    for fn, regions in [('shots.eqasm', [(0x100, 12)]), ('simt.eqasm', [(0x200, 5)])]:
+        qcp = new_qcp(fn, Quantumsim(7))
+        qcp.data_mem.write_words(0x100, [41])
+        expected = qcp.run_shots(40, mem_regions=regions, seed=7)
+        result = Simt_executor(qcp).run_shots(40, mem_regions=regions, seed=7)
+
+        assert((result.msmt_results == expected.msmt_results).all())
+        assert((result.cycles == expected.cycles).all())
+        for region in regions:
+            assert((result.memory(*region) == expected.memory(*region)).all())
+
+
+def test_simt_divergence():
+    qcp = new_qcp('simt.eqasm', Quantumsim(7))
+    executor = Simt_executor(qcp)
+    result = executor.run_shots(30, mem_regions=[(0x200, 8)], seed=3)
+
+    ones = result.msmt_results[:, 0] == 1
+    # both sides of the branch are taken by some lanes
+    assert(ones.any() and not ones.all())
+    assert((result.words(0x200, 8)[:, 0] == ones * 3).all())
+    assert((executor.gpr[4].view('int32') == [-7 if one else 9 for one in ones]).all())
+    assert(result.cycles[ones].min() > result.cycles[~ones].max())
+
+
+def test_simt_fp_overflow():
+    # overflowing single-precision results raise, as in the serial engines
+    qcp = Quantum_control_processor(Quantumsim(7))
+    qcp.upload_program(parse_program(data='FMV.W.X f1, r1\nFADD.S f2, f1, f1\nSTOP\n'))
+    qcp.write_gpr_value(1, uint=0x7f000000)
+    with pytest.raises(OverflowError):
+        Simt_executor(qcp).run_shots(4)
+
+
+def test_simt_skips_dumpmem(capsys):
+    qcp = Quantum_control_processor(Quantumsim(7))
+    qcp.upload_program(parse_program(data="LDI r3, 5\nDUMPMEM 0 'r3'\nSTOP\n"))
+    handler = BufferingHandler(capacity=100)
+    logger = get_logger('simt')
+    logger.addHandler(handler)
+    try:
+        executor = Simt_executor(qcp)
+        executor.run_shots(3)
+        executor.run_shots(3)
+    finally:
+        logger.removeHandler(handler)
+    # the dumps are not printed, which is reported once
+    assert('dumping register' not in capsys.readouterr().out)
+    assert([record.levelno for record in handler.buffer] == [logging.WARNING])
+    assert((executor.gpr[3] == 5).all())
@@ -0,0 +1,43 @@
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+from helpers import new_qcp
+
+
+def qubit_probabilities(qcp):
+    sdm = qcp.qubit_state_sim.quantumsim.sdm
+    return [sdm.peak_measurement(qubit) for qubit in range(2)]
+
+
+def test_snapshot_restore():
+    qcp = new_qcp('shots.eqasm', Quantumsim(7))
+    qcp.data_mem.write_words(0x100, [41])
+    qcp.data_mem.write_words(0x5000, [7])
+    qcp.fprf.write_float(2, 1.5)
+    qcp.qubit_state_sim.apply_single_qubit_gate('H', 0)
+    probabilities = qubit_probabilities(qcp)
+
+    snap = qcp.snapshot()
+    for shot in range(5):
+        qcp.run()
+        assert(qcp.stop_bit == 1 and qcp.cycle > 0)
+        assert(qcp.data_mem.read_word_uint(0x100) == 42)
+        qcp.data_mem.write_words(0x5000, [shot])
+        qcp.restore(snap)
+
+        assert(qcp.pc == 0 and qcp.cycle == 0 and qcp.stop_bit == 0)
+        assert(qcp.read_gpr_uint(2) == 0)
+        assert(qcp.fprf.read_float(2) == 1.5)
+        assert(qcp.qotrf.read_sq_reg(0) is None)
+        assert(qcp.data_mem.read_word_uint(0x100) == 41)
+        assert(qcp.data_mem.read_word_uint(0x5000) == 7)
+        assert(qcp.msmt_result == [0] * 7)
+        # the superposition of qubit 0 is restored, not reset
+        assert(qubit_probabilities(qcp) == probabilities)
+
+    # restoring an older snapshot after taking a newer one
+    qcp.run()
+    after = qcp.snapshot()
+    qcp.restore(snap)
+    assert(qcp.data_mem.read_word_uint(0x100) == 41)
+    qcp.restore(after)
+    assert(qcp.data_mem.read_word_uint(0x100) == 42)
+    assert(qcp.stop_bit == 1 and qcp.read_gpr_uint(2) == 1)
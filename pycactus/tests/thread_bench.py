@@ -0,0 +1,80 @@
+'''Measure how the throughput of independent QCPs scales with the number of threads.
+
+Each thread runs its own QCP on a counting loop followed by a Bell state measurement.
+On a free-threaded CPython (3.13t and later), the throughput is expected to grow with the
+number of threads; with the GIL, it stays flat.
+
+Run it as a script:
+    python -m pycactus.tests.thread_bench [max_threads]
+'''
+import sys
+import time
+import threading
+from pycactus.eqasm_parser import Eqasm_parser
+from pycactus.qcp import Quantum_control_processor
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+
+program = '''
+smis s0, {{0}}
+smis s1, {{1}}
+smis s2, {{0, 1}}
+smit t0, {{(0, 1)}}
+ldi r1, 1
+ldi r7, 0
+ldi r8, {}
+loop_start:
+add r7, r7, r1
+cmp r7, r8
+br ne, loop_start
+H s0
+H s1
+CZ t0
+H s1
+MeasZ s2
+stop
+'''
+
+
+def run_threads(insns, num_threads, num_shots):
+    qcps = []
+    for i in range(num_threads):
+        qcp = Quantum_control_processor(Quantumsim(2), num_available_qubits=2)
+        qcp.upload_program(insns)
+        qcps.append(qcp)
+
+    barrier = threading.Barrier(num_threads + 1)
+
+    def worker(qcp):
+        barrier.wait()
+        qcp.run_shots(num_shots)
+
+    threads = [threading.Thread(target=worker, args=(qcp,)) for qcp in qcps]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return num_threads * num_shots / elapsed
+
+
+def main(max_threads=8, num_iterations=2000, num_shots=20):
+    success, insns = Eqasm_parser().parse(data=program.format(num_iterations))
+    assert(success)
+
+    gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print("GIL enabled: {}".format(gil_enabled))
+    print("{:>8}  {:>12}  {:>8}".format('threads', 'shots/s', 'speedup'))
+    base = None
+    num_threads = 1
+    while num_threads <= max_threads:
+        shots_per_second = run_threads(insns, num_threads, num_shots)
+        base = base or shots_per_second
+        print("{:>8}  {:>12.1f}  {:>8.2f}".format(num_threads, shots_per_second,
+                                                   shots_per_second / base))
+        num_threads *= 2
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
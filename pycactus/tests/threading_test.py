@@ -0,0 +1,69 @@
+import logging
+import threading
+from pycactus.qcp import Quantum_control_processor
+from pycactus.quantum_coprocessor import Quantum_coprocessor
+from pycactus.qubit_state_sim.quantumsim import Quantumsim
+from pycactus.utils import get_logger
+from helpers import eqasm_dir, parse_program
+
+
+def test_get_logger_idempotent():
+    logger = get_logger('qcp')
+    handlers = list(logger.handlers)
+    assert(get_logger('qcp') is logger)
+    assert(logger.handlers == handlers)
+
+
+def test_instance_log_levels():
+    quiet = Quantum_control_processor(Quantumsim(7))
+    verbose = Quantum_control_processor(Quantumsim(7))
+    module_level = get_logger('qcp').level
+
+    verbose.set_log_level(logging.DEBUG)
+    assert(verbose.logger.isEnabledFor(logging.DEBUG) and verbose.data_mem.debug_on)
+    assert(not quiet.logger.isEnabledFor(logging.DEBUG) and not quiet.data_mem.debug_on)
+    assert(not quiet.trace_on)
+    assert(get_logger('qcp').level == module_level)
+
+    handler = logging.NullHandler()
+    verbose.set_log_handler(handler)
+    assert(verbose.logger.handlers == [handler] and quiet.logger.handlers == [])
+
+
+def test_log_file_on_request(tmp_path, monkeypatch):
+    # without a log file, nothing is written into the working directory
+    monkeypatch.chdir(tmp_path)
+    coprocessor = Quantum_coprocessor()
+    assert(coprocessor.upload_program(eqasm_dir / 'test_add.eqasm'))
+    assert(coprocessor.execute())
+    coprocessor.run_shots(2)
+    assert(list(tmp_path.iterdir()) == [] and coprocessor.log_handler is None)
+
+    coprocessor.set_log_level(logging.INFO)
+    assert(coprocessor.execute(log_file=tmp_path / 'run.log'))
+    coprocessor.log_handler.flush()
+    assert((tmp_path / 'run.log').stat().st_size > 0)
+
+
+def test_threads_match_serial():
+    insns = parse_program('shots.eqasm')
+
+    def new_qcp():
+        qcp = Quantum_control_processor(Quantumsim(7))
+        qcp.upload_program(insns)
+        return qcp
+
+    expected = [new_qcp().run_shots(20, seed=seed).msmt_results for seed in range(4)]
+    results = [None] * 4
+
+    def worker(seed):
+        results[seed] = new_qcp().run_shots(20, seed=seed).msmt_results
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for result, expected_result in zip(results, expected):
+        assert((result == expected_result).all())
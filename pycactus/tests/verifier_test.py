@@ -0,0 +1,63 @@
+import pytest
+from pycactus.qcp import Quantum_control_processor, EXEC_MODES
+from pycactus.verifier import Static_verifier
+from pycactus.insn import Instruction, eqasm_insn
+import pycactus.global_config as gc
+
+
+def program(mem_offset):
+    return [Instruction(eqasm_insn.SMIS, si=0, sq_list=[0, 2]),
+            Instruction(eqasm_insn.SMIS, si=1, sq_list=[0, 9]),
+            Instruction(eqasm_insn.LDI, rd=1, imm=0x40),
+            Instruction(eqasm_insn.LDI, rd=2, imm=0x1234),
+            Instruction(eqasm_insn.SW, rs=2, imm=mem_offset, rt=1),
+            Instruction(eqasm_insn.LW, rd=3, imm=mem_offset, rt=1),
+            Instruction(eqasm_insn.LW, rd=4, imm=0, rt=3),
+            Instruction(eqasm_insn.STOP)]
+
+
+def test_static_verifier():
+    proofs = Static_verifier(num_qubits=7).verify(program(4))
+    # qubit 9 is not available
+    assert([proof is not None for proof in proofs[:2]] == [True, False])
+    assert(proofs[4].mem_addr == 0x44 and proofs[5].mem_addr == 0x44)
+    # the base register is loaded from the memory
+    assert(proofs[6] is None)
+
+    proofs = Static_verifier(num_qubits=7).verify(program(gc.SIZE_DATA_MEM))
+    assert(proofs[4] is None)
+
+
+def test_unchecked_handlers():
+    insns = program(4)
+    del insns[1]
+    qcp = Quantum_control_processor()
+    qcp.upload_program(insns)
+    assert(qcp.decoded_insns[0][0] == qcp._exec_smis_unchecked)
+    assert(qcp.decoded_insns[3][0] == qcp._exec_sw_unchecked)
+    assert(qcp.decoded_insns[5][0] == qcp._exec_lw)
+    qcp.run()
+    assert(qcp.read_gpr_uint(3) == 0x1234)
+    assert(qcp.qotrf.read_sq_reg(0).qubits == (0, 2))
+
+    # the unproven instructions keep the runtime checks
+    qcp = Quantum_control_processor()
+    qcp.upload_program(program(4))
+    with pytest.raises(ValueError):
+        qcp.run()
+
+
+def test_entry_address():
+    insns = [Instruction(eqasm_insn.LDI, rd=1, imm=0x100),
+             Instruction(eqasm_insn.LDI, rd=2, imm=77),
+             Instruction(eqasm_insn.SW, rs=2, imm=0, rt=1),
+             Instruction(eqasm_insn.STOP)]
+    # the program starts after the load of the base register, which is then unknown
+    assert(Static_verifier().verify(insns, entry=1)[2] is None)
+    for exec_mode in EXEC_MODES:
+        qcp = Quantum_control_processor(start_addr=1, exec_mode=exec_mode)
+        qcp.upload_program(insns)
+        qcp.write_gpr_value(1, uint=0x200)
+        qcp.run()
+        assert(qcp.data_mem.read_word_uint(0x200) == 77)
+        assert(qcp.data_mem.read_word_uint(0x100) == 0)
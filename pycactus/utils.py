@@ -6,6 +6,8 @@ import colorama as cm
 import termcolor as tc
 from pathlib import Path, PurePath
 import time
+import threading
+import itertools
 cm.init()
 
 # Fore: BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE, RESET.
@@ -56,38 +58,101 @@ def set_logger_file():
         log_file = 'build/pycactus_' + cur_time + '.log'
 
 
-def update_log_file(log_filename=None):
+# guards `loggers`, the handlers of the module loggers and `_log_file_counter`
+_logger_lock = threading.RLock()
+_log_file_counter = itertools.count()
+
+
+def new_log_file_handler(log_filename=None):
+    '''Return a handler writing into a new log file.
+
+    By default, the file is named after the current time in the `build` directory. Files
+    opened within the same process get a distinct suffix, so that coprocessors running
+    in parallel threads never share a file.
+    '''
     if log_filename is None:
         cur_time = time.strftime("%H_%M_%S", time.localtime())
-        log_filename = 'build/pycactus_' + cur_time + '.log'
+        with _logger_lock:
+            seq = next(_log_file_counter)
+        suffix = '' if seq == 0 else '_{}'.format(seq)
+        log_filename = 'build/pycactus_' + cur_time + suffix + '.log'
 
     fileh = logging.FileHandler(log_filename, 'w')
     fileh.setFormatter(FORMATTER)
+    return fileh
+
 
-    global loggers
-    for logname in loggers:
-        log = logging.getLogger(logname)  # root logger
-        for hdlr in log.handlers[:]:  # remove all old handlers
-            log.removeHandler(hdlr)
-        log.addHandler(fileh)      # set the new handler
+def update_log_file(log_filename=None):
+    '''Redirect all module loggers to a new log file.
+
+    This affects every object logging through the module loggers. Use
+    `Quantum_coprocessor.update_log_file` to redirect the log of a single coprocessor.
+    '''
+    fileh = new_log_file_handler(log_filename)
+
+    with _logger_lock:
+        old_handlers = set()
+        for logname in loggers:
+            log = logging.getLogger(logname)
+            for hdlr in log.handlers[:]:  # remove all old handlers
+                log.removeHandler(hdlr)
+                old_handlers.add(hdlr)
+            log.addHandler(fileh)      # set the new handler
+
+    for hdlr in old_handlers:
+        hdlr.close()
 
 
 loggers = []
 
 
 def get_logger(logger_name):
-    global loggers
-    if (logger_name not in loggers):
-        loggers.append(logger_name)
-
-    logger = logging.getLogger(logger_name)
-    # better to have too much log than not enough
-    logger.setLevel(logging.DEBUG)
-    if log_file is None:
-        logger.addHandler(get_console_handler())
-    else:
-        logger.addHandler(get_file_handler(log_file))
-
-    # with this pattern, it's rarely necessary to propagate the error up to parent
-    logger.propagate = False
+    '''Return the module logger `logger_name`.
+
+    The handler is only added when the logger is created, so that calling this function
+    again returns the same logger without duplicating its output.
+    '''
+    with _logger_lock:
+        if (logger_name not in loggers):
+            loggers.append(logger_name)
+
+        logger = logging.getLogger(logger_name)
+        if len(logger.handlers) == 0:
+            # better to have too much log than not enough
+            logger.setLevel(logging.DEBUG)
+            if log_file is None:
+                logger.addHandler(get_console_handler())
+            else:
+                logger.addHandler(get_file_handler(log_file))
+
+            # with this pattern, it's rarely necessary to propagate the error up to parent
+            logger.propagate = False
     return logger
+
+
+class Instance_logger(logging.Logger):
+    def __init__(self, module_logger, level=None):
+        '''A logger private to one object, e.g., one QCP, so that changing its level or
+        handler does not affect other objects, which may run in other threads.
+
+        It is not registered in the logging module, and forwards its records to the
+        handlers of `module_logger` until it is given its own by `set_handler`. Its level is
+        `level`, or that of `module_logger` if not given.
+        '''
+        super().__init__(module_logger.name, module_logger.level if level is None else level)
+        self.parent = module_logger
+
+    def setLevel(self, level):
+        super().setLevel(level)
+        # the logging module only clears the level cache of the registered loggers
+        self._cache.clear()
+
+    def set_handler(self, handler):
+        '''Log into `handler` only, or into the handlers of the module logger if `None`.'''
+        for hdlr in self.handlers[:]:
+            self.removeHandler(hdlr)
+        if handler is None:
+            self.propagate = True
+        else:
+            self.addHandler(handler)
+            self.propagate = False
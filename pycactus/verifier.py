@@ -0,0 +1,111 @@
+'''Static verification of eQASM programs at upload time.
+
+The verifier proves, where it can, that an instruction cannot fail the runtime checks of
+the simulator: its register indices are in range, the qubits in its `SMIS`/`SMIT` mask
+are available, and the memory address it accesses is a known constant within the data
+memory. The QCP executes proven instructions by handlers skipping these checks, while all
+other instructions keep them.
+'''
+from .insn import *
+from .passes import propagate_constants
+import pycactus.global_config as gc
+
+logger = get_logger((__name__).split('.')[-1])
+logger.setLevel(logging.WARNING)
+
+# the register file indexed by each instruction field, and the number of its registers
+reg_field_sizes = {
+    'rd': gc.NUM_GPR,
+    'rs': gc.NUM_GPR,
+    'rt': gc.NUM_GPR,
+    'fd': gc.NUM_FPR,
+    'fs': gc.NUM_FPR,
+    'ft': gc.NUM_FPR,
+    'si': gc.NUM_SQ_QOTR,
+    'ti': gc.NUM_TQ_QOTR
+}
+
+# the base register of memory accesses, and the number of bytes accessed
+mem_access_insns = {
+    eqasm_insn.LW: ('rt', 4),
+    eqasm_insn.LB: ('rt', 1),
+    eqasm_insn.LBU: ('rt', 1),
+    eqasm_insn.SW: ('rt', 4),
+    eqasm_insn.SB: ('rt', 1),
+    eqasm_insn.FLW: ('rs', 4),
+    eqasm_insn.FSW: ('rs', 4)
+}
+
+
+class Proof():
+    def __init__(self, mem_addr=None):
+        '''The facts proven about an instruction.
+
+        Args:
+        - `mem_addr` (int): for a memory access, the constant address accessed.
+        '''
+        self.mem_addr = mem_addr
+
+
+class Static_verifier():
+    def __init__(self, num_qubits=7, mem_size=gc.SIZE_DATA_MEM):
+        '''Verifier of programs executed by a QCP with `num_qubits` available qubits and a data
+        memory of `mem_size` bytes.
+        '''
+        self.num_qubits = num_qubits
+        self.mem_size = mem_size
+        self.num_proven = 0
+
+    def verify(self, insns, entry=0):
+        '''Return a list with, for each instruction of `insns`, a `Proof` if it is proven
+        safe, or `None` if it must keep the runtime checks. The program starts at the
+        address `entry`.
+        '''
+        proofs = []
+        for addr, insn, known, value in propagate_constants(insns, entry):
+            proofs.append(self.verify_insn(insn, known))
+
+        self.num_proven = len([proof for proof in proofs if proof is not None])
+        logger.info("%d of %d instructions are proven safe.", self.num_proven, len(insns))
+        return proofs
+
+    def verify_insn(self, insn, known):
+        '''Return a `Proof` for the instruction `insn` if it can be proven safe, given the
+        GPRs holding the known constants `known`, otherwise `None`.
+        '''
+        if not self.regs_in_range(insn):
+            return None
+
+        if insn.name == eqasm_insn.SMIS:
+            if not self.qubits_in_range(insn.sq_list):
+                return None
+
+        elif insn.name == eqasm_insn.SMIT:
+            if not (isinstance(insn.tq_list, list) and len(insn.tq_list) > 0 and
+                    all(self.qubits_in_range(list(pair)) for pair in insn.tq_list)):
+                return None
+
+        elif insn.name in mem_access_insns:
+            base_field, num_bytes = mem_access_insns[insn.name]
+            base = getattr(insn, base_field)
+            if base not in known:
+                return None
+            mem_addr = known[base] + insn.imm
+            if mem_addr < 0 or mem_addr + num_bytes > self.mem_size:
+                return None
+            return Proof(mem_addr=mem_addr)
+
+        return Proof()
+
+    @staticmethod
+    def regs_in_range(insn):
+        for field, num_regs in reg_field_sizes.items():
+            reg = getattr(insn, field)
+            if reg is not None and not (isinstance(reg, int) and 0 <= reg < num_regs):
+                return False
+        return True
+
+    def qubits_in_range(self, qubit_list):
+        return (isinstance(qubit_list, list) and len(qubit_list) > 0 and
+                all(isinstance(qubit, int) and 0 <= qubit < self.num_qubits
+                    for qubit in qubit_list))